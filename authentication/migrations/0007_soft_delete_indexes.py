@@ -0,0 +1,28 @@
+# Generated by Django 4.2.5 on 2026-10-18 19:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("authentication", "0006_alter_user_user_type"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(("state", "DELETED")),
+                fields=["id"],
+                name="user_deleted_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="useractivity",
+            index=models.Index(
+                condition=models.Q(("deleted_at", None)),
+                fields=["user", "created_at"],
+                name="user_activity_user_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("authentication", "0007_soft_delete_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="useractivity",
+            name="created_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
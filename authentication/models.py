@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
+from django.utils import timezone
 
 from authentication.managers import UserManager
 from feleexpress import settings
@@ -118,6 +119,14 @@ class User(BaseAbstractModel, AbstractBaseUser, PermissionsMixin):
         db_table = "user"
         verbose_name = "user"
         verbose_name_plural = "users"
+        indexes = [
+            # the few deleted users, see BaseQuerySet.exclude_deleted_users
+            models.Index(
+                fields=["id"],
+                name="user_deleted_idx",
+                condition=models.Q(state="DELETED"),
+            ),
+        ]
 
     def __str__(self):
         return self.display_name
@@ -142,13 +151,8 @@ class User(BaseAbstractModel, AbstractBaseUser, PermissionsMixin):
     def user_location(self):
         return f"{self.street_address}, {self.city}, {self.state_of_residence}"
 
-    def hard_delete(self, using=None, keep_parents=False, image_url=None, commit=True):
-        """Hard deleting"""
-        if self.avatar_url:
-            return super(User, self).hard_delete(
-                using=using, keep_parents=keep_parents, image_url=self.avatar_url
-            )
-        return super(User, self).hard_delete(using=using, keep_parents=keep_parents)
+    def get_file_urls(self):
+        return [self.avatar_url] if self.avatar_url else []
 
     def delete(self, soft_delete: bool = True, actor=None):
         import uuid
@@ -228,6 +232,8 @@ class UserActivity(BaseAbstractModel):
     session_id = models.CharField(
         max_length=60, null=True, blank=True, verbose_name="User Activity Session Id"
     )
+    # not auto_now_add: queued activities are written with the time they happened
+    created_at = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
         return f"{self.user} -{self.category} ({self.action})"
@@ -236,6 +242,13 @@ class UserActivity(BaseAbstractModel):
         db_table = "user_activity"
         verbose_name = "user activity"
         verbose_name_plural = "user activities"
+        indexes = [
+            models.Index(
+                fields=["user", "created_at"],
+                name="user_activity_user_idx",
+                condition=models.Q(deleted_at=None),
+            ),
+        ]
 
 
 class ReferralUser(BaseAbstractModel):
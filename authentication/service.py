@@ -1,7 +1,13 @@
+import json
 from datetime import timedelta
 
 from django.contrib.auth.hashers import check_password
+from django.db import InterfaceError, OperationalError
+from django.db.models import Q
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django_redis import get_redis_connection
+from redis.exceptions import LockError
 from rest_framework import status
 
 from authentication.models import ReferralUser, User, UserActivity
@@ -10,6 +16,7 @@ from feleexpress import settings
 from helpers.cache_manager import CacheManager, KeyBuilder
 from helpers.db_helpers import generate_otp, generate_referral_code
 from helpers.exceptions import CustomAPIException, CustomFieldValidationException
+from helpers.logger import CustomLogging
 from helpers.token_manager import TokenManager
 from notification.service import EmailManager, NotificationService
 
@@ -81,8 +88,7 @@ class UserService:
             context={"referral_code": referral_code},
             category="USER",
             action="USER_CUSTOMIZE_REFERRAL_CODE",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -217,7 +223,7 @@ class AuthService:
             context=activity_context,
             category="USER_AUTH",
             action="PHONE_VERIFICATION_OTP",
-            phone_number=phone_number,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -344,7 +350,7 @@ class AuthService:
             context=activity_context,
             category="USER_AUTH",
             action="EMAIL_VERIFICATION_OTP",
-            email=email,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -400,14 +406,13 @@ class AuthService:
             context={},
             category="USER_AUTH",
             action="USER_RESET_PASSWORD",
-            email=email,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
 
     @classmethod
     def change_password(cls, user, data, session_id):
-        email = data.get("email")
         old_password = data.get("old_password")
         password = data.get("password")
 
@@ -423,7 +428,7 @@ class AuthService:
             context={},
             category="USER_AUTH",
             action="USER_RESET_PASSWORD",
-            email=email,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -446,7 +451,7 @@ class AuthService:
             context={"old_email": old_email, "new_email": new_email},
             category="USER_AUTH",
             action="USER_CHANGED_EMAIL",
-            email=new_email,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -477,13 +482,186 @@ class AuthService:
             context=context,
             category="USER_AUTH",
             action="USER_CHANGED_PHONE_NUMBER",
-            phone_number=new_phone_number,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
 
 
 class UserActivityService:
+    QUEUE_KEY = f"{settings.ENVIRONMENT}:{KeyBuilder.user_activity_queue()}"
+    DEAD_LETTER_KEY = f"{QUEUE_KEY}:dead"
+    DEAD_LETTER_MAX_SIZE = 10000
+
+    @classmethod
+    def enqueue_activity(cls, activity):
+        try:
+            get_redis_connection("default").rpush(
+                cls.QUEUE_KEY, json.dumps(activity, default=str)
+            )
+        except Exception as e:
+            CustomLogging.error(
+                f"Unable to queue user activity, saving it directly: {str(e)}"
+            )
+            cls.save_activities([activity])
+
+    @classmethod
+    def flush_activities(cls):
+        """
+        Write queued activities in batches of USER_ACTIVITY_BATCH_SIZE.
+        A batch is only removed from the queue once it has been handled, and a
+        lock keeps overlapping runs from writing the same batch twice.
+        """
+        connection = get_redis_connection("default")
+        lock = connection.lock(
+            f"{cls.QUEUE_KEY}:lock", timeout=settings.USER_ACTIVITY_FLUSH_LOCK_SECONDS
+        )
+        if not lock.acquire(blocking=False):
+            return 0
+
+        saved = 0
+        batch_size = settings.USER_ACTIVITY_BATCH_SIZE
+        try:
+            for _ in range(settings.USER_ACTIVITY_MAX_BATCHES):
+                batch = connection.lrange(cls.QUEUE_KEY, 0, batch_size - 1)
+                if not batch:
+                    break
+                batch_saved, handled = cls.save_batch(connection, batch)
+                saved += batch_saved
+                connection.ltrim(cls.QUEUE_KEY, handled, -1)
+                if handled < len(batch):
+                    break
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                pass
+        return saved
+
+    @classmethod
+    def save_batch(cls, connection, batch):
+        """
+        When a batch can't be saved its activities are saved one at a time,
+        and the ones that still fail are moved to DEAD_LETTER_KEY so a bad
+        activity can't hold up the queue. Database connection errors stop the
+        batch, the rest of it is retried on the next run.
+        :returns: (activities saved, items handled from the start of the batch)
+        """
+        try:
+            return cls.save_activities([json.loads(item) for item in batch]), len(batch)
+        except (InterfaceError, OperationalError):
+            raise
+        except Exception as e:
+            CustomLogging.error(
+                f"Unable to save user activity batch, saving one at a time: {str(e)}"
+            )
+
+        saved, handled, dead_items = 0, 0, []
+        for item in batch:
+            try:
+                saved += cls.save_activities([json.loads(item)])
+            except (InterfaceError, OperationalError) as e:
+                CustomLogging.error(f"Unable to save user activity: {str(e)}")
+                break
+            except Exception as e:
+                CustomLogging.error(
+                    f"Moving user activity to the dead letter queue: {str(e)}",
+                    extra={"activity": item},
+                )
+                dead_items.append(item)
+            handled += 1
+
+        if dead_items:
+            pipeline = connection.pipeline(transaction=False)
+            pipeline.rpush(cls.DEAD_LETTER_KEY, *dead_items)
+            pipeline.ltrim(cls.DEAD_LETTER_KEY, -cls.DEAD_LETTER_MAX_SIZE, -1)
+            pipeline.execute()
+        return saved, handled
+
+    @classmethod
+    def save_activities(cls, activities):
+        """
+        Resolve the users, customers and riders for a batch of activities in
+        three queries and insert the batch with one bulk_create.
+        """
+        from customer.models import Customer
+        from rider.models import Rider
+
+        user_ids, emails, phone_numbers = set(), set(), set()
+        for activity in activities:
+            user_ids.update(
+                filter(None, [activity.get("user_id"), activity.get("target_user_id")])
+            )
+            if activity.get("email"):
+                emails.add(activity["email"])
+            if activity.get("phone_number"):
+                phone_numbers.add(activity["phone_number"])
+
+        users = User.objects.filter(
+            Q(id__in=user_ids) | Q(email__in=emails) | Q(phone_number__in=phone_numbers)
+        ).values_list("id", "email", "phone_number")
+        resolved_user_ids = set()
+        users_by_email, users_by_phone_number = {}, {}
+        for user_id, email, phone_number in users:
+            resolved_user_ids.add(user_id)
+            if email:
+                users_by_email[email] = user_id
+            if phone_number:
+                users_by_phone_number[phone_number] = user_id
+        customers = dict(
+            Customer.objects.filter(user_id__in=resolved_user_ids).values_list(
+                "user_id", "id"
+            )
+        )
+        riders = dict(
+            Rider.objects.filter(user_id__in=resolved_user_ids).values_list(
+                "user_id", "id"
+            )
+        )
+
+        user_activities = []
+        for activity in activities:
+            user_id = (
+                activity.get("user_id")
+                or users_by_email.get(activity.get("email"))
+                or users_by_phone_number.get(activity.get("phone_number"))
+            )
+            if user_id not in resolved_user_ids:
+                CustomLogging.error(
+                    f"Dropping {activity['action']} activity for unknown user",
+                    extra={"activity": activity},
+                )
+                continue
+
+            customer_id, rider_id = None, None
+            if activity["user_type"] == "CUSTOMER":
+                customer_id = customers.get(user_id)
+            else:
+                rider_id = riders.get(user_id)
+            target_user_id = activity.get("target_user_id")
+            if target_user_id:
+                if activity["target_user_type"] == "CUSTOMER":
+                    customer_id = customers.get(target_user_id)
+                else:
+                    rider_id = riders.get(target_user_id)
+
+            user_activities.append(
+                UserActivity(
+                    user_id=user_id,
+                    customer_id=customer_id,
+                    rider_id=rider_id,
+                    context=activity["context"],
+                    category=activity["category"],
+                    action=activity["action"],
+                    level=activity["level"],
+                    session_id=activity["session_id"],
+                    created_at=parse_datetime(activity.get("created_at") or "")
+                    or timezone.now(),
+                )
+            )
+        UserActivity.objects.bulk_create(user_activities)
+        return len(user_activities)
+
     @classmethod
     def capture_activity(
         cls,
@@ -1,13 +1,13 @@
-# from celery import shared_task
+from celery import shared_task
+from django.db import transaction
+from django.utils import timezone
 
-from authentication.models import User
 
-
-# @shared_task(name="task.track_user_activity")
 def track_user_activity(
     context,
     category,
     action,
+    user=None,
     email=None,
     phone_number=None,
     user_type="CUSTOMER",
@@ -16,36 +16,36 @@ def track_user_activity(
     target_user_type="CUSTOMER",
     session_id=None,
 ):
-    if not email and not phone_number:
+    """
+    Queue a user activity, flush_user_activity writes the queue in bulk.
+    Pass the user when it is at hand, email or phone_number are only looked
+    up (by the consumer, not the request) when it isn't.
+    """
+    if not user and not email and not phone_number:
         return None  # probably raise an error here
 
     from authentication.service import UserActivityService
-    from customer.service import CustomerService
-    from rider.service import RiderService
 
-    if email:
-        user = User.objects.filter(email=email).first()
-    else:
-        user = User.objects.filter(phone_number=phone_number).first()
-    customer, rider = None, None
-    if user_type == "CUSTOMER":
-        customer = CustomerService.get_customer(user=user)
-    else:
-        rider = RiderService.get_rider(user=user)
-    if target_user_id:
-        target_user = User.objects.filter(id=target_user_id).first()
-        if target_user_type == "CUSTOMER":
-            customer = CustomerService.get_customer(user=target_user)
-        else:
-            rider = RiderService.get_rider(user=target_user)
+    activity = {
+        "context": context,
+        "category": category,
+        "action": action,
+        "user_id": user.id if user else None,
+        "email": email,
+        "phone_number": phone_number,
+        "user_type": user_type,
+        "level": level,
+        "target_user_id": target_user_id,
+        "target_user_type": target_user_type,
+        "session_id": session_id,
+        "created_at": timezone.now().isoformat(),
+    }
+    # queued on commit so activities of a rolled back transaction are dropped
+    transaction.on_commit(lambda: UserActivityService.enqueue_activity(activity))
+
+
+@shared_task(name="task.flush_user_activity")
+def flush_user_activity():
+    from authentication.service import UserActivityService
 
-    UserActivityService.capture_activity(
-        user=user,
-        customer=customer,
-        rider=rider,
-        context=context,
-        category=category,
-        action=action,
-        level=level,
-        session_id=session_id,
-    )
+    return UserActivityService.flush_activities()
@@ -38,10 +38,11 @@
 # admin.site.register(Business, BusinessAdmin)
 
 
-from django.contrib import admin
+from django.contrib import admin, messages
 from unfold.admin import ModelAdmin
 
-from business.models import Business
+from business.models import Business, WebhookDelivery
+from helpers.webhook import FeleWebhook
 
 
 @admin.register(Business)
@@ -69,4 +70,48 @@ class BusinessAdmin(ModelAdmin):  # Use UnfoldAdmin instead of ModelAdmin
         return False
 
     def get_queryset(self, request):
-        return self.model.objects.exclude(user__state="DELETED")
+        return self.model.objects.exclude_deleted_users("user")
+
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(ModelAdmin):
+    search_fields = ("business__business_name", "order__order_id", "event")
+    list_display = (
+        "business",
+        "event",
+        "status",
+        "attempts",
+        "response_status_code",
+        "created_at",
+        "delivered_at",
+    )
+    list_filter = ("status", "business")
+    list_select_related = ("business",)
+    readonly_fields = (
+        "business",
+        "order",
+        "event",
+        "payload",
+        "status",
+        "attempts",
+        "available_at",
+        "delivered_at",
+        "response_status_code",
+        "last_error",
+    )
+    exclude = ("state", "created_by", "deleted_by", "updated_by", "deleted_at")
+    ordering = ("-created_at",)
+    actions = ["requeue_dead_deliveries"]
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def requeue_dead_deliveries(self, request, queryset):
+        requeued = FeleWebhook.requeue_dead_deliveries(
+            id__in=list(queryset.values_list("id", flat=True))
+        )
+        self.message_user(
+            request, f"{requeued} dead deliveries requeued.", messages.SUCCESS
+        )
+
+    requeue_dead_deliveries.short_description = "Requeue dead deliveries"  # type: ignore
@@ -1,4 +1,6 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 
 from feleexpress import settings
 from helpers.db_helpers import BaseAbstractModel
@@ -37,3 +39,55 @@ class Business(BaseAbstractModel):
         db_table = "business"
         verbose_name = "business"
         verbose_name_plural = "businesses"
+
+
+class WebhookDelivery(BaseAbstractModel):
+    """
+    One webhook call to a business. Deliveries of a business are sent one at
+    a time in the order they were queued; a delivery that keeps failing is
+    kept as DEAD after BUSINESS_WEBHOOK_MAX_ATTEMPTS.
+    """
+
+    STATUS = [("PENDING", "PENDING"), ("DELIVERED", "DELIVERED"), ("DEAD", "DEAD")]
+
+    business = models.ForeignKey(
+        "business.Business",
+        on_delete=models.CASCADE,
+        verbose_name="business",
+        related_name="webhook_deliveries",
+    )
+    order = models.ForeignKey(
+        "order.Order",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="webhook_deliveries",
+    )
+    event = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=20, choices=STATUS, default="PENDING")
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    response_status_code = models.PositiveIntegerField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.event} #{self.id}"
+
+    class Meta:
+        db_table = "webhook_delivery"
+        verbose_name = "webhook delivery"
+        verbose_name_plural = "webhook deliveries"
+        indexes = [
+            models.Index(
+                fields=["available_at", "created_at"],
+                name="webhook_delivery_pending_idx",
+                condition=models.Q(status="PENDING"),
+            ),
+            models.Index(
+                fields=["business", "created_at"],
+                name="webhook_delivery_business_idx",
+                condition=models.Q(status="PENDING"),
+            ),
+        ]
@@ -1,16 +1,17 @@
 import base64
-from datetime import date
 from decimal import Decimal
 
 from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.hashers import check_password
 from django.db import transaction
+from django.db.models import Count, Q
 from django.utils import timezone
 
 from authentication.service import AuthService, UserService
 from authentication.tasks import track_user_activity
 from business.models import Business
+from helpers.cache_manager import LocalCache
 from helpers.encryption import EncryptionClass
 from helpers.exceptions import CustomAPIException, CustomFieldValidationException
 from helpers.paystack_service import PaystackService
@@ -45,7 +46,7 @@ class BusinessAuth:
                 context=data,
                 category="BUSINESS_AUTH",
                 action="BUSINESS_SIGNUP",
-                email=email,
+                user=instance_user,
                 level="SUCCESS",
                 session_id=session_id,
             )
@@ -84,7 +85,7 @@ class BusinessAuth:
             context={},
             category="BUSINESS_AUTH",
             action="BUSINESS_USER_LOGIN_ATTEMPT_SUCCESS",
-            email=user.email,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -120,16 +121,20 @@ class BusinessAuth:
         from order.service import OrderService
         from wallet.service import TransactionService
 
-        today = date.today()
+        # a range on created_at, unlike created_at__date, can use the
+        # (business, created_at) index
+        start_of_today = timezone.localtime().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
         orders = OrderService.get_order_qs(business__user=user).order_by("-created_at")[
             :10
         ]
-        total_orders = OrderService.get_order_qs(business__user=user).count()
-        today_orders = (
-            OrderService.get_order_qs(business__user=user)
-            .filter(created_at__date=today)
-            .count()
+        order_counts = OrderService.get_order_qs(business__user=user).aggregate(
+            total_orders=Count("id"),
+            today_orders=Count("id", filter=Q(created_at__gte=start_of_today)),
         )
+        total_orders = order_counts["total_orders"]
+        today_orders = order_counts["today_orders"]
         wallet_balance = user.get_user_wallet().balance
         transactions = TransactionService.get_user_transaction(user).order_by(
             "-created_at"
@@ -195,7 +200,7 @@ class BusinessAuth:
             context={},
             category="BUSINESS_AUTH",
             action="BUSINESS_USER_REGENERATE_ACCESS_TOKEN",
-            email=user.email,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -212,6 +217,9 @@ class BusinessAuth:
 
 
 class BusinessService:
+    SECRET_KEY_CACHE_MINUTES = 60
+    secret_key_cache = LocalCache(max_size=1024)
+
     @classmethod
     def create_business(cls, user, **kwargs):
         business = Business.objects.create(user=user, **kwargs)
@@ -231,7 +239,7 @@ class BusinessService:
             context={},
             category="BUSINESS_ACCOUNT",
             action="BUSINESS_UPDATE_WEBHOOK_URL",
-            email=user.email,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -275,7 +283,7 @@ class BusinessService:
             context=activity_data,
             category="USER_CARD",
             action="BUSINESS_INITIATE_CARD_TRANSACTION",
-            email=user.email,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -284,7 +292,21 @@ class BusinessService:
     @classmethod
     def get_business_user_secret_key(cls, user):
         business = BusinessService.get_business(user=user)
+        return cls.get_business_secret_key(business)
+
+    @classmethod
+    def get_business_secret_key(cls, business):
+        """
+        Decrypted secret key of the business. Decrypted keys are cached by
+        their encrypted value, so a regenerated key is never served stale.
+        """
         if business.e_secret_key is None:
             return None
-        encrypted_access_token = base64.b64decode(business.e_secret_key)
-        return EncryptionClass.decrypt_data(encrypted_access_token)
+        secret_key = cls.secret_key_cache.get(business.e_secret_key)
+        if secret_key is None:
+            encrypted_access_token = base64.b64decode(business.e_secret_key)
+            secret_key = EncryptionClass.decrypt_data(encrypted_access_token)
+            cls.secret_key_cache.set(
+                business.e_secret_key, secret_key, cls.SECRET_KEY_CACHE_MINUTES
+            )
+        return secret_key
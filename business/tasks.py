@@ -0,0 +1,15 @@
+from celery import shared_task
+
+
+@shared_task(name="task.deliver_business_webhooks")
+def deliver_business_webhooks():
+    from helpers.webhook import FeleWebhook
+
+    return FeleWebhook.deliver()
+
+
+@shared_task(name="task.purge_business_webhooks")
+def purge_business_webhooks():
+    from helpers.webhook import FeleWebhook
+
+    return FeleWebhook.purge_delivered_deliveries()
@@ -94,4 +94,4 @@ class CustomerAdmin(ModelAdmin):  # Use UnfoldAdmin instead of ModelAdmin
         return False
 
     def get_queryset(self, request):
-        return self.model.objects.exclude(user__state="DELETED")
+        return self.model.objects.exclude_deleted_users("user")
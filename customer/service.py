@@ -76,8 +76,7 @@ class CustomerService:
             context=dict(**kwargs),
             category="CUSTOMER_AUTH",
             action="CUSTOMER_UPDATE_PROFILE",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -130,8 +129,7 @@ class CustomerService:
                 context={"full_name": fullname},
                 category="CUSTOMER_AUTH",
                 action="CUSTOMER_SIGNUP",
-                email=email if email else None,
-                phone_number=phone_number if phone_number else None,
+                user=instance_user,
                 level="SUCCESS",
                 session_id=session_id,
             )
@@ -186,8 +184,7 @@ class CustomerService:
             context={"business_name": business_name},
             category="CUSTOMER_AUTH",
             action="CUSTOMER_COMPLETE_SIGNUP",
-            email=email if email else None,
-            phone_number=phone_number if phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -229,8 +226,7 @@ class CustomerService:
             action="CUSTOMER_CHANGED_PHONE_NUMBER"
             if phone_number
             else "CUSTOMER_CHANGED_EMAIL",
-            email=email if email else None,
-            phone_number=phone_number if phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -252,8 +248,7 @@ class CustomerService:
             context={"user": email or phone_number},
             category="CUSTOMER_AUTH",
             action="CUSTOMER_RESEND_OTP",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -3,6 +3,8 @@ from __future__ import absolute_import, unicode_literals
 import os
 
 from celery import Celery
+from celery.schedules import crontab
+from django.conf import settings
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "feleexpress.settings")
 
@@ -12,4 +14,40 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 
 app.autodiscover_tasks()
 
-app.conf.beat_schedule = {}
+app.conf.beat_schedule = {
+    "flush-user-activity": {
+        "task": "task.flush_user_activity",
+        "schedule": settings.USER_ACTIVITY_FLUSH_SECONDS,
+    },
+    "relay-order-outbox": {
+        "task": "task.relay_order_outbox",
+        "schedule": settings.ORDER_OUTBOX_RELAY_SECONDS,
+    },
+    "purge-order-outbox": {
+        "task": "task.purge_order_outbox",
+        "schedule": settings.ORDER_OUTBOX_PURGE_SECONDS,
+    },
+    "deliver-business-webhooks": {
+        "task": "task.deliver_business_webhooks",
+        "schedule": settings.BUSINESS_WEBHOOK_DELIVERY_SECONDS,
+    },
+    "purge-business-webhooks": {
+        "task": "task.purge_business_webhooks",
+        "schedule": settings.BUSINESS_WEBHOOK_PURGE_SECONDS,
+    },
+    "reconcile-wallet-ledger": {
+        "task": "task.reconcile_wallet_ledger",
+        "schedule": settings.LEDGER_RECONCILE_SECONDS,
+    },
+    "verify-pending-transfers": {
+        "task": "task.verify_pending_transfers",
+        "schedule": settings.TRANSFER_VERIFY_SECONDS,
+    },
+    "run-rider-settlement": {
+        "task": "task.run_rider_settlement",
+        "schedule": crontab(
+            hour=settings.RIDER_SETTLEMENT_HOUR,
+            minute=settings.RIDER_SETTLEMENT_MINUTE,
+        ),
+    },
+}
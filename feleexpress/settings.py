@@ -152,6 +152,19 @@ AWS_DEFAULT_REGION = config("AWS_DEFAULT_REGION", "")
 AWS_S3_BUCKET = config("AWS_S3_BUCKET", "")
 AWS_ACCESS_KEY = config("AWS_ACCESS_KEY", "")
 AWS_SECRET_ACCESS_KEY = config("AWS_SECRET_ACCESS_KEY", "")
+S3_PRESIGNED_UPLOAD_EXPIRY_SECONDS = config(
+    "S3_PRESIGNED_UPLOAD_EXPIRY_SECONDS", 900, cast=int
+)
+S3_PRESIGNED_UPLOAD_MAX_SIZE_MB = config(
+    "S3_PRESIGNED_UPLOAD_MAX_SIZE_MB", 10, cast=int
+)
+S3_MAX_POOL_CONNECTIONS = config("S3_MAX_POOL_CONNECTIONS", 20, cast=int)
+S3_MULTIPART_THRESHOLD_MB = config("S3_MULTIPART_THRESHOLD_MB", 8, cast=int)
+S3_MULTIPART_CHUNK_SIZE_MB = config("S3_MULTIPART_CHUNK_SIZE_MB", 8, cast=int)
+S3_MAX_CONCURRENCY = config("S3_MAX_CONCURRENCY", 4, cast=int)
+IMAGE_RENDITION_MEDIUM_SIZE = config("IMAGE_RENDITION_MEDIUM_SIZE", 1280, cast=int)
+IMAGE_RENDITION_THUMBNAIL_SIZE = config("IMAGE_RENDITION_THUMBNAIL_SIZE", 256, cast=int)
+IMAGE_RENDITION_QUALITY = config("IMAGE_RENDITION_QUALITY", 80, cast=int)
 
 USE_S3 = config("USE_S3", cast=bool, default=True)
 if USE_S3:
@@ -200,6 +213,71 @@ CELERY_BEAT_MAX_LOOP_INTERVAL = 2
 CELERY_MAX_RETRY = config("CELERY_MAX_RETRY", default=3, cast=int)
 CELERY_RETRY_DELAY = config("CELERY_RETRY_DELAY", default=5, cast=int)
 
+USER_ACTIVITY_BATCH_SIZE = config("USER_ACTIVITY_BATCH_SIZE", 500, cast=int)
+USER_ACTIVITY_MAX_BATCHES = config("USER_ACTIVITY_MAX_BATCHES", 20, cast=int)
+USER_ACTIVITY_FLUSH_SECONDS = config("USER_ACTIVITY_FLUSH_SECONDS", 5, cast=int)
+USER_ACTIVITY_FLUSH_LOCK_SECONDS = config(
+    "USER_ACTIVITY_FLUSH_LOCK_SECONDS", 120, cast=int
+)
+
+ORDER_OUTBOX_RELAY_SECONDS = config("ORDER_OUTBOX_RELAY_SECONDS", 10, cast=int)
+ORDER_OUTBOX_BATCH_SIZE = config("ORDER_OUTBOX_BATCH_SIZE", 100, cast=int)
+ORDER_OUTBOX_MAX_BATCHES = config("ORDER_OUTBOX_MAX_BATCHES", 10, cast=int)
+ORDER_OUTBOX_MAX_ATTEMPTS = config("ORDER_OUTBOX_MAX_ATTEMPTS", 8, cast=int)
+ORDER_OUTBOX_BACKOFF_SECONDS = config("ORDER_OUTBOX_BACKOFF_SECONDS", 5, cast=int)
+# how long a relay owns the events it picked up before another relay may retry them
+ORDER_OUTBOX_LEASE_SECONDS = config("ORDER_OUTBOX_LEASE_SECONDS", 120, cast=int)
+# sent events are deleted after ORDER_OUTBOX_RETENTION_DAYS
+ORDER_OUTBOX_RETENTION_DAYS = config("ORDER_OUTBOX_RETENTION_DAYS", 7, cast=int)
+ORDER_OUTBOX_PURGE_SECONDS = config("ORDER_OUTBOX_PURGE_SECONDS", 3600, cast=int)
+
+BUSINESS_WEBHOOK_DELIVERY_SECONDS = config(
+    "BUSINESS_WEBHOOK_DELIVERY_SECONDS", 10, cast=int
+)
+BUSINESS_WEBHOOK_BATCH_SIZE = config("BUSINESS_WEBHOOK_BATCH_SIZE", 100, cast=int)
+BUSINESS_WEBHOOK_MAX_BATCHES = config("BUSINESS_WEBHOOK_MAX_BATCHES", 10, cast=int)
+# deliveries of one business sent one after another in a batch
+BUSINESS_WEBHOOK_DELIVERIES_PER_BUSINESS = config(
+    "BUSINESS_WEBHOOK_DELIVERIES_PER_BUSINESS", 20, cast=int
+)
+BUSINESS_WEBHOOK_MAX_ATTEMPTS = config("BUSINESS_WEBHOOK_MAX_ATTEMPTS", 8, cast=int)
+BUSINESS_WEBHOOK_BACKOFF_SECONDS = config(
+    "BUSINESS_WEBHOOK_BACKOFF_SECONDS", 10, cast=int
+)
+BUSINESS_WEBHOOK_LEASE_SECONDS = config("BUSINESS_WEBHOOK_LEASE_SECONDS", 120, cast=int)
+BUSINESS_WEBHOOK_TIMEOUT_SECONDS = config(
+    "BUSINESS_WEBHOOK_TIMEOUT_SECONDS", 5, cast=float
+)
+BUSINESS_WEBHOOK_MAX_CONCURRENCY = config(
+    "BUSINESS_WEBHOOK_MAX_CONCURRENCY", 8, cast=int
+)
+# hold new deliveries this long so further updates of the order replace them
+BUSINESS_WEBHOOK_COALESCE_SECONDS = config(
+    "BUSINESS_WEBHOOK_COALESCE_SECONDS", 0, cast=int
+)
+# delivered deliveries are deleted after BUSINESS_WEBHOOK_RETENTION_DAYS
+BUSINESS_WEBHOOK_RETENTION_DAYS = config("BUSINESS_WEBHOOK_RETENTION_DAYS", 7, cast=int)
+BUSINESS_WEBHOOK_PURGE_SECONDS = config(
+    "BUSINESS_WEBHOOK_PURGE_SECONDS", 3600, cast=int
+)
+
+# a wallet balance snapshot is taken every LEDGER_SNAPSHOT_INTERVAL ledger entries
+LEDGER_SNAPSHOT_INTERVAL = config("LEDGER_SNAPSHOT_INTERVAL", 100, cast=int)
+LEDGER_RECONCILE_SECONDS = config("LEDGER_RECONCILE_SECONDS", 3600, cast=int)
+LEDGER_RECONCILE_BATCH_SIZE = config("LEDGER_RECONCILE_BATCH_SIZE", 500, cast=int)
+
+# pending paystack transfers without a webhook after TRANSFER_VERIFY_AFTER_SECONDS
+# are checked with paystack every TRANSFER_VERIFY_SECONDS
+TRANSFER_VERIFY_SECONDS = config("TRANSFER_VERIFY_SECONDS", 900, cast=int)
+TRANSFER_VERIFY_AFTER_SECONDS = config("TRANSFER_VERIFY_AFTER_SECONDS", 1800, cast=int)
+TRANSFER_VERIFY_BATCH_SIZE = config("TRANSFER_VERIFY_BATCH_SIZE", 100, cast=int)
+
+# daily rider payout, in TIME_ZONE
+RIDER_SETTLEMENT_HOUR = config("RIDER_SETTLEMENT_HOUR", 23, cast=int)
+RIDER_SETTLEMENT_MINUTE = config("RIDER_SETTLEMENT_MINUTE", 30, cast=int)
+RIDER_SETTLEMENT_MIN_PAYOUT = config("RIDER_SETTLEMENT_MIN_PAYOUT", 1000, cast=int)
+RIDER_SETTLEMENT_LOCK_SECONDS = config("RIDER_SETTLEMENT_LOCK_SECONDS", 3600, cast=int)
+
 REST_FRAMEWORK = {
     # Use Django's standard `django.contrib.auth` permissions,
     # or allow read-only access for unauthenticated users.
@@ -391,6 +469,29 @@ def permission_callback(request):
 LOGIN_URL = "/admin/login"
 
 FELE_CHARGE = config("FELE_CHARGE", 16, cast=int)
+RIDER_COMMISSION_CACHE_MINUTES = config("RIDER_COMMISSION_CACHE_MINUTES", 60, cast=int)
+RIDER_STATS_CACHE_MINUTES = config("RIDER_STATS_CACHE_MINUTES", 10, cast=int)
+VEHICLE_TARIFF_MAX_AGE_SECONDS = config("VEHICLE_TARIFF_MAX_AGE_SECONDS", 300, cast=int)
+
+RIDER_DISPATCH_RADIUS_KM = config("RIDER_DISPATCH_RADIUS_KM", 5, cast=float)
+RIDER_DISPATCH_MAX_RIDERS = config("RIDER_DISPATCH_MAX_RIDERS", 10, cast=int)
+# notify every free on-duty rider when nobody nearby has reported a position
+RIDER_DISPATCH_FALLBACK_TO_BROADCAST = config(
+    "RIDER_DISPATCH_FALLBACK_TO_BROADCAST", True, cast=bool
+)
+RIDER_LOCATION_STALE_SECONDS = config("RIDER_LOCATION_STALE_SECONDS", 300, cast=int)
+RIDER_LOCATION_CONTEXT_SECONDS = config("RIDER_LOCATION_CONTEXT_SECONDS", 60, cast=int)
+RIDER_LOCATION_MAX_BATCH_SIZE = config("RIDER_LOCATION_MAX_BATCH_SIZE", 100, cast=int)
+# keep a trail point once the rider has moved this far or waited this long
+RIDER_TRAIL_MIN_DISTANCE_METERS = config(
+    "RIDER_TRAIL_MIN_DISTANCE_METERS", 25, cast=float
+)
+RIDER_TRAIL_MIN_INTERVAL_SECONDS = config(
+    "RIDER_TRAIL_MIN_INTERVAL_SECONDS", 30, cast=int
+)
+RIDER_TRAIL_MAX_POINTS = config("RIDER_TRAIL_MAX_POINTS", 5000, cast=int)
+RIDER_TRAIL_SEGMENT_POINTS = config("RIDER_TRAIL_SEGMENT_POINTS", 500, cast=int)
+RIDER_TRAIL_TTL_SECONDS = config("RIDER_TRAIL_TTL_SECONDS", 86400, cast=int)
 
 SENDGRID_API_KEY = config("SENDGRID_API_KEY", "")
 SENDER_EMAIL = config("SENDER_EMAIL", "")
@@ -418,14 +519,46 @@ ENABLED_IP_LOOKUP = config("ENABLED_IP_LOOKUP", cast=bool, default=False)
 ONE_SIGNAL_KEY = config("ONE_SIGNAL_KEY", "")
 ONE_SIGNAL_APP_ID = config("ONE_SIGNAL_APP_ID", "")
 ONE_SIGNAL_SMS_FROM = config("ONE_SIGNAL_SMS_FROM", "")
+NOTIFICATION_BULK_CREATE_BATCH_SIZE = config(
+    "NOTIFICATION_BULK_CREATE_BATCH_SIZE", 500, cast=int
+)
 
 TERMII_API_KEY = config("TERMII_API_KEY", "")
 TERMII_SECRET_KEY = config("TERMII_SECRET_KEY", "")
 TERMII_SMS_FROM = config("TERMII_SMS_FROM", "")
 
+# outbound HTTP client shared by third party integrations (helpers/http_client.py)
+HTTP_CONNECT_TIMEOUT = config("HTTP_CONNECT_TIMEOUT", 3.05, cast=float)
+HTTP_READ_TIMEOUT = config("HTTP_READ_TIMEOUT", 10, cast=float)
+HTTP_MAX_RETRIES = config("HTTP_MAX_RETRIES", 2, cast=int)
+HTTP_BACKOFF_SECONDS = config("HTTP_BACKOFF_SECONDS", 0.2, cast=float)
+HTTP_POOL_SIZE = config("HTTP_POOL_SIZE", 20, cast=int)
+
 GOOGLE_API_KEY = config("GOOGLE_API_KEY", "")
 GOOGLE_SEARCH_LOCATION = config("GOOGLE_SEARCH_LOCATION", cast=str)
 GOOGLE_SEARCH_RADIUS = config("GOOGLE_SEARCH_RADIUS", cast=int)
+# number of decimal places coordinates are rounded to when building cache keys
+# (4 places is roughly an 11m grid)
+GOOGLE_MAPS_CACHE_PRECISION = config("GOOGLE_MAPS_CACHE_PRECISION", 4, cast=int)
+GOOGLE_MAPS_CACHE_MINUTES = config("GOOGLE_MAPS_CACHE_MINUTES", 10080, cast=int)
+GOOGLE_MAPS_NEGATIVE_CACHE_MINUTES = config(
+    "GOOGLE_MAPS_NEGATIVE_CACHE_MINUTES", 60, cast=int
+)
+GOOGLE_MAPS_LOCAL_CACHE_MINUTES = config(
+    "GOOGLE_MAPS_LOCAL_CACHE_MINUTES", 60, cast=int
+)
+GOOGLE_MAPS_LOCAL_CACHE_SIZE = config("GOOGLE_MAPS_LOCAL_CACHE_SIZE", 2048, cast=int)
+GOOGLE_MAPS_MAX_CONCURRENCY = config("GOOGLE_MAPS_MAX_CONCURRENCY", 8, cast=int)
+# geohash length used to snap route origins/destinations (7 characters is ~150m)
+GOOGLE_MAPS_ROUTE_GEOHASH_PRECISION = config(
+    "GOOGLE_MAPS_ROUTE_GEOHASH_PRECISION", 7, cast=int
+)
+GOOGLE_MAPS_ROUTE_CACHE_MINUTES = config(
+    "GOOGLE_MAPS_ROUTE_CACHE_MINUTES", 1440, cast=int
+)
+GOOGLE_MAPS_ROUTE_TIME_BUCKET_HOURS = config(
+    "GOOGLE_MAPS_ROUTE_TIME_BUCKET_HOURS", 3, cast=int
+)
 
 DEACTIVATION_PREPEND_VALUE = config(
     "DEACTIVATION_PREPEND_VALUE", default="fele_deactivated_user"
@@ -1,4 +1,6 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models import ProtectedError
 
 
 class BaseModelAdmin(admin.ModelAdmin):
@@ -11,8 +13,16 @@ class BaseModelAdmin(admin.ModelAdmin):
         return actions
 
     def hard_deleted_selected(self, request, queryset):
-        for record in queryset:
-            record.hard_delete()
+        try:
+            if hasattr(queryset, "hard_delete"):
+                queryset.hard_delete()
+            else:
+                # e.g. users, whose manager returns a plain QuerySet
+                with transaction.atomic():
+                    for record in queryset:
+                        record.hard_delete()
+        except (ValueError, ProtectedError) as e:
+            self.message_user(request, e.args[0], messages.ERROR)
 
     hard_deleted_selected.short_description = "Hard Delete Selected"  # type: ignore
 
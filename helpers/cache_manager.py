@@ -1,8 +1,13 @@
-from typing import Any
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List
 
 from django.conf import settings
 from django.core.cache import cache
 
+from helpers.logger import CustomLogging
+
 
 class CacheManager:
     """Utility class that abstracts interation with the caching engine"""
@@ -26,9 +31,31 @@ class CacheManager:
         return cache.get(key)
 
     @classmethod
-    def delete_key(cls, key: str) -> None:
+    def delete_key(cls, key: str) -> bool:
+        """:returns: whether the key was there to delete"""
         key = f"{settings.ENVIRONMENT}:{key}"
-        cache.delete(key)
+        return bool(cache.delete(key))
+
+    @classmethod
+    def set_keys(cls, data: Dict[str, Any], minutes: int = None) -> None:
+        timeout = None
+        if minutes:
+            timeout = 60 * minutes
+        cache.set_many(
+            {f"{settings.ENVIRONMENT}:{key}": value for key, value in data.items()},
+            timeout=timeout,
+        )
+
+    @classmethod
+    def retrieve_keys(cls, keys: List[str]) -> Dict[str, Any]:
+        """Returns {key: data} for the keys found in the cache"""
+        prefix = f"{settings.ENVIRONMENT}:"
+        data = cache.get_many([f"{prefix}{key}" for key in keys])
+        return {key[len(prefix) :]: value for key, value in data.items()}
+
+    @classmethod
+    def delete_keys(cls, keys: List[str]) -> None:
+        cache.delete_many([f"{settings.ENVIRONMENT}:{key}" for key in keys])
 
     @classmethod
     def retrieve_all_cache_data(cls, key=None):
@@ -42,6 +69,134 @@ class CacheManager:
         return all_cache_data
 
 
+class LocalCache:
+    """Thread-safe, in-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return data
+
+    def set(self, key: str, data: Any, minutes: int = None) -> None:
+        expires_at = time.monotonic() + 60 * minutes if minutes else None
+        with self._lock:
+            self._data[key] = (expires_at, data)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class TieredCache:
+    """
+    Read-through cache that checks the in-process LRU first, then redis
+    (through CacheManager), and only then calls the fetch function.
+    Empty results are cached for `negative_minutes` so repeated lookups for
+    unknown data don't go back to the source on every request.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        minutes: int,
+        negative_minutes: int = None,
+        local_minutes: int = None,
+        max_size: int = 1024,
+    ):
+        self.namespace = namespace
+        self.minutes = minutes
+        self.negative_minutes = negative_minutes or minutes
+        self.local_minutes = local_minutes or minutes
+        self.local_cache = LocalCache(max_size=max_size)
+        self.stats = Counter()
+
+    def get(self, key: str) -> Any:
+        key = f"{self.namespace}:{key}"
+        data = self.local_cache.get(key)
+        if data is not None:
+            self.stats["local_hit"] += 1
+            return data
+
+        data = self._retrieve_remote(key)
+        if data is not None:
+            self.stats["remote_hit"] += 1
+            self.local_cache.set(key, data, self.local_minutes)
+            return data
+
+        self.stats["miss"] += 1
+        return None
+
+    def set(self, key: str, data: Any, is_empty: bool = False) -> None:
+        key = f"{self.namespace}:{key}"
+        minutes = self.negative_minutes if is_empty else self.minutes
+        self.local_cache.set(key, data, min(minutes, self.local_minutes))
+        self._set_remote(key, data, minutes)
+
+    def get_or_set(
+        self,
+        key: str,
+        fetch: Callable[[], Any],
+        is_empty: Callable[[Any], bool],
+        is_cacheable: Callable[[Any], bool] = None,
+    ) -> Any:
+        data = self.get(key)
+        if data is not None:
+            return data
+
+        data = fetch()
+        if is_cacheable is None or is_cacheable(data):
+            self.set(key, data, is_empty=is_empty(data))
+        return data
+
+    def delete(self, key: str) -> None:
+        key = f"{self.namespace}:{key}"
+        self.local_cache.delete(key)
+        try:
+            CacheManager.delete_key(key)
+        except Exception as e:
+            CustomLogging.error(f"Unable to delete cache key {key}: {str(e)}")
+
+    def get_stats(self) -> dict:
+        return {
+            "local_hit": self.stats["local_hit"],
+            "remote_hit": self.stats["remote_hit"],
+            "miss": self.stats["miss"],
+        }
+
+    def _retrieve_remote(self, key: str) -> Any:
+        # the cache is an optimization; an unreachable redis must not fail requests
+        try:
+            return CacheManager.retrieve_key(key)
+        except Exception as e:
+            CustomLogging.error(f"Unable to retrieve cache key {key}: {str(e)}")
+            return None
+
+    def _set_remote(self, key: str, data: Any, minutes: int) -> None:
+        try:
+            CacheManager.set_key(key, data, minutes)
+        except Exception as e:
+            CustomLogging.error(f"Unable to set cache key {key}: {str(e)}")
+
+
 class KeyBuilder:
     @staticmethod
     def user_auth_verification(email):
@@ -54,3 +209,59 @@ class KeyBuilder:
     @staticmethod
     def initiate_order(order_id):
         return f"customer:order:{order_id}"
+
+    @staticmethod
+    def geocode_address(address):
+        return f"address:{address}"
+
+    @staticmethod
+    def geocode_latitude_and_longitude(latitude, longitude):
+        return f"latlng:{latitude},{longitude}"
+
+    @staticmethod
+    def search_address(query):
+        return f"search:{query}"
+
+    @staticmethod
+    def route_distance(origin_geohash, destination_geohash, mode, time_bucket):
+        return f"route:{mode}:{time_bucket}:{origin_geohash}:{destination_geohash}"
+
+    @staticmethod
+    def user_activity_queue():
+        return "user:activity-queue"
+
+    @staticmethod
+    def rider_locations(vehicle_id):
+        return f"rider:locations:{vehicle_id}"
+
+    @staticmethod
+    def rider_location_seen(vehicle_id):
+        return f"rider:location-seen:{vehicle_id}"
+
+    @staticmethod
+    def rider_active_order(rider_id):
+        return f"rider:active-order:{rider_id}"
+
+    @staticmethod
+    def rider_on_duty(rider_id):
+        return f"rider:on-duty:{rider_id}"
+
+    @staticmethod
+    def rider_trail(rider_id):
+        return f"rider:trail:{rider_id}"
+
+    @staticmethod
+    def rider_settlement_lock():
+        return "rider:settlement-lock"
+
+    @staticmethod
+    def rider_fele_charge(rider_id):
+        return f"rider:fele-charge:{rider_id}"
+
+    @staticmethod
+    def rider_stats(rider_id, date):
+        return f"rider:stats:{rider_id}:{date}"
+
+    @staticmethod
+    def presigned_upload(key):
+        return f"upload:presigned:{key}"
@@ -4,6 +4,7 @@ import uuid
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import OperationalError, models, transaction
+from django.db.models import Exists, OuterRef
 from django.db.models.query import QuerySet
 from django.http import Http404
 from django.utils import timezone
@@ -17,9 +18,47 @@ class BaseQuerySet(QuerySet):
     def delete(self):
         return super(BaseQuerySet, self).update(deleted_at=timezone.now())
 
+    def hard_delete(self):
+        """
+        Hard deleting, removing the records' S3 files in bulk once the delete
+        is committed. Records of a model that overrides hard_delete (e.g. to
+        forbid it) go through their own hard_delete one by one instead.
+        """
+        if self.model.hard_delete is not BaseAbstractModel.hard_delete:
+            with transaction.atomic(using=self.db):
+                for record in self:
+                    record.hard_delete()
+            return
+        image_urls = [
+            image_url for record in self for image_url in record.get_file_urls()
+        ]
+        deleted = super(BaseQuerySet, self).delete()
+        delete_files_on_commit(image_urls, using=self.db)
+        return deleted
+
     def alive(self):
         return self.filter(deleted_at=None)
 
+    def exclude_deleted_users(self, *user_paths):
+        """
+        Exclude records whose user, reached through each of `user_paths`
+        (e.g. "user", "rider__user"), has been deleted. Uses NOT EXISTS on the
+        first relation instead of joining every user into the query, which lets
+        the database anti-join against the few deleted users.
+        """
+        queryset = self
+        for user_path in user_paths:
+            relation, _, related_user_path = user_path.partition("__")
+            field = self.model._meta.get_field(relation)
+            state_lookup = (
+                f"{related_user_path}__state" if related_user_path else "state"
+            )
+            deleted_users = field.related_model._base_manager.filter(
+                pk=OuterRef(field.attname), **{state_lookup: "DELETED"}
+            )
+            queryset = queryset.exclude(Exists(deleted_users))
+        return queryset
+
     def dead(self):
         return self.exclude(deleted_at=None)
 
@@ -34,6 +73,22 @@ class BaseManager(models.Manager):
             return BaseQuerySet(self.model).filter(deleted_at=None)
         return BaseQuerySet(self.model)
 
+    def exclude_deleted_users(self, *user_paths):
+        return self.get_queryset().exclude_deleted_users(*user_paths)
+
+
+def delete_files_on_commit(image_urls, using=None):
+    """
+    Remove S3 files of deleted records once the delete is committed, so a
+    delete that fails or is rolled back keeps its files
+    """
+    if image_urls:
+        transaction.on_commit(
+            lambda: S3Uploader().hard_delete_objects(image_urls),
+            using=using,
+            robust=True,
+        )
+
 
 def generate_id():
     return uuid.uuid4().hex
@@ -112,14 +167,20 @@ class BaseAbstractModel(models.Model):
             self.deleted_by = actor
             return self.save()
 
+    def get_file_urls(self):
+        """S3 files that are removed along with the record on hard delete"""
+        return []
+
     def hard_delete(self, using=None, keep_parents=False, image_url=None, commit=True):
-        """Hard deleting"""
-        if image_url:
-            S3Uploader().hard_delete_object(image_url)
+        """Hard deleting; the S3 files are removed once the delete is committed"""
+        image_urls = [image_url] if image_url else self.get_file_urls()
+        deleted = None
         if commit:
-            return super(BaseAbstractModel, self).delete(
+            deleted = super(BaseAbstractModel, self).delete(
                 using=using, keep_parents=keep_parents
             )
+        delete_files_on_commit(image_urls, using=using)
+        return deleted
 
     def save(self, actor=None, *args, **kwargs):
         actor = kwargs.pop("actor", None)
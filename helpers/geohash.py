@@ -0,0 +1,33 @@
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode(latitude: float, longitude: float, precision: int = 7) -> str:
+    """
+    Encode a coordinate as a geohash string. Nearby points share a prefix,
+    and each extra character narrows the cell (7 characters is ~150m).
+    """
+    latitude_range = [-90.0, 90.0]
+    longitude_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even_bit = True
+    while len(geohash) < precision:
+        if even_bit:
+            value, value_range = float(longitude), longitude_range
+        else:
+            value, value_range = float(latitude), latitude_range
+        middle = (value_range[0] + value_range[1]) / 2
+        if value >= middle:
+            bits = (bits << 1) | 1
+            value_range[0] = middle
+        else:
+            bits = bits << 1
+            value_range[1] = middle
+        even_bit = not even_bit
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(geohash)
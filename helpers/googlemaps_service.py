@@ -1,14 +1,63 @@
+import re
 from urllib.parse import quote
 
-import requests
 from django.conf import settings
 
+from helpers.cache_manager import KeyBuilder, TieredCache
+from helpers.http_client import HttpClient
+
+LATITUDE_AND_LONGITUDE_REGEX = re.compile(
+    r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$"
+)
+
 
 class GoogleMapsService:
     SECRET_KEY = settings.GOOGLE_API_KEY
     GOOGLE_SEARCH_LOCATION = settings.GOOGLE_SEARCH_LOCATION
     GOOGLE_SEARCH_RADIUS = settings.GOOGLE_SEARCH_RADIUS
     BASE_URL = "https://maps.googleapis.com/maps/api"
+    CACHE_PRECISION = settings.GOOGLE_MAPS_CACHE_PRECISION
+    # distance matrix request limits, see
+    # https://developers.google.com/maps/documentation/distance-matrix/usage-and-billing
+    DISTANCE_MATRIX_MAX_LOCATIONS = 25
+    DISTANCE_MATRIX_MAX_ELEMENTS = 100
+    DISTANCE_MATRIX_LIMIT_STATUSES = [
+        "MAX_ELEMENTS_EXCEEDED",
+        "MAX_DIMENSIONS_EXCEEDED",
+    ]
+    # statuses worth remembering; quota and auth errors are retried next time
+    CACHEABLE_STATUSES = ["OK", "ZERO_RESULTS"]
+    geocode_cache = TieredCache(
+        namespace="google-maps:geocode",
+        minutes=settings.GOOGLE_MAPS_CACHE_MINUTES,
+        negative_minutes=settings.GOOGLE_MAPS_NEGATIVE_CACHE_MINUTES,
+        local_minutes=settings.GOOGLE_MAPS_LOCAL_CACHE_MINUTES,
+        max_size=settings.GOOGLE_MAPS_LOCAL_CACHE_SIZE,
+    )
+
+    @classmethod
+    def normalize_coordinate(cls, value) -> str:
+        return f"{round(float(value), cls.CACHE_PRECISION):.{cls.CACHE_PRECISION}f}"
+
+    @classmethod
+    def normalize_query(cls, query: str) -> str:
+        match = LATITUDE_AND_LONGITUDE_REGEX.match(str(query))
+        if match:
+            latitude, longitude = match.groups()
+            return f"{cls.normalize_coordinate(latitude)},{cls.normalize_coordinate(longitude)}"
+        return " ".join(str(query).split()).casefold()
+
+    @classmethod
+    def get_cache_stats(cls) -> dict:
+        return cls.geocode_cache.get_stats()
+
+    @staticmethod
+    def _has_no_results(response: dict) -> bool:
+        return len(response.get("results", [])) < 1
+
+    @classmethod
+    def _is_cacheable(cls, response: dict) -> bool:
+        return response.get("status") in cls.CACHEABLE_STATUSES
 
     @classmethod
     def get_address_details(cls, address: str) -> dict:
@@ -87,10 +136,19 @@ class GoogleMapsService:
             ],
             "status": "OK",
         } """
-        encoded_address = quote(address)
-        url = f"{cls.BASE_URL}/geocode/json?address={encoded_address}&key={cls.SECRET_KEY}"
-        response = requests.get(url)
-        return response.json()
+
+        def fetch():
+            encoded_address = quote(address)
+            url = f"{cls.BASE_URL}/geocode/json?address={encoded_address}&key={cls.SECRET_KEY}"
+            response = HttpClient.get("google_maps", url)
+            return response.json()
+
+        return cls.geocode_cache.get_or_set(
+            KeyBuilder.geocode_address(cls.normalize_query(address)),
+            fetch,
+            cls._has_no_results,
+            cls._is_cacheable,
+        )
 
     @classmethod
     def get_latitude_and_longitude_details(cls, latitude, longitude):
@@ -267,9 +325,20 @@ class GoogleMapsService:
             ],
             "status": "OK",
         } """
-        url = f"{cls.BASE_URL}/geocode/json?latlng={latitude},{longitude}&key={cls.SECRET_KEY}"
-        response = requests.get(url)
-        return response.json()
+
+        def fetch():
+            url = f"{cls.BASE_URL}/geocode/json?latlng={latitude},{longitude}&key={cls.SECRET_KEY}"
+            response = HttpClient.get("google_maps", url)
+            return response.json()
+
+        return cls.geocode_cache.get_or_set(
+            KeyBuilder.geocode_latitude_and_longitude(
+                cls.normalize_coordinate(latitude), cls.normalize_coordinate(longitude)
+            ),
+            fetch,
+            cls._has_no_results,
+            cls._is_cacheable,
+        )
 
     @classmethod
     def get_distance_matrix(cls, origin_latlng, destination_latlng, mode="driving"):
@@ -296,9 +365,18 @@ class GoogleMapsService:
         } """
 
         url = f"{cls.BASE_URL}/distancematrix/json?origins={origin_latlng}&destinations={destination_latlng}&mode={mode}&key={cls.SECRET_KEY}"
-        response = requests.get(url)
+        response = HttpClient.get("google_maps", url)
         return response.json()
 
+    @classmethod
+    def get_batch_distance_matrix(cls, origins, destinations, mode="driving"):
+        """
+        Same as get_distance_matrix but for several origins and destinations
+        in one request. Row `i` of the response holds the elements from
+        origins[i] to every destination, in order.
+        """
+        return cls.get_distance_matrix("|".join(origins), "|".join(destinations), mode)
+
     @classmethod
     def search_address(cls, query):
         """ sample_response = {
@@ -383,7 +461,16 @@ class GoogleMapsService:
             ],
             "status": "OK",
         } """
-        encoded_address = quote(query)
-        url = f"{cls.BASE_URL}/place/textsearch/json?query={encoded_address}&key={cls.SECRET_KEY}&location={cls.GOOGLE_SEARCH_LOCATION}&radius={cls.GOOGLE_SEARCH_RADIUS}"
-        response = requests.get(url)
-        return response.json()
+
+        def fetch():
+            encoded_address = quote(query)
+            url = f"{cls.BASE_URL}/place/textsearch/json?query={encoded_address}&key={cls.SECRET_KEY}&location={cls.GOOGLE_SEARCH_LOCATION}&radius={cls.GOOGLE_SEARCH_RADIUS}"
+            response = HttpClient.get("google_maps", url)
+            return response.json()
+
+        return cls.geocode_cache.get_or_set(
+            KeyBuilder.search_address(cls.normalize_query(query)),
+            fetch,
+            cls._has_no_results,
+            cls._is_cacheable,
+        )
@@ -0,0 +1,154 @@
+import bisect
+import random
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from helpers.logger import CustomLogging
+
+
+class LatencyHistogram:
+    """Bucketed request latencies (in milliseconds) for one integration"""
+
+    BUCKETS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.errors = 0
+        self.total = 0
+        self.total_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, duration_ms: float, failed: bool = False) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.BUCKETS, duration_ms)] += 1
+            self.total += 1
+            self.total_ms += duration_ms
+            if failed:
+                self.errors += 1
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            buckets = {
+                f"le_{bucket}ms": count
+                for bucket, count in zip(self.BUCKETS, self.counts)
+            }
+            buckets["gt_10000ms"] = self.counts[-1]
+            return {
+                "count": self.total,
+                "errors": self.errors,
+                "average_ms": round(self.total_ms / self.total, 2) if self.total else 0,
+                "buckets": buckets,
+            }
+
+
+class HttpClient:
+    """
+    Shared outbound HTTP layer for third party integrations.
+
+    Keeps one keep-alive session (and connection pool) per host, always sends
+    a connect/read timeout, retries idempotent requests with jittered
+    exponential backoff and records per-integration latency.
+    """
+
+    CONNECT_TIMEOUT = settings.HTTP_CONNECT_TIMEOUT
+    READ_TIMEOUT = settings.HTTP_READ_TIMEOUT
+    MAX_RETRIES = settings.HTTP_MAX_RETRIES
+    BACKOFF_SECONDS = settings.HTTP_BACKOFF_SECONDS
+    POOL_SIZE = settings.HTTP_POOL_SIZE
+    IDEMPOTENT_METHODS = ["GET", "HEAD", "OPTIONS", "PUT", "DELETE"]
+    RETRY_STATUS_CODES = [502, 503, 504]
+
+    _sessions: Dict[str, requests.Session] = {}
+    _latency: Dict[str, LatencyHistogram] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_session(cls, url: str) -> requests.Session:
+        parsed_url = urlsplit(url)
+        host = f"{parsed_url.scheme}://{parsed_url.netloc}"
+        session = cls._sessions.get(host)
+        if session is None:
+            with cls._lock:
+                session = cls._sessions.get(host)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=1, pool_maxsize=cls.POOL_SIZE
+                    )
+                    session.mount(f"{parsed_url.scheme}://", adapter)
+                    cls._sessions[host] = session
+        return session
+
+    @classmethod
+    def request(
+        cls, integration: str, method: str, url: str, retry: bool = None, **kwargs
+    ) -> requests.Response:
+        """
+        :params integration: name the latency is recorded under (e.g. paystack)
+        :params retry: retry transient failures; defaults to True only for
+            idempotent methods so payments and messages are never sent twice
+        """
+        method = method.upper()
+        if retry is None:
+            retry = method in cls.IDEMPOTENT_METHODS
+        kwargs.setdefault("timeout", (cls.CONNECT_TIMEOUT, cls.READ_TIMEOUT))
+        attempts = cls.MAX_RETRIES + 1 if retry else 1
+        session = cls.get_session(url)
+
+        for attempt in range(1, attempts + 1):
+            start = time.monotonic()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                cls._observe(integration, start, failed=True)
+                if attempt == attempts:
+                    raise
+                CustomLogging.error(
+                    f"{integration} request to {urlsplit(url).netloc} failed, retrying: {str(e)}"
+                )
+            else:
+                failed = response.status_code >= 500
+                cls._observe(integration, start, failed=failed)
+                if response.status_code not in cls.RETRY_STATUS_CODES or (
+                    attempt == attempts
+                ):
+                    return response
+            cls._backoff(attempt)
+
+    @classmethod
+    def get(cls, integration: str, url: str, **kwargs) -> requests.Response:
+        return cls.request(integration, "GET", url, **kwargs)
+
+    @classmethod
+    def post(cls, integration: str, url: str, **kwargs) -> requests.Response:
+        return cls.request(integration, "POST", url, **kwargs)
+
+    @classmethod
+    def delete(cls, integration: str, url: str, **kwargs) -> requests.Response:
+        return cls.request(integration, "DELETE", url, **kwargs)
+
+    @classmethod
+    def get_latency_stats(cls) -> Dict:
+        return {
+            integration: histogram.to_dict()
+            for integration, histogram in cls._latency.items()
+        }
+
+    @classmethod
+    def _observe(cls, integration: str, start: float, failed: bool = False) -> None:
+        histogram = cls._latency.get(integration)
+        if histogram is None:
+            with cls._lock:
+                histogram = cls._latency.setdefault(integration, LatencyHistogram())
+        histogram.observe((time.monotonic() - start) * 1000, failed=failed)
+
+    @classmethod
+    def _backoff(cls, attempt: int) -> None:
+        # full jitter: sleep somewhere between 0 and the exponential ceiling
+        time.sleep(random.uniform(0, cls.BACKOFF_SECONDS * (2 ** (attempt - 1))))
@@ -0,0 +1,80 @@
+import io
+
+from django.conf import settings
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from helpers.logger import CustomLogging
+from helpers.s3_uploader import S3Uploader
+
+
+class ImageRenditionService:
+    """
+    Compressed, EXIF-stripped copies of uploaded photos, stored next to the
+    original as "<key>.<rendition>.webp" (JPEG where Pillow has no WebP
+    support). Renditions keep the aspect ratio and are never upscaled.
+    """
+
+    @classmethod
+    def get_rendition_sizes(cls):
+        """{rendition name: longest side in pixels}, largest first"""
+        return {
+            "medium": settings.IMAGE_RENDITION_MEDIUM_SIZE,
+            "thumbnail": settings.IMAGE_RENDITION_THUMBNAIL_SIZE,
+        }
+
+    @classmethod
+    def get_output_format(cls):
+        if features.check("webp"):
+            return "WEBP", "webp", "image/webp"
+        return "JPEG", "jpg", "image/jpeg"
+
+    @classmethod
+    def create_renditions(cls, file_url):
+        """
+        :returns: {rendition name: url}; empty when the file is not an image
+        or the renditions could not be created
+        """
+        s3_uploader = S3Uploader()
+        if not s3_uploader.use_s3 or not file_url:
+            return {}
+
+        key = s3_uploader.get_key(file_url)
+        try:
+            image = cls.open_image(s3_uploader.get_object(key))
+        except UnidentifiedImageError:
+            return {}
+        except Exception as e:
+            CustomLogging.error(f"Unable to read image {file_url}: {str(e)}")
+            return {}
+
+        image_format, extension, content_type = cls.get_output_format()
+        renditions = {}
+        for name, size in cls.get_rendition_sizes().items():
+            # sizes are largest first, so each rendition is scaled from the last
+            image.thumbnail((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(
+                buffer,
+                image_format,
+                quality=settings.IMAGE_RENDITION_QUALITY,
+                optimize=True,
+            )
+            rendition_key = f"{key}.{name}.{extension}"
+            s3_uploader.put_object(
+                key=rendition_key, body=buffer.getvalue(), content_type=content_type
+            )
+            renditions[name] = s3_uploader.get_file_url(rendition_key)
+        return renditions
+
+    @classmethod
+    def open_image(cls, data):
+        image = Image.open(io.BytesIO(data))
+        largest_size = max(cls.get_rendition_sizes().values())
+        # lets the JPEG decoder scale down while reading camera-sized photos
+        image.draft("RGB", (largest_size, largest_size))
+        # bake the EXIF orientation into the pixels; the saved copies carry no
+        # EXIF, so location and device data is dropped with it
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        return image
@@ -1,6 +1,8 @@
-import requests
 from django.conf import settings
 
+from helpers.http_client import HttpClient
+from helpers.logger import CustomLogging
+
 
 class OneSignalIntegration:
 
@@ -13,6 +15,8 @@ class OneSignalIntegration:
         "Content-Type": "application/json",
     }
     base_url = "https://onesignal.com/api/v1/"
+    # OneSignal accepts at most this many include_subscription_ids per request
+    MAX_SUBSCRIPTION_IDS = 2000
 
     @classmethod
     def create_notification(cls,):
@@ -27,7 +31,7 @@ class OneSignalIntegration:
             "contents": {"en": "Sample Push Message"},
         }
         url = f"{cls.base_url}notifications"
-        response = requests.post(url, headers=cls.headers, json=data)
+        response = HttpClient.post("onesignal", url, headers=cls.headers, json=data)
         return response.json()
 
     @classmethod
@@ -46,13 +50,13 @@ class OneSignalIntegration:
             "timezone_id": "Africa/Lagos",
         }
         url = f"{cls.base_url}players"
-        response = requests.post(url, headers=cls.headers, json=data)
+        response = HttpClient.post("onesignal", url, headers=cls.headers, json=data)
         return response.json()
 
     @classmethod
     def delete_sms_device(cls, subscription_id):
         url = f"{cls.base_url}players/{subscription_id}?app_id={cls.app_id}"
-        response = requests.delete(url, headers=cls.headers)
+        response = HttpClient.delete("onesignal", url, headers=cls.headers)
         return response.json()
 
     @classmethod
@@ -65,7 +69,7 @@ class OneSignalIntegration:
             "include_phone_numbers": [phone_number],
         }
         url = f"{cls.base_url}notifications"
-        response = requests.post(url, headers=cls.headers, json=data)
+        response = HttpClient.post("onesignal", url, headers=cls.headers, json=data)
         return response.json()
 
     @classmethod
@@ -77,5 +81,20 @@ class OneSignalIntegration:
             "headings": {"en": title},
         }
         url = f"{cls.base_url}notifications"
-        response = requests.post(url, headers=cls.headers, json=data)
+        response = HttpClient.post("onesignal", url, headers=cls.headers, json=data)
         return response.json()
+
+    @classmethod
+    def send_bulk_push_notification(cls, subscription_list, title, message):
+        """Send to any number of subscriptions, MAX_SUBSCRIPTION_IDS per request"""
+        responses = []
+        for index in range(0, len(subscription_list), cls.MAX_SUBSCRIPTION_IDS):
+            chunk = subscription_list[index : index + cls.MAX_SUBSCRIPTION_IDS]
+            try:
+                responses.append(cls.send_push_notification(chunk, title, message))
+            except Exception as e:
+                CustomLogging.error(
+                    f"Unable to send push notification to {len(chunk)} subscriptions",
+                    extra={"errors": str(e)},
+                )
+        return responses
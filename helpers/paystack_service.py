@@ -1,6 +1,7 @@
-import requests
 from django.conf import settings
 
+from helpers.http_client import HttpClient
+
 
 class PaystackService:
 
@@ -10,17 +11,19 @@ class PaystackService:
         "Content-Type": "application/json",
     }
     base_url = "https://api.paystack.co/"
+    # most transfers paystack accepts in one bulk transfer request
+    BULK_TRANSFER_SIZE = 100
 
     @classmethod
     def verify_account_number(cls, bank_code, account_number):
         url = f"{cls.base_url}bank/resolve?account_number={account_number}&bank_code={bank_code}"
-        response = requests.get(url, headers=cls.headers)
+        response = HttpClient.get("paystack", url, headers=cls.headers)
         return response.json()
 
     @classmethod
     def get_banks(cls):
         url = f"{cls.base_url}bank"
-        response = requests.get(url, headers=cls.headers)
+        response = HttpClient.get("paystack", url, headers=cls.headers)
         # TODO: for optimization, save and retrieve in a cache
         return cls.format_list_of_banks(response.json()["data"])
 
@@ -34,31 +37,62 @@ class PaystackService:
             "currency": "NGN",
         }
         url = f"{cls.base_url}transferrecipient"
-        response = requests.post(url, headers=cls.headers, json=data)
+        response = HttpClient.post("paystack", url, headers=cls.headers, json=data)
         return response.json()
 
     @classmethod
-    def initiate_transfer(cls, amount, recipient):
+    def initiate_transfer(cls, amount, recipient, reference=None):
         data = {
             "source": "balance",
             "amount": amount * 100,
             "recipient": recipient,
             "reason": "payment from fele",
         }
+        if reference:
+            data["reference"] = reference
         url = f"{cls.base_url}transfer"
-        response = requests.post(url, headers=cls.headers, json=data)
+        response = HttpClient.post("paystack", url, headers=cls.headers, json=data)
+        return response.json()
+
+    @classmethod
+    def verify_transfer(cls, reference):
+        url = f"{cls.base_url}transfer/verify/{reference}"
+        response = HttpClient.get("paystack", url, headers=cls.headers)
+        return response.json()
+
+    @classmethod
+    def initiate_bulk_transfer(cls, transfers):
+        """
+        :params transfers: [{"amount": <naira>, "recipient": <recipient code>,
+            "reference": <unique reference>}], at most BULK_TRANSFER_SIZE
+        """
+        data = {
+            "currency": "NGN",
+            "source": "balance",
+            "transfers": [
+                {
+                    "amount": int(transfer["amount"] * 100),
+                    "recipient": transfer["recipient"],
+                    "reference": transfer["reference"],
+                    "reason": "payment from fele",
+                }
+                for transfer in transfers
+            ],
+        }
+        url = f"{cls.base_url}transfer/bulk"
+        response = HttpClient.post("paystack", url, headers=cls.headers, json=data)
         return response.json()
 
     @classmethod
     def create_payment_page(cls, data):
         url = f"{cls.base_url}page"
-        response = requests.post(url, headers=cls.headers, json=data)
+        response = HttpClient.post("paystack", url, headers=cls.headers, json=data)
         return response.json()
 
     @classmethod
     def verify_transaction(cls, reference):
         url = f"{cls.base_url}transaction/verify/{reference}"
-        response = requests.get(url, headers=cls.headers)
+        response = HttpClient.get("paystack", url, headers=cls.headers)
         return response.json()
 
     @classmethod
@@ -70,7 +104,7 @@ class PaystackService:
             "callback_url": callback_url,
         }
         url = f"{cls.base_url}transaction/initialize"
-        response = requests.post(url, headers=cls.headers, json=data)
+        response = HttpClient.post("paystack", url, headers=cls.headers, json=data)
         return response.json()
 
     @classmethod
@@ -78,7 +112,7 @@ class PaystackService:
         amount = round(float(amount) * 100)
         data = {"email": email, "amount": amount, "authorization_code": card_auth}
         url = f"{cls.base_url}transaction/charge_authorization"
-        response = requests.post(url, headers=cls.headers, json=data)
+        response = HttpClient.post("paystack", url, headers=cls.headers, json=data)
         return response.json()
 
     @staticmethod
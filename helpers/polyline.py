@@ -0,0 +1,48 @@
+from typing import List, Sequence, Tuple
+
+
+def _encode_value(value: int) -> str:
+    value = ~(value << 1) if value < 0 else value << 1
+    chunks = []
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+
+def encode(coordinates: Sequence[Tuple[float, float]], precision: int = 5) -> str:
+    """
+    Encode [(latitude, longitude)] with Google's encoded polyline algorithm.
+    Each point is stored as the delta from the previous one, so a trail of
+    nearby points costs a few bytes per point instead of two floats.
+    """
+    factor = 10**precision
+    encoded = []
+    previous_latitude = previous_longitude = 0
+    for latitude, longitude in coordinates:
+        latitude, longitude = round(latitude * factor), round(longitude * factor)
+        encoded.append(_encode_value(latitude - previous_latitude))
+        encoded.append(_encode_value(longitude - previous_longitude))
+        previous_latitude, previous_longitude = latitude, longitude
+    return "".join(encoded)
+
+
+def decode(polyline: str, precision: int = 5) -> List[Tuple[float, float]]:
+    factor = 10**precision
+    coordinates = []
+    values = [0, 0]
+    index = 0
+    while index < len(polyline):
+        for position in range(2):
+            result = shift = 0
+            while True:
+                byte = ord(polyline[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            values[position] += ~(result >> 1) if result & 1 else result >> 1
+        coordinates.append((values[0] / factor, values[1] / factor))
+    return coordinates
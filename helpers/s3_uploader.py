@@ -1,10 +1,81 @@
+import io
+import math
+import os
+import threading
 import uuid
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
 from django.conf import settings
+from rest_framework import status
+
+from helpers.cache_manager import CacheManager, KeyBuilder
+from helpers.exceptions import CustomAPIException
+
+
+class S3ClientRegistry:
+    """
+    One S3 client per process, shared by every S3Uploader. Building a client
+    loads botocore's service models and opens a new connection pool, so it is
+    done once (again after a fork) instead of per upload. boto3 clients are
+    safe to share between threads and greenlets.
+    """
+
+    DELETE_BATCH_SIZE = 1000  # most keys S3 accepts in one delete_objects call
+
+    _client = None
+    _client_pid = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_client(cls):
+        pid = os.getpid()
+        if cls._client is None or cls._client_pid != pid:
+            with cls._lock:
+                if cls._client is None or cls._client_pid != pid:
+                    cls._client = cls.create_client()
+                    cls._client_pid = pid
+        return cls._client
+
+    @classmethod
+    def create_client(cls):
+        return boto3.session.Session().client(
+            "s3",
+            aws_access_key_id=settings.AWS_ACCESS_KEY,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            region_name=settings.AWS_DEFAULT_REGION,
+            config=Config(
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+                read_timeout=settings.HTTP_READ_TIMEOUT,
+                retries={
+                    "max_attempts": settings.HTTP_MAX_RETRIES + 1,
+                    "mode": "standard",
+                },
+            ),
+        )
+
+    @classmethod
+    def get_transfer_config(cls):
+        return TransferConfig(
+            multipart_threshold=settings.S3_MULTIPART_THRESHOLD_MB * 1024 * 1024,
+            multipart_chunksize=settings.S3_MULTIPART_CHUNK_SIZE_MB * 1024 * 1024,
+            max_concurrency=settings.S3_MAX_CONCURRENCY,
+        )
 
 
 class S3Uploader(object):
+    # the files clients may upload straight to S3 with a presigned POST
+    PRESIGNED_UPLOAD_CONTENT_TYPES = [
+        "image/jpeg",
+        "image/png",
+        "image/webp",
+        "image/heic",
+        "application/pdf",
+    ]
+
     def __init__(self, append_folder=None):
         """
         :params append_folder: the s3 folder to upload file to; starts with '/' (e.g., /resumes)
@@ -15,12 +86,7 @@ class S3Uploader(object):
         if append_folder:
             self.folder += append_folder
         if self.use_s3:
-            self.s3_resource = boto3.resource(
-                "s3",
-                aws_access_key_id=settings.AWS_ACCESS_KEY,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_DEFAULT_REGION,
-            )
+            self.s3_client = S3ClientRegistry.get_client()
 
     def build_key(self, filename):
         extension = filename.split(".")[-1]
@@ -31,21 +97,131 @@ class S3Uploader(object):
         key = f"{self.folder}/{key}"
         if self.use_s3:
             self.put_object(key=key, body=file_object)
+        return self.get_file_url(key)
+
+    def get_file_url(self, key):
         return f"https://{self.bucket}.s3.amazonaws.com/{key}"
 
-    def put_object(self, key, body):
+    def create_presigned_upload(self, user_id, file_name, content_type):
+        """
+        Issue a short-lived presigned POST so the client uploads the file
+        straight to S3; the returned key is later passed to
+        confirm_presigned_upload by the same user.
+        """
+        if not self.use_s3:
+            raise CustomAPIException(
+                "Direct uploads are not available.", status.HTTP_400_BAD_REQUEST
+            )
+        key = f"{self.folder}/{self.build_key(file_name)}"
+        expires_in = settings.S3_PRESIGNED_UPLOAD_EXPIRY_SECONDS
+        presigned_post = self.s3_client.generate_presigned_post(
+            Bucket=self.bucket,
+            Key=key,
+            Fields={"acl": "public-read", "Content-Type": content_type},
+            Conditions=[
+                {"acl": "public-read"},
+                {"Content-Type": content_type},
+                [
+                    "content-length-range",
+                    1,
+                    settings.S3_PRESIGNED_UPLOAD_MAX_SIZE_MB * 1024 * 1024,
+                ],
+            ],
+            ExpiresIn=expires_in,
+        )
+        # the upload can only be confirmed while this record lives
+        CacheManager.set_key(
+            KeyBuilder.presigned_upload(key), user_id, math.ceil(expires_in / 60) + 5
+        )
+        return {
+            "key": key,
+            "url": presigned_post["url"],
+            "fields": presigned_post["fields"],
+            "file_url": self.get_file_url(key),
+        }
+
+    def confirm_presigned_upload(self, user_id, key):
+        """
+        :returns: the file url, once `key` is known to have been issued to the
+        user for this folder and the file is in the bucket. An upload is
+        confirmed once; the record is kept until the file is in the bucket.
+        """
+        cache_key = KeyBuilder.presigned_upload(key)
+        if (
+            not self.use_s3
+            or not key.startswith(f"{self.folder}/")
+            or CacheManager.retrieve_key(cache_key) != user_id
+            or not self.object_exists(key)
+            or not CacheManager.delete_key(cache_key)
+        ):
+            raise CustomAPIException(
+                "Upload not found or has expired.", status.HTTP_400_BAD_REQUEST
+            )
+        return self.get_file_url(key)
+
+    def object_exists(self, key):
+        try:
+            self.s3_client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def get_key(self, file_url):
+        return "/".join(str(file_url).split("/")[3:])
+
+    def get_object(self, key):
+        return self.s3_client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def put_object(self, key, body, content_type=None):
         # TODO: put this in a celery task because of lateness
-        self.s3_resource.Bucket(self.bucket).put_object(
-            Key=key, Body=body, ACL="public-read"
+        extra_args = {"ACL": "public-read"}
+        if content_type:
+            extra_args["ContentType"] = content_type
+        if isinstance(body, bytes):
+            body = io.BytesIO(body)
+        # large files are sent in concurrent multipart chunks
+        self.s3_client.upload_fileobj(
+            body,
+            self.bucket,
+            key,
+            ExtraArgs=extra_args,
+            Config=S3ClientRegistry.get_transfer_config(),
         )
 
     def hard_delete_object(self, image_url):
-        res = (
-            self.s3_resource.Bucket(self.bucket)
-            .object_versions.filter(Prefix=f"{'/'.join(str(image_url).split('/')[3:])}")
-            .delete()
-        )
-        return res
+        return self.hard_delete_objects([image_url])
+
+    def hard_delete_objects(self, image_urls):
+        """
+        Permanently delete every version of the files (and of the renditions
+        stored next to them), in batches of DELETE_BATCH_SIZE keys per request
+        """
+        paginator = self.s3_client.get_paginator("list_object_versions")
+        objects = []
+        for image_url in image_urls:
+            for page in paginator.paginate(
+                Bucket=self.bucket, Prefix=self.get_key(image_url)
+            ):
+                for version in page.get("Versions", []) + page.get("DeleteMarkers", []):
+                    objects.append(
+                        {"Key": version["Key"], "VersionId": version["VersionId"]}
+                    )
+
+        batch_size = S3ClientRegistry.DELETE_BATCH_SIZE
+        responses = []
+        for index in range(0, len(objects), batch_size):
+            responses.append(
+                self.s3_client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={
+                        "Objects": objects[index : index + batch_size],
+                        "Quiet": True,
+                    },
+                )
+            )
+        return responses
 
 
 class SuggestedImageUploader(S3Uploader):
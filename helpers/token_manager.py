@@ -20,8 +20,7 @@ class TokenManager:
             context={},
             category="USER_LOGIN_ATTEMPT",
             action="USER_LOGIN_ATTEMPT_SUCCESS_WITH_TOKEN",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -1,26 +1,278 @@
-import requests
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from business.models import WebhookDelivery
 from business.service import BusinessService
+from business.tasks import deliver_business_webhooks
+from helpers.hash_method import hmac_sha512
+from helpers.http_client import HttpClient
 from helpers.logger import CustomLogging
-from order.serializers import BusinessOrderSerializer
 
 
 class FeleWebhook:
+    """
+    Queued delivery of order updates to business webhook urls.
+
+    Every business has its own queue: its deliveries are sent one at a time in
+    the order they were queued, while different businesses are sent to
+    concurrently so a slow endpoint only delays its own business. Requests
+    are signed with HMAC-SHA512 over "<timestamp>.<body>" using the business
+    secret key.
+
+    With BUSINESS_WEBHOOK_COALESCE_SECONDS set, a delivery waits that long
+    before it is sent and later updates of the same order replace its payload,
+    so rapid status changes reach the business as one call.
+    """
+
+    SIGNATURE_HEADER = "X-Fele-Signature"
+    TIMESTAMP_HEADER = "X-Fele-Timestamp"
+    DELIVERY_HEADER = "X-Fele-Delivery"
+    PURGE_BATCH_SIZE = 1000
+    executor = ThreadPoolExecutor(
+        max_workers=settings.BUSINESS_WEBHOOK_MAX_CONCURRENCY,
+        thread_name_prefix="business-webhook",
+    )
+
     @classmethod
-    def send_order_to_webhook(cls, order):
-        url = order.business.webhook_url
-        secret_key = BusinessService.get_business_user_secret_key(order.business.user)
-        headers = {
-            "Authorization": f"Bearer {secret_key}",
-            "Content-Type": "application/json",
-        }
-        data = BusinessOrderSerializer(order).data
-        try:
-            response = requests.post(url, headers=headers, json=data)
-            return response.json()
+    def queue_order_event(cls, order, event, payload):
+        """
+        :params event: the order status the update is for
+        :params payload: the order serialized when the status changed
+        """
+        business = order.business
+        if not business.webhook_url:
+            return None
+
+        coalesce_seconds = settings.BUSINESS_WEBHOOK_COALESCE_SECONDS
+        with transaction.atomic():
+            delivery = None
+            if coalesce_seconds:
+                # a delivery nobody has tried to send yet can take the newer state
+                delivery = (
+                    WebhookDelivery.objects.select_for_update()
+                    .filter(order=order, status="PENDING", attempts=0)
+                    .first()
+                )
+            if delivery is not None:
+                delivery.event = event
+                delivery.payload = payload
+                delivery.save(update_fields=["event", "payload", "updated_at"])
+            else:
+                delivery = WebhookDelivery.objects.create(
+                    business=business,
+                    order=order,
+                    event=event,
+                    payload=payload,
+                    available_at=timezone.now() + timedelta(seconds=coalesce_seconds),
+                )
+            if not coalesce_seconds:
+                transaction.on_commit(deliver_business_webhooks.delay, robust=True)
+        return delivery
+
+    @classmethod
+    def deliver(cls):
+        delivered = 0
+        for _ in range(settings.BUSINESS_WEBHOOK_MAX_BATCHES):
+            queues = cls.claim_deliveries()
+            if not queues:
+                break
+            # only the http calls run in threads, results are saved here
+            responses = cls.executor.map(cls.post_deliveries, queues)
+            for queue, queue_responses in zip(queues, responses):
+                for delivery, (status_code, error) in zip(queue, queue_responses):
+                    delivered += cls.save_delivery_result(delivery, status_code, error)
+                cls.release_deliveries(queue[len(queue_responses) :])
+        return delivered
+
+    @classmethod
+    def claim_deliveries(cls):
+        """
+        Take the oldest due deliveries of each business, at most
+        BUSINESS_WEBHOOK_DELIVERIES_PER_BUSINESS in a row, counting the attempt
+        and leasing them so concurrent runs skip the business until the lease
+        runs out.
+        :returns: one list of deliveries per business, oldest first
+        """
+        now = timezone.now()
+        earlier_pending_deliveries = WebhookDelivery.objects.filter(
+            business_id=OuterRef("business_id"),
+            status="PENDING",
+            created_at__lt=OuterRef("created_at"),
+        )
+        with transaction.atomic():
+            # the oldest pending delivery of a business is locked, later ones
+            # are only claimed behind it
+            heads = list(
+                WebhookDelivery.objects.select_for_update(
+                    skip_locked=True, of=("self",)
+                )
+                .select_related("business")
+                .filter(status="PENDING", available_at__lte=now)
+                .filter(~Exists(earlier_pending_deliveries))
+                .order_by("created_at")[: settings.BUSINESS_WEBHOOK_BATCH_SIZE]
+            )
+            queues = {head.business_id: [head] for head in heads}
+            per_business = settings.BUSINESS_WEBHOOK_DELIVERIES_PER_BUSINESS
+            if heads and per_business > 1:
+                next_deliveries = (
+                    WebhookDelivery.objects.select_related("business")
+                    .filter(business_id__in=queues, status="PENDING")
+                    .exclude(id__in=[head.id for head in heads])
+                    .annotate(
+                        position=Window(
+                            RowNumber(),
+                            partition_by=[F("business_id")],
+                            order_by=F("created_at").asc(),
+                        )
+                    )
+                    .filter(position__lt=per_business)
+                    .order_by("business_id", "created_at")
+                )
+                for delivery in next_deliveries:
+                    queue = queues[delivery.business_id]
+                    # stop a business at its first delivery that isn't due yet
+                    if len(queue) == delivery.position and delivery.available_at <= now:
+                        queue.append(delivery)
+
+            deliveries = [delivery for queue in queues.values() for delivery in queue]
+            lease_until = now + timedelta(
+                seconds=settings.BUSINESS_WEBHOOK_LEASE_SECONDS
+            )
+            for delivery in deliveries:
+                delivery.attempts += 1
+                delivery.available_at = lease_until
+            WebhookDelivery.objects.bulk_update(
+                deliveries, ["attempts", "available_at"]
+            )
+        return list(queues.values())
 
+    @classmethod
+    def post_deliveries(cls, deliveries):
+        """
+        Send the deliveries of one business in order, stopping at the first
+        one that fails so a later update never arrives before an earlier one.
+        :returns: [(response status code, error message)] for the ones sent
+        """
+        responses = []
+        for delivery in deliveries:
+            status_code, error = cls.post_delivery(delivery)
+            responses.append((status_code, error))
+            if error is not None:
+                break
+        return responses
+
+    @classmethod
+    def release_deliveries(cls, deliveries):
+        """Hand back claimed deliveries that were not sent, uncounting the attempt"""
+        if not deliveries:
+            return
+        now = timezone.now()
+        for delivery in deliveries:
+            delivery.attempts -= 1
+            delivery.available_at = now
+        WebhookDelivery.objects.bulk_update(deliveries, ["attempts", "available_at"])
+
+    @classmethod
+    def post_delivery(cls, delivery):
+        """:returns: (response status code, error message)"""
+        business = delivery.business
+        if not business.webhook_url:
+            return None, "Business has no webhook url"
+
+        body = json.dumps(
+            delivery.payload, separators=(",", ":"), cls=DjangoJSONEncoder
+        )
+        headers = {"Content-Type": "application/json", cls.DELIVERY_HEADER: delivery.id}
+        secret_key = BusinessService.get_business_secret_key(business)
+        if secret_key is not None:
+            timestamp = str(int(time.time()))
+            headers["Authorization"] = f"Bearer {secret_key}"
+            headers[cls.TIMESTAMP_HEADER] = timestamp
+            headers[cls.SIGNATURE_HEADER] = hmac_sha512(
+                f"{timestamp}.{body}", secret_key
+            )
+        try:
+            response = HttpClient.post(
+                "business_webhook",
+                business.webhook_url,
+                data=body.encode(),
+                headers=headers,
+                timeout=(
+                    settings.HTTP_CONNECT_TIMEOUT,
+                    settings.BUSINESS_WEBHOOK_TIMEOUT_SECONDS,
+                ),
+            )
         except Exception as e:
+            return None, str(e)
+        if not response.ok:
+            return response.status_code, response.text[:500]
+        return response.status_code, None
+
+    @classmethod
+    def save_delivery_result(cls, delivery, status_code, error):
+        delivery.response_status_code = status_code
+        if error is None:
+            delivery.status = "DELIVERED"
+            delivery.delivered_at = timezone.now()
+            delivery.last_error = None
+        else:
+            delivery.last_error = error
+            if delivery.attempts >= settings.BUSINESS_WEBHOOK_MAX_ATTEMPTS:
+                delivery.status = "DEAD"
+            else:
+                delivery.available_at = timezone.now() + timedelta(
+                    seconds=settings.BUSINESS_WEBHOOK_BACKOFF_SECONDS
+                    * 2 ** (delivery.attempts - 1)
+                )
             CustomLogging.error(
-                f"Unable to connect to webhook url {url}: {str(e)}", data
+                f"Unable to deliver webhook {delivery.id} to {delivery.business.webhook_url}: {error}"
             )
-            pass
+        delivery.save(
+            update_fields=[
+                "status",
+                "delivered_at",
+                "available_at",
+                "response_status_code",
+                "last_error",
+                "updated_at",
+            ]
+        )
+        return 1 if error is None else 0
+
+    @classmethod
+    def requeue_dead_deliveries(cls, **kwargs):
+        """Send DEAD deliveries (e.g. for one business) again from scratch"""
+        requeued = WebhookDelivery.objects.filter(status="DEAD", **kwargs).update(
+            status="PENDING", attempts=0, available_at=timezone.now()
+        )
+        transaction.on_commit(deliver_business_webhooks.delay, robust=True)
+        return requeued
+
+    @classmethod
+    def purge_delivered_deliveries(cls):
+        """
+        Delete deliveries delivered more than BUSINESS_WEBHOOK_RETENTION_DAYS
+        ago, PURGE_BATCH_SIZE at a time. DEAD deliveries are kept for requeueing.
+        """
+        delivered_before = timezone.now() - timedelta(
+            days=settings.BUSINESS_WEBHOOK_RETENTION_DAYS
+        )
+        deliveries = WebhookDelivery.all_objects.filter(
+            status="DELIVERED", delivered_at__lt=delivered_before
+        )
+        purged = 0
+        while True:
+            ids = list(deliveries.values_list("id", flat=True)[: cls.PURGE_BATCH_SIZE])
+            if not ids:
+                return purged
+            WebhookDelivery.all_objects.filter(id__in=ids).only("id").hard_delete()
+            purged += len(ids)
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.5 on 2026-10-18 19:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notification", "0003_notification"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(("deleted_at", None)),
+                fields=["user", "created_at"],
+                name="notification_user_created_idx",
+            ),
+        ),
+    ]
@@ -23,6 +23,13 @@ class Notification(BaseAbstractModel):
         db_table = "notification"
         verbose_name = "Notifications"
         verbose_name_plural = "Notifications"
+        indexes = [
+            models.Index(
+                fields=["user", "created_at"],
+                name="notification_user_created_idx",
+                condition=models.Q(deleted_at=None),
+            ),
+        ]
 
 
 class UserNotification(BaseAbstractModel):
@@ -8,6 +8,7 @@ from rest_framework import status
 from sendgrid.helpers.mail import Content, Email, From, Mail, Subject, To
 
 from helpers.exceptions import CustomAPIException
+from helpers.http_client import HttpClient
 from helpers.logger import CustomLogging
 from helpers.onesignal_integration import OneSignalIntegration
 from notification.models import Notification, UserNotification
@@ -65,8 +66,6 @@ class SmsManager:
 
     @classmethod
     def send_sms(cls, phone_number, message):
-        import requests
-
         url = f"{cls.base_url}/api/sms/send"
         data = {
             "to": [phone_number],
@@ -76,7 +75,7 @@ class SmsManager:
             "from": cls.sms_from,
             "type": "plain",
         }
-        response = requests.post(url, headers=cls.headers, json=data)
+        response = HttpClient.post("termii", url, headers=cls.headers, json=data)
         return response.json()
 
 
@@ -135,20 +134,39 @@ class NotificationService:
     def send_collective_push_notification(
         cls, users, title, message, add_to_notification=True
     ):
-        subscription_list = []
-        for user in users:
-            user_notification = cls.get_user_one_signal(user).first()
-            if user_notification is not None:
-                subscription_list.append(user_notification.one_signal_id)
+        user_ids = [user.id for user in users]
+        cls.send_bulk_push_notification(user_ids, title, message, add_to_notification)
 
+    @classmethod
+    def send_bulk_push_notification(
+        cls, user_ids, title, message, add_to_notification=True
+    ):
+        """
+        Push one message to many users: a single query for their active
+        OneSignal ids, chunked sends and one bulk insert of notification rows.
+        """
+        subscription_list = cls.get_active_one_signal_ids(user_ids)
         formatted_message = message[:100] + "..." if len(message) > 50 else message
-        OneSignalIntegration.send_push_notification(
+        OneSignalIntegration.send_bulk_push_notification(
             subscription_list, title, formatted_message
         )
 
         if add_to_notification:
-            for user in users:
-                cls.add_user_notification(user, title, message)
+            Notification.objects.bulk_create(
+                [
+                    Notification(user_id=user_id, title=title, message=message)
+                    for user_id in user_ids
+                ],
+                batch_size=settings.NOTIFICATION_BULK_CREATE_BATCH_SIZE,
+            )
+
+    @classmethod
+    def get_active_one_signal_ids(cls, user_ids):
+        return list(
+            UserNotification.objects.filter(user_id__in=user_ids, status="ACTIVE")
+            .values_list("one_signal_id", flat=True)
+            .distinct()
+        )
 
     @classmethod
     def add_user_notification(cls, user, title, message):
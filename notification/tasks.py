@@ -0,0 +1,10 @@
+from celery import shared_task
+
+
+@shared_task(name="task.send_bulk_push_notification")
+def send_bulk_push_notification(user_ids, title, message, add_to_notification=True):
+    from notification.service import NotificationService
+
+    NotificationService.send_bulk_push_notification(
+        user_ids, title, message, add_to_notification
+    )
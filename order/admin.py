@@ -369,7 +369,9 @@ class OrderTimelineInline(TabularInline):
     def proof_img(self, instance):
         if instance.proof_url:
             return format_html(
-                '<img src="{}" width="50" height="50" />', instance.proof_url
+                '<a href="{}" target="_blank"><img src="{}" width="50" height="50" /></a>',
+                instance.proof_url,
+                instance.get_proof_url("thumbnail"),
             )
         else:
             return ""
@@ -466,9 +468,9 @@ class OrderAdmin(ModelAdmin):
         return False
 
     def get_queryset(self, request):
-        order = self.model.objects.exclude(customer__user__state="DELETED")
-        order = order.exclude(rider__user__state="DELETED")
-        order = order.exclude(business__user__state="DELETED")
+        order = self.model.objects.exclude_deleted_users(
+            "customer__user", "rider__user", "business__user"
+        )
         order = order.exclude(status="PROCESSING_ORDER")
         return order
 
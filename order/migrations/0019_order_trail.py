@@ -0,0 +1,100 @@
+# Generated by Django 4.2.5 on 2026-10-18 19:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+import helpers.db_helpers
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("order", "0018_alter_order_delivery_name_alter_order_payment_by_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderTrail",
+            fields=[
+                (
+                    "id",
+                    models.CharField(
+                        default=helpers.db_helpers.generate_id,
+                        editable=False,
+                        max_length=60,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "deleted_at",
+                    models.DateTimeField(blank=True, default=None, null=True),
+                ),
+                (
+                    "state",
+                    models.CharField(
+                        choices=[("ACTIVE", "ACTIVE"), ("DELETED", "DELETED")],
+                        default="ACTIVE",
+                        max_length=20,
+                    ),
+                ),
+                ("sequence", models.PositiveIntegerField(default=0)),
+                ("polyline", models.TextField()),
+                ("time_offsets", models.JSONField(default=list)),
+                ("point_count", models.PositiveIntegerField(default=0)),
+                ("started_at", models.DateTimeField()),
+                ("ended_at", models.DateTimeField()),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="created by",
+                    ),
+                ),
+                (
+                    "deleted_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="deleted by",
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="order_trail",
+                        to="order.order",
+                        verbose_name="order trail",
+                    ),
+                ),
+                (
+                    "updated_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="updated by",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Order Trail",
+                "verbose_name_plural": "Order Trails",
+                "db_table": "order_trail",
+                "ordering": ["sequence"],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 19:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("order", "0020_order_outbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ordertimeline",
+            name="proof_renditions",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
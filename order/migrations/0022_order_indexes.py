@@ -0,0 +1,62 @@
+# Generated by Django 4.2.5 on 2026-10-18 19:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("order", "0021_ordertimeline_proof_renditions"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["rider", "status", "created_at"], name="order_rider_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["customer", "created_at"], name="order_customer_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["business", "created_at"], name="order_business_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("rider__isnull", True), ("status", "PENDING")),
+                fields=["vehicle", "created_at"],
+                name="order_unassigned_pending_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(
+                    (
+                        "status__in",
+                        [
+                            "RIDER_ACCEPTED_ORDER",
+                            "RIDER_AT_PICK_UP",
+                            "RIDER_PICKED_UP_ORDER",
+                            "ORDER_ARRIVED",
+                        ],
+                    )
+                ),
+                fields=["rider"],
+                name="order_rider_active_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="order",
+            constraint=models.UniqueConstraint(
+                fields=("order_id",), name="order_order_id_key"
+            ),
+        ),
+    ]
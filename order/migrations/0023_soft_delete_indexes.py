@@ -0,0 +1,28 @@
+# Generated by Django 4.2.5 on 2026-10-18 19:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("order", "0022_order_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("deleted_at", None)),
+                fields=["created_at"],
+                name="order_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ordertimeline",
+            index=models.Index(
+                condition=models.Q(("deleted_at", None)),
+                fields=["order", "created_at"],
+                name="order_timeline_order_idx",
+            ),
+        ),
+    ]
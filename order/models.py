@@ -1,4 +1,6 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 
 from helpers.db_helpers import BaseAbstractModel
 
@@ -165,17 +167,68 @@ class Order(BaseAbstractModel):
         db_table = "order"
         verbose_name = "order"
         verbose_name_plural = "orders"
+        constraints = [
+            models.UniqueConstraint(fields=["order_id"], name="order_order_id_key")
+        ]
+        indexes = [
+            # changelists and lists ordered by created_at
+            models.Index(
+                fields=["created_at"],
+                name="order_created_idx",
+                condition=models.Q(deleted_at=None),
+            ),
+            models.Index(
+                fields=["rider", "status", "created_at"],
+                name="order_rider_status_idx",
+            ),
+            models.Index(
+                fields=["customer", "created_at"], name="order_customer_created_idx"
+            ),
+            models.Index(
+                fields=["business", "created_at"], name="order_business_created_idx"
+            ),
+            # orders waiting for any rider of a vehicle type
+            models.Index(
+                fields=["vehicle", "created_at"],
+                name="order_unassigned_pending_idx",
+                condition=models.Q(status="PENDING", rider__isnull=True),
+            ),
+            # riders busy with an order, see OrderService.CURRENT_ORDER_STATUSES
+            models.Index(
+                fields=["rider"],
+                name="order_rider_active_idx",
+                condition=models.Q(
+                    status__in=[
+                        "RIDER_ACCEPTED_ORDER",
+                        "RIDER_AT_PICK_UP",
+                        "RIDER_PICKED_UP_ORDER",
+                        "ORDER_ARRIVED",
+                    ]
+                ),
+            ),
+        ]
 
     def get_pick_up_time(self):
-        order_timeline = self.order_timeline.filter(
-            status="RIDER_PICKED_UP_ORDER"
-        ).first()
-        if order_timeline:
-            return order_timeline.created_at.strftime("%Y-%m-%d %H:%M:%S")
-        return None
+        return self.get_timeline_time("RIDER_PICKED_UP_ORDER", "pick_up_timeline")
 
     def get_delivery_time(self):
-        order_timeline = self.order_timeline.filter(status="ORDER_DELIVERED").first()
+        return self.get_timeline_time("ORDER_DELIVERED", "delivery_timeline")
+
+    def get_timeline_time(self, status, prefetched_attr):
+        """
+        :params prefetched_attr: list OrderService.get_order_list_qs prefetches
+            the entries of `status` into, so a page of orders doesn't query
+            the timeline once per order
+        """
+        if hasattr(self, prefetched_attr):
+            entries = getattr(self, prefetched_attr)
+            order_timeline = entries[0] if entries else None
+        else:
+            order_timeline = (
+                self.order_timeline.filter(status=status)
+                .order_by("-created_at")
+                .first()
+            )
         if order_timeline:
             return order_timeline.created_at.strftime("%Y-%m-%d %H:%M:%S")
         return None
@@ -217,6 +270,8 @@ class OrderTimeline(BaseAbstractModel):
     )
     status = models.CharField(max_length=100)
     proof_url = models.CharField(max_length=550, null=True, blank=True)
+    # {rendition name: url} of proof_url, see ImageRenditionService
+    proof_renditions = models.JSONField(default=dict, blank=True)
     reason = models.CharField(max_length=100, null=True, blank=True)
     meta_data = models.JSONField(default=dict, null=True, blank=True)
 
@@ -227,6 +282,13 @@ class OrderTimeline(BaseAbstractModel):
         db_table = "order_timeline"
         verbose_name = "Order Timeline"
         verbose_name_plural = "Order Timelines"
+        indexes = [
+            models.Index(
+                fields=["order", "created_at"],
+                name="order_timeline_order_idx",
+                condition=models.Q(deleted_at=None),
+            ),
+        ]
 
     def get_created_at(self):
         date = self.meta_data.get("date", None)
@@ -235,6 +297,9 @@ class OrderTimeline(BaseAbstractModel):
     def get_status_display(self):
         return " ".join(self.status.split("_")).capitalize()
 
+    def get_proof_url(self, rendition="medium"):
+        return self.proof_renditions.get(rendition) or self.proof_url
+
     def get_status_icon(self):
         status_icon_mapper = {
             "PENDING": "money-coins",
@@ -264,3 +329,80 @@ class OrderTimeline(BaseAbstractModel):
             "ORDER_CANCELLED": "danger",
         }
         return status_colour_mapper[self.status]
+
+
+class OrderTrail(BaseAbstractModel):
+    """
+    Down-sampled route a rider took while on an order. Points are stored in
+    segments as an encoded polyline, with the seconds between consecutive
+    points kept alongside in `time_offsets`.
+    """
+
+    order = models.ForeignKey(
+        "order.Order",
+        on_delete=models.CASCADE,
+        verbose_name="order trail",
+        related_name="order_trail",
+    )
+    sequence = models.PositiveIntegerField(default=0)
+    polyline = models.TextField()
+    time_offsets = models.JSONField(default=list)
+    point_count = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.order_id} #{self.sequence}"
+
+    class Meta:
+        db_table = "order_trail"
+        verbose_name = "Order Trail"
+        verbose_name_plural = "Order Trails"
+        ordering = ["sequence"]
+
+
+class OrderOutbox(BaseAbstractModel):
+    """
+    Side effects of an order change (push notifications, business webhooks),
+    written in the same transaction as the change and sent by the outbox relay.
+    """
+
+    EVENT_TYPES = [
+        ("PUSH_NOTIFICATION", "PUSH_NOTIFICATION"),
+        ("BUSINESS_WEBHOOK", "BUSINESS_WEBHOOK"),
+    ]
+    STATUS = [("PENDING", "PENDING"), ("SENT", "SENT"), ("FAILED", "FAILED")]
+
+    order = models.ForeignKey(
+        "order.Order",
+        on_delete=models.CASCADE,
+        verbose_name="order outbox",
+        related_name="order_outbox",
+    )
+    event_type = models.CharField(max_length=50, choices=EVENT_TYPES)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=20, choices=STATUS, default="PENDING")
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.event_type} #{self.order_id}"
+
+    class Meta:
+        db_table = "order_outbox"
+        verbose_name = "Order Outbox"
+        verbose_name_plural = "Order Outbox"
+        indexes = [
+            models.Index(
+                fields=["available_at", "created_at"],
+                name="order_outbox_pending_idx",
+                condition=models.Q(status="PENDING"),
+            ),
+            models.Index(
+                fields=["order", "created_at"],
+                name="order_outbox_order_idx",
+                condition=models.Q(status="PENDING"),
+            ),
+        ]
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from helpers.s3_uploader import S3Uploader
 from order.models import Order, OrderTimeline, Vehicle
 
 
@@ -10,12 +11,16 @@ class RetrieveVehicleSerializer(serializers.ModelSerializer):
 
 
 class OrderTimelineSerializer(serializers.ModelSerializer):
+    proof_url = serializers.SerializerMethodField()
     date = serializers.SerializerMethodField()
 
     class Meta:
         model = OrderTimeline
         fields = ("status", "proof_url", "reason", "date")
 
+    def get_proof_url(self, obj):
+        return obj.get_proof_url()
+
     def get_date(self, obj):
         return obj.created_at.strftime("%Y-%m-%d %H:%M:%S")
 
@@ -517,6 +522,12 @@ class InitiateOrderSerializer(serializers.Serializer):
     vehicle_id = serializers.CharField(max_length=100, required=True)
 
 
+class VehicleQuoteSerializer(serializers.Serializer):
+    pickup = LocationSerializer()
+    delivery = LocationSerializer()
+    stop_overs = LocationSerializer(many=True, required=False)
+
+
 class PlaceOrderSerializer(serializers.Serializer):
     PAYMENT_METHOD_CHOICES = [("WALLET", "WALLET"), ("CASH", "CASH")]
     PAYMENT_BY_CHOICES = [("SENDER", "SENDER"), ("RECIPIENT", "RECIPIENT")]
@@ -541,7 +552,20 @@ class AssignRiderSerializer(serializers.Serializer):
 
 
 class RiderPickUpOrderSerializer(serializers.Serializer):
-    proof = serializers.FileField(write_only=True)
+    proof = serializers.FileField(write_only=True, required=False)
+    upload_key = serializers.CharField(max_length=255, required=False)
+
+    def validate(self, data):
+        if not data.get("proof") and not data.get("upload_key"):
+            raise serializers.ValidationError("Provide either proof or upload_key.")
+        return data
+
+
+class ProofUploadSerializer(serializers.Serializer):
+    file_name = serializers.CharField(max_length=255)
+    content_type = serializers.ChoiceField(
+        choices=S3Uploader.PRESIGNED_UPLOAD_CONTENT_TYPES
+    )
 
 
 class RiderFailedPickupSerializer(serializers.Serializer):
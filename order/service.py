@@ -1,26 +1,180 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from decimal import Decimal
+from math import isqrt
 
+import numpy
 from django.conf import settings
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Exists, F, OuterRef, Prefetch, Q
 from django.utils import timezone
+from django_redis import get_redis_connection
 from rest_framework import status
 
 from authentication.tasks import track_user_activity
 from business.service import BusinessService
 from customer.service import CustomerService
+from helpers import geohash, polyline
+from helpers.cache_manager import KeyBuilder, TieredCache
 from helpers.db_helpers import generate_id, generate_orderid
 from helpers.exceptions import CustomAPIException
 from helpers.googlemaps_service import GoogleMapsService
+from helpers.image_renditions import ImageRenditionService
+from helpers.logger import CustomLogging
 from helpers.paystack_service import PaystackService
 from helpers.s3_uploader import S3Uploader
 from helpers.webhook import FeleWebhook
 from notification.service import NotificationService
-from order.models import Address, Order, OrderTimeline, Vehicle
-from rider.models import FavoriteRider, RiderCommission, RiderRating
-from rider.service import RiderService
-from wallet.service import CardService, TransactionService
+from notification.tasks import send_bulk_push_notification
+from order.models import Address, Order, OrderOutbox, OrderTimeline, OrderTrail, Vehicle
+from order.serializers import BusinessOrderSerializer
+from order.tasks import create_order_proof_renditions, relay_order_outbox
+from rider.models import FavoriteRider, Rider, RiderDocument, RiderRating
+from rider.service import RiderCommissionService, RiderLocationService, RiderService
+from wallet.service import CardService, TransactionService, WalletService
+
+
+class VehicleTariffService:
+    """
+    Process-local table of every vehicle's fares, so pricing a quote never
+    queries the vehicle table. The table is reloaded when a vehicle is
+    saved or deleted (see order/signals.py); the change is broadcast over
+    redis pub/sub so every worker drops its copy, and a copy older than
+    VEHICLE_TARIFF_MAX_AGE_SECONDS is reloaded in case a broadcast was missed.
+    """
+
+    TARIFF_FIELDS = [
+        "base_fare",
+        "km_5_below_fare",
+        "km_5_above_fare",
+        "price_per_minute",
+    ]
+    CHANNEL = f"{settings.ENVIRONMENT}:vehicle-tariff:invalidate"
+    # unknown ids are remembered until the next reload; the cap keeps a stream
+    # of bad ids from growing the set without bound
+    MAX_MISSING_IDS = 1000
+    version = 0
+    _tariffs = None
+    _missing = set()
+    _loaded_at = None
+    _lock = threading.Lock()
+    _listener = None
+
+    @classmethod
+    def get_tariffs(cls):
+        """Returns {vehicle_id: {"status", "start_date", "end_date", **fares}}"""
+        tariffs, loaded_at = cls._tariffs, cls._loaded_at
+        if tariffs is None or (
+            time.monotonic() - loaded_at > settings.VEHICLE_TARIFF_MAX_AGE_SECONDS
+        ):
+            tariffs = cls.load()
+        return tariffs
+
+    @classmethod
+    def load(cls):
+        cls._start_listener()
+        with cls._lock:
+            vehicles = Vehicle.objects.values(
+                "id", "status", "start_date", "end_date", *cls.TARIFF_FIELDS
+            )
+            cls._tariffs = {vehicle.pop("id"): vehicle for vehicle in vehicles}
+            cls._missing = set()
+            cls._loaded_at = time.monotonic()
+            cls.version += 1
+            return cls._tariffs
+
+    @classmethod
+    def invalidate(cls, broadcast=True):
+        cls._tariffs = None
+        if broadcast:
+            try:
+                get_redis_connection("default").publish(cls.CHANNEL, "invalidate")
+            except Exception as e:
+                CustomLogging.error(
+                    f"Unable to broadcast tariff invalidation: {str(e)}"
+                )
+
+    @classmethod
+    def get_tariff(cls, vehicle_id):
+        tariffs = cls.get_tariffs()
+        tariff = tariffs.get(vehicle_id)
+        if tariff is None and vehicle_id not in cls._missing:
+            # the vehicle may have been created after the table was loaded
+            tariff = cls.load_vehicle(tariffs, vehicle_id)
+        if tariff is None:
+            raise CustomAPIException("Vehicle not found.", status.HTTP_404_NOT_FOUND)
+        return tariff
+
+    @classmethod
+    def load_vehicle(cls, tariffs, vehicle_id):
+        """Adds one vehicle to the table, or remembers that it does not exist"""
+        tariff = (
+            Vehicle.objects.filter(id=vehicle_id)
+            .values("status", "start_date", "end_date", *cls.TARIFF_FIELDS)
+            .first()
+        )
+        with cls._lock:
+            if tariff is not None:
+                tariffs[vehicle_id] = tariff
+            elif tariffs is cls._tariffs:
+                if len(cls._missing) >= cls.MAX_MISSING_IDS:
+                    cls._missing = set()
+                cls._missing.add(vehicle_id)
+        return tariff
+
+    @classmethod
+    def calculate_prices(cls, distances, durations, vehicle_ids):
+        """
+        Price every leg for every vehicle in one pass.
+        :params distances: leg distances in meters
+        :params durations: leg durations in seconds
+        :returns: numpy array of shape (len(vehicle_ids), len(distances))
+        """
+        fares = numpy.array(
+            [
+                [cls.get_tariff(vehicle_id)[field] for field in cls.TARIFF_FIELDS]
+                for vehicle_id in vehicle_ids
+            ],
+            dtype=float,
+        ).reshape(-1, len(cls.TARIFF_FIELDS))
+        base_fare, price_per_km_0_5, price_per_km_5_above, price_per_minute = (
+            fares[:, [index]] for index in range(len(cls.TARIFF_FIELDS))
+        )
+        distance_km = numpy.asarray(distances, dtype=float) / 1000
+        duration = numpy.asarray(durations, dtype=float)
+
+        # the first 5km are charged at km_5_below_fare and the rest at km_5_above_fare
+        price_distance = (
+            base_fare
+            + numpy.minimum(distance_km, 5) * price_per_km_0_5
+            + numpy.maximum(distance_km - 5, 0) * price_per_km_5_above
+        )
+        price_duration = duration / 60 * price_per_minute
+        return price_distance + price_duration
+
+    @classmethod
+    def _start_listener(cls):
+        if cls._listener is not None and cls._listener.is_alive():
+            return
+        cls._listener = threading.Thread(
+            target=cls._listen_for_invalidation, name="vehicle-tariff", daemon=True
+        )
+        cls._listener.start()
+
+    @classmethod
+    def _listen_for_invalidation(cls):
+        try:
+            pubsub = get_redis_connection("default").pubsub(
+                ignore_subscribe_messages=True
+            )
+            pubsub.subscribe(cls.CHANNEL)
+            for _ in pubsub.listen():
+                cls.invalidate(broadcast=False)
+        except Exception as e:
+            # the table still expires after VEHICLE_TARIFF_MAX_AGE_SECONDS
+            CustomLogging.error(f"Vehicle tariff listener stopped: {str(e)}")
 
 
 class VehicleService:
@@ -46,6 +200,38 @@ class VehicleService:
 
 
 class MapService:
+    # bounds how many google maps requests a worker makes at the same time
+    executor = ThreadPoolExecutor(
+        max_workers=settings.GOOGLE_MAPS_MAX_CONCURRENCY,
+        thread_name_prefix="google-maps",
+    )
+    route_cache = TieredCache(
+        namespace="google-maps:route",
+        minutes=settings.GOOGLE_MAPS_ROUTE_CACHE_MINUTES,
+        local_minutes=settings.GOOGLE_MAPS_LOCAL_CACHE_MINUTES,
+        max_size=settings.GOOGLE_MAPS_LOCAL_CACHE_SIZE,
+    )
+
+    @classmethod
+    def get_route_cache_key(cls, start_lat_lng, end_lat_lng, mode="driving"):
+        """
+        Origin and destination are snapped to geohash cells so nearby pickups
+        share entries, and durations are kept per time-of-day bucket because
+        traffic makes the same route take different times through the day.
+        """
+        precision = settings.GOOGLE_MAPS_ROUTE_GEOHASH_PRECISION
+        start_latitude, start_longitude = str(start_lat_lng).split(",")
+        end_latitude, end_longitude = str(end_lat_lng).split(",")
+        time_bucket = (
+            timezone.localtime().hour // settings.GOOGLE_MAPS_ROUTE_TIME_BUCKET_HOURS
+        )
+        return KeyBuilder.route_distance(
+            geohash.encode(start_latitude, start_longitude, precision),
+            geohash.encode(end_latitude, end_longitude, precision),
+            mode,
+            time_bucket,
+        )
+
     @classmethod
     def search_address(cls, address):
         response = GoogleMapsService.search_address(address)
@@ -126,17 +312,239 @@ class MapService:
 
     @classmethod
     def get_distance_between_locations(cls, start_lat_lng, end_lat_lng):
-        response = GoogleMapsService.get_distance_matrix(start_lat_lng, end_lat_lng)
-        if response.get("status") == "OK":
-            rows = response.get("rows", [])[0]
-            elements = rows.get("elements", [])[0]
-            distance = elements.get("distance", {}).get("value")
-            duration = elements.get("duration", {}).get("value")
-            return {"distance": distance, "duration": duration}
-        return {}
+        def fetch():
+            response = GoogleMapsService.get_distance_matrix(start_lat_lng, end_lat_lng)
+            if response.get("status") == "OK":
+                rows = response.get("rows", [])[0]
+                elements = rows.get("elements", [])[0]
+                distance = elements.get("distance", {}).get("value")
+                duration = elements.get("duration", {}).get("value")
+                return {"distance": distance, "duration": duration}
+            return {}
+
+        return cls.route_cache.get_or_set(
+            cls.get_route_cache_key(start_lat_lng, end_lat_lng),
+            fetch,
+            is_empty=lambda result: False,
+            is_cacheable=lambda result: result.get("distance") is not None,
+        )
+
+    @classmethod
+    def get_distance_between_legs(cls, legs):
+        """
+        Resolve the distance and duration of every (start_lat_lng, end_lat_lng)
+        leg of a route with as few distance matrix requests as possible.
+        Legs found in the route cache are not requested again. The rest are
+        sent in chunks as origins/destinations and only the diagonal of the
+        returned matrix is used. Returns one dict per leg, in order; a leg
+        that cannot be resolved is an empty dict.
+        """
+        cache_keys = [cls.get_route_cache_key(*leg) for leg in legs]
+        results = [cls.route_cache.get(cache_key) for cache_key in cache_keys]
+        missing_legs = [leg for leg, result in zip(legs, results) if result is None]
+
+        max_legs = min(
+            GoogleMapsService.DISTANCE_MATRIX_MAX_LOCATIONS,
+            isqrt(GoogleMapsService.DISTANCE_MATRIX_MAX_ELEMENTS),
+        )
+        resolved_legs = []
+        for index in range(0, len(missing_legs), max_legs):
+            resolved_legs.extend(
+                cls._get_distance_between_leg_chunk(
+                    missing_legs[index : index + max_legs]
+                )
+            )
+
+        resolved_legs = iter(resolved_legs)
+        for index, cache_key in enumerate(cache_keys):
+            if results[index] is not None:
+                continue
+            results[index] = next(resolved_legs)
+            if results[index].get("distance") is not None:
+                cls.route_cache.set(cache_key, results[index])
+        return results
+
+    @classmethod
+    def _get_distance_between_leg_chunk(cls, legs):
+        response = GoogleMapsService.get_batch_distance_matrix(
+            [start_lat_lng for start_lat_lng, _ in legs],
+            [end_lat_lng for _, end_lat_lng in legs],
+        )
+        if (
+            response.get("status") in GoogleMapsService.DISTANCE_MATRIX_LIMIT_STATUSES
+            and len(legs) > 1
+        ):
+            middle = len(legs) // 2
+            return cls._get_distance_between_leg_chunk(
+                legs[:middle]
+            ) + cls._get_distance_between_leg_chunk(legs[middle:])
+        if response.get("status") != "OK":
+            return [{} for _ in legs]
+
+        results = []
+        rows = response.get("rows", [])
+        for index in range(len(legs)):
+            elements = rows[index].get("elements", []) if index < len(rows) else []
+            element = elements[index] if index < len(elements) else {}
+            if element.get("status") != "OK":
+                results.append({})
+                continue
+            results.append(
+                {
+                    "distance": element.get("distance", {}).get("value"),
+                    "duration": element.get("duration", {}).get("value"),
+                }
+            )
+        return results
+
+
+class OrderOutboxService:
+    """
+    Transactional outbox for order side effects.
+
+    Events are written with the order change they belong to, so they are only
+    sent if that change commits, and a relay sends them afterwards. Events of
+    one order are sent in the order they were written: an event is not picked
+    up while an earlier one for the same order is still pending. Failed sends
+    are retried with exponential backoff and marked FAILED after
+    ORDER_OUTBOX_MAX_ATTEMPTS.
+    """
+
+    HANDLERS = {
+        "PUSH_NOTIFICATION": "send_push_notification",
+        "BUSINESS_WEBHOOK": "send_business_webhook",
+    }
+    PURGE_BATCH_SIZE = 1000
+
+    @classmethod
+    def add_event(cls, order, event_type, **payload):
+        event = OrderOutbox.objects.create(
+            order=order, event_type=event_type, payload=payload
+        )
+        # the beat schedule picks the event up if the broker is unavailable
+        transaction.on_commit(relay_order_outbox.delay, robust=True)
+        return event
+
+    @classmethod
+    def add_push_notification(cls, order, user, title, message):
+        return cls.add_event(
+            order, "PUSH_NOTIFICATION", user_id=user.id, title=title, message=message
+        )
+
+    @classmethod
+    def add_business_webhook(cls, order):
+        # the order is serialized now, the relay may run after later changes
+        return cls.add_event(
+            order,
+            "BUSINESS_WEBHOOK",
+            order_status=order.status,
+            order_data=BusinessOrderSerializer(order).data,
+        )
+
+    @classmethod
+    def relay(cls):
+        sent = 0
+        for _ in range(settings.ORDER_OUTBOX_MAX_BATCHES):
+            events = cls.claim_events()
+            if not events:
+                break
+            for event in events:
+                sent += cls.send_event(event)
+        return sent
+
+    @classmethod
+    def purge_sent_events(cls):
+        """
+        Delete events sent more than ORDER_OUTBOX_RETENTION_DAYS ago,
+        PURGE_BATCH_SIZE at a time. FAILED events are kept.
+        """
+        sent_before = timezone.now() - timedelta(
+            days=settings.ORDER_OUTBOX_RETENTION_DAYS
+        )
+        events = OrderOutbox.all_objects.filter(status="SENT", sent_at__lt=sent_before)
+        purged = 0
+        while True:
+            ids = list(events.values_list("id", flat=True)[: cls.PURGE_BATCH_SIZE])
+            if not ids:
+                return purged
+            OrderOutbox.all_objects.filter(id__in=ids).only("id").hard_delete()
+            purged += len(ids)
+
+    @classmethod
+    def claim_events(cls):
+        """
+        Lease the next batch of due events so concurrent relays skip them.
+        If the relay dies the lease runs out and the events are sent again.
+        """
+        now = timezone.now()
+        earlier_pending_events = OrderOutbox.objects.filter(
+            order_id=OuterRef("order_id"),
+            status="PENDING",
+            created_at__lt=OuterRef("created_at"),
+        )
+        with transaction.atomic():
+            events = list(
+                OrderOutbox.objects.select_for_update(skip_locked=True, of=("self",))
+                .select_related("order")
+                .filter(status="PENDING", available_at__lte=now)
+                .filter(~Exists(earlier_pending_events))
+                .order_by("created_at")[: settings.ORDER_OUTBOX_BATCH_SIZE]
+            )
+            OrderOutbox.objects.filter(id__in=[event.id for event in events]).update(
+                available_at=now
+                + timedelta(seconds=settings.ORDER_OUTBOX_LEASE_SECONDS)
+            )
+        return events
+
+    @classmethod
+    def send_event(cls, event):
+        event.attempts += 1
+        try:
+            getattr(cls, cls.HANDLERS[event.event_type])(event.order, **event.payload)
+        except Exception as e:
+            event.last_error = str(e)
+            if event.attempts >= settings.ORDER_OUTBOX_MAX_ATTEMPTS:
+                event.status = "FAILED"
+            else:
+                event.available_at = timezone.now() + timedelta(
+                    seconds=settings.ORDER_OUTBOX_BACKOFF_SECONDS
+                    * 2 ** (event.attempts - 1)
+                )
+            event.save(
+                update_fields=["attempts", "last_error", "status", "available_at"]
+            )
+            CustomLogging.error(
+                f"Unable to send {event.event_type} for order {event.order_id}: {str(e)}"
+            )
+            return 0
+
+        event.status = "SENT"
+        event.sent_at = timezone.now()
+        event.save(update_fields=["attempts", "status", "sent_at"])
+        return 1
+
+    @classmethod
+    def send_push_notification(cls, order, user_id, title, message):
+        from authentication.service import UserService
+
+        user = UserService.get_user_qs(id=user_id).first()
+        if user is not None:
+            NotificationService.send_push_notification(user, title, message)
+
+    @classmethod
+    def send_business_webhook(cls, order, order_status, order_data):
+        FeleWebhook.queue_order_event(order, order_status, order_data)
 
 
 class OrderService:
+    # orders that keep the assigned rider busy
+    CURRENT_ORDER_STATUSES = [
+        "RIDER_ACCEPTED_ORDER",
+        "RIDER_AT_PICK_UP",
+        "RIDER_PICKED_UP_ORDER",
+        "ORDER_ARRIVED",
+    ]
+
     @classmethod
     def get_order(cls, order_id, raise_404=True, **kwargs):
         order = Order.objects.filter(order_id=order_id, **kwargs).first()
@@ -148,6 +556,50 @@ class OrderService:
     def get_order_qs(cls, **kwargs):
         return Order.objects.filter(**kwargs)
 
+    @classmethod
+    def get_order_list_qs(cls, orders=None, **kwargs):
+        """
+        Orders to be serialized as a list: loads everything the order
+        serializers read per order (rider, vehicle, users, pick up and
+        delivery times, rider photo) with a fixed number of queries for the
+        whole page.
+        :params orders: queryset to optimize, defaults to Order.objects
+        """
+        if orders is None:
+            orders = Order.objects.all()
+        return (
+            orders.filter(**kwargs)
+            .select_related(
+                "rider__user",
+                "rider__vehicle",
+                "customer__user",
+                "business__user",
+            )
+            .prefetch_related(
+                Prefetch(
+                    "order_timeline",
+                    queryset=OrderTimeline.objects.filter(
+                        status="RIDER_PICKED_UP_ORDER"
+                    ).order_by("-created_at"),
+                    to_attr="pick_up_timeline",
+                ),
+                Prefetch(
+                    "order_timeline",
+                    queryset=OrderTimeline.objects.filter(
+                        status="ORDER_DELIVERED"
+                    ).order_by("-created_at"),
+                    to_attr="delivery_timeline",
+                ),
+                Prefetch(
+                    "rider__rider_document",
+                    queryset=RiderDocument.objects.filter(
+                        type="passport_photo"
+                    ).order_by("-created_at"),
+                    to_attr="passport_photos",
+                ),
+            )
+        )
+
     @classmethod
     def get_order_timeline(cls, order):
         return OrderTimeline.objects.filter(order=order).order_by("-created_at")
@@ -159,14 +611,14 @@ class OrderService:
             Q(rider=rider, status="PENDING_RIDER_CONFIRMATION")
             | Q(rider__isnull=True, status="PENDING", vehicle=rider.vehicle)
         )
-        return orders
+        return cls.get_order_list_qs(orders)
 
     @classmethod
     def get_completed_order(cls, request):
         created_at = request.GET.get("created_at")
         timeframe = request.GET.get("timeframe")
 
-        order_qs = Order.objects.filter(
+        order_qs = cls.get_order_list_qs(
             rider__user=request.user, status="ORDER_COMPLETED"
         )
 
@@ -187,19 +639,22 @@ class OrderService:
 
     @classmethod
     def get_current_order_qs(cls, user):
-        return Order.objects.filter(
-            rider__user=user,
-            status__in=[
-                "RIDER_ACCEPTED_ORDER",
-                "RIDER_AT_PICK_UP",
-                "RIDER_PICKED_UP_ORDER",
-                "ORDER_ARRIVED",
-            ],
+        return cls.get_order_list_qs(
+            rider__user=user, status__in=cls.CURRENT_ORDER_STATUSES
         ).order_by("-created_at")
 
+    @classmethod
+    def get_busy_rider_ids(cls, **kwargs):
+        """Ids of riders with an order in one of CURRENT_ORDER_STATUSES"""
+        return set(
+            Order.objects.filter(
+                rider__isnull=False, status__in=cls.CURRENT_ORDER_STATUSES, **kwargs
+            ).values_list("rider_id", flat=True)
+        )
+
     @classmethod
     def get_failed_order(cls, user):
-        return Order.objects.filter(rider__user=user, status__in=["ORDER_CANCELLED"])
+        return cls.get_order_list_qs(rider__user=user, status__in=["ORDER_CANCELLED"])
 
     # @classmethod
     # def get_new_order(cls):
@@ -305,60 +760,69 @@ class OrderService:
         return f"{formatted_time} mins"
 
     @classmethod
-    def initiate_order(cls, user, data, is_customer_order=True):
-        pickup = data["pickup"]
-        delivery = data["delivery"]
-        stop_overs = data.get("stop_overs", [])
-        vehicle_id = data["vehicle_id"]
-        pickup_latitude = pickup["latitude"]
-        pickup_longitude = pickup["longitude"]
-        delivery_latitude = delivery["latitude"]
-        delivery_longitude = delivery["longitude"]
-        total_price = 0
-        total_distance = 0
-        total_duration = 0
-        timeline = []
-        index = 1
-
-        pickup_address_info = MapService.search_address(
-            f"{pickup_latitude},{pickup_longitude}"
+    def resolve_route(cls, pickup, delivery, stop_overs):
+        """
+        Fill in the address and name of pickup, delivery and every stop-over,
+        and resolve the distance and duration of each leg between them.
+        Returns a list of (from, to, distance_and_duration) tuples, in order.
+        """
+        # geocoding every point and resolving the route are independent, so
+        # they are all sent at once and collected in order below
+        route_lat_lngs = [
+            f"{point.get('latitude')},{point.get('longitude')}"
+            for point in [pickup, *stop_overs, delivery]
+        ]
+        legs_future = MapService.executor.submit(
+            MapService.get_distance_between_legs,
+            list(zip(route_lat_lngs, route_lat_lngs[1:])),
         )
-        if len(pickup_address_info) < 1:
-            raise CustomAPIException(
-                "Unable to locate pickup address", status.HTTP_404_NOT_FOUND
+        address_info_futures = [
+            MapService.executor.submit(MapService.search_address, lat_lng)
+            for lat_lng in route_lat_lngs
+        ]
+        (
+            pickup_address_info_future,
+            *stop_over_address_info_futures,
+            delivery_address_info_future,
+        ) = address_info_futures
+
+        try:
+            pickup_address_info = pickup_address_info_future.result()
+            if len(pickup_address_info) < 1:
+                raise CustomAPIException(
+                    "Unable to locate pickup address", status.HTTP_404_NOT_FOUND
+                )
+            pickup.update(
+                {
+                    "address": pickup_address_info[0].get("formatted_address"),
+                    "name": pickup.get("address_details", None)
+                    or pickup_address_info[0].get("name"),
+                }
             )
-        pickup.update(
-            {
-                "address": pickup_address_info[0].get("formatted_address"),
-                "name": pickup.get("address_details", None)
-                or pickup_address_info[0].get("name"),
-            }
-        )
-        delivery_address_info = MapService.search_address(
-            f"{delivery_latitude},{delivery_longitude}"
-        )
-        if len(delivery_address_info) < 1:
-            raise CustomAPIException(
-                "Unable to locate delivery address", status.HTTP_404_NOT_FOUND
+            delivery_address_info = delivery_address_info_future.result()
+            if len(delivery_address_info) < 1:
+                raise CustomAPIException(
+                    "Unable to locate delivery address", status.HTTP_404_NOT_FOUND
+                )
+            delivery.update(
+                {
+                    "address": delivery_address_info[0].get("formatted_address"),
+                    "name": delivery.get("address_details", None)
+                    or delivery_address_info[0].get("name"),
+                }
             )
-        delivery.update(
-            {
-                "address": delivery_address_info[0].get("formatted_address"),
-                "name": delivery.get("address_details", None)
-                or delivery_address_info[0].get("name"),
-            }
-        )
-
-        if stop_overs:
-            # cross-check this when it becomes useful
-            current_location = pickup
 
-            for stop_over in stop_overs:
-                stop_over_latitude = stop_over.get("latitude")
-                stop_over_longitude = stop_over.get("longitude")
-                stop_over_address_info = MapService.search_address(
-                    f"{stop_over_latitude},{stop_over_longitude}"
-                )
+            timeline_points = [
+                {
+                    "latitude": pickup.get("latitude"),
+                    "longitude": pickup.get("longitude"),
+                    "name": pickup.get("name"),
+                }
+            ]
+            for stop_over, stop_over_address_info_future in zip(
+                stop_overs, stop_over_address_info_futures
+            ):
+                stop_over_address_info = stop_over_address_info_future.result()
                 if len(stop_over_address_info) < 1:
                     raise CustomAPIException(
                         "Unable to locate stop over address", status.HTTP_404_NOT_FOUND
@@ -370,110 +834,78 @@ class OrderService:
                         or stop_over_address_info[0].get("name"),
                     }
                 )
-
-                distance_and_duration = MapService.get_distance_between_locations(
-                    f"{current_location.get('latitude')},{current_location.get('longitude')}",
-                    f"{stop_over_latitude},{stop_over_longitude}",
-                )
-                total_distance += distance_and_duration.get("distance")
-                total_duration += distance_and_duration.get("duration")
-
-                price = cls.calculate_distance_price(
-                    distance_and_duration.get("distance"),
-                    distance_and_duration.get("duration"),
-                    vehicle_id,
-                )
-                timeline.append(
+                timeline_points.append(
                     {
-                        "index": index,
-                        "from": {
-                            "latitude": current_location.get("latitude"),
-                            "longitude": current_location.get("longitude"),
-                            "name": current_location.get("name"),
-                        },
-                        "to": {
-                            "latitude": stop_over_address_info[0].get("latitude"),
-                            "longitude": stop_over_address_info[0].get("longitude"),
-                            "name": stop_over_address_info[0].get("name"),
-                        },
-                        "price": price,
-                        "total_price": total_price + price,
-                        **distance_and_duration,
+                        "latitude": stop_over_address_info[0].get("latitude"),
+                        "longitude": stop_over_address_info[0].get("longitude"),
+                        "name": stop_over_address_info[0].get("name"),
                     }
                 )
-                total_price += price
-                current_location = stop_over_address_info
-                index += 1
-
-            distance_and_duration = MapService.get_distance_between_locations(
-                f"{current_location.get('latitude')},{current_location.get('longitude')}",
-                f"{delivery.get('latitude')},{delivery.get('longitude')}",
-            )
-            total_distance += distance_and_duration.get("distance")
-            total_duration += distance_and_duration.get("duration")
-
-            price = cls.calculate_distance_price(
-                distance_and_duration.get("distance"),
-                distance_and_duration.get("duration"),
-                vehicle_id,
-            )
-            timeline.append(
+            timeline_points.append(
                 {
-                    "index": index,
-                    "from": {
-                        "latitude": current_location.get("latitude"),
-                        "longitude": current_location.get("longitude"),
-                        "name": current_location.get("name"),
-                    },
-                    "to": {
-                        "latitude": delivery.get("latitude"),
-                        "longitude": delivery.get("longitude"),
-                        "name": delivery.get("name"),
-                    },
-                    "price": price,
-                    "total_price": total_price + price,
-                    **distance_and_duration,
+                    "latitude": delivery.get("latitude"),
+                    "longitude": delivery.get("longitude"),
+                    "name": delivery.get("name"),
                 }
             )
-            total_price += price
-
-        else:
-            distance_and_duration = MapService.get_distance_between_locations(
-                f"{pickup_latitude},{pickup_longitude}",
-                f"{delivery_latitude},{delivery_longitude}",
-            )
+            legs_distance_and_duration = legs_future.result()
+        finally:
+            # don't leave lookups queued for a request that has already failed
+            for future in [legs_future, *address_info_futures]:
+                future.cancel()
+
+        legs = []
+        for (start, end), distance_and_duration in zip(
+            zip(timeline_points, timeline_points[1:]), legs_distance_and_duration
+        ):
             if distance_and_duration.get("distance") is None:
                 raise CustomAPIException(
                     "Unable to process, please check that the address or (longitude and latitude) are correct",
                     status.HTTP_400_BAD_REQUEST,
                 )
+            legs.append((start, end, distance_and_duration))
+        return legs
+
+    @classmethod
+    def initiate_order(cls, user, data, is_customer_order=True):
+        pickup = data["pickup"]
+        delivery = data["delivery"]
+        stop_overs = data.get("stop_overs", [])
+        vehicle_id = data["vehicle_id"]
+        pickup_latitude = pickup["latitude"]
+        pickup_longitude = pickup["longitude"]
+        delivery_latitude = delivery["latitude"]
+        delivery_longitude = delivery["longitude"]
+        total_price = 0
+        total_distance = 0
+        total_duration = 0
+        timeline = []
+
+        legs = cls.resolve_route(pickup, delivery, stop_overs)
+        prices = VehicleTariffService.calculate_prices(
+            [distance_and_duration["distance"] for _, _, distance_and_duration in legs],
+            [distance_and_duration["duration"] for _, _, distance_and_duration in legs],
+            [vehicle_id],
+        )[0]
+        for index, ((start, end, distance_and_duration), price) in enumerate(
+            zip(legs, prices), start=1
+        ):
+            price = float(price)
             total_distance += distance_and_duration.get("distance")
             total_duration += distance_and_duration.get("duration")
 
-            total_price += cls.calculate_distance_price(
-                distance_and_duration["distance"],
-                distance_and_duration["duration"],
-                vehicle_id,
-            )
+            timeline_entry = {"index": index, "from": start, "to": end}
+            if not stop_overs:
+                timeline_entry["vehicle_id"] = vehicle_id
             timeline.append(
                 {
-                    "index": index,
-                    "from": {
-                        "latitude": pickup.get("latitude"),
-                        "longitude": pickup.get("longitude"),
-                        "name": pickup.get("name"),
-                    },
-                    "to": {
-                        "latitude": delivery.get("latitude"),
-                        "longitude": delivery.get("longitude"),
-                        "name": delivery.get("name"),
-                    },
-                    "vehicle_id": vehicle_id,
-                    "price": total_price,
-                    "total_price": total_price,
+                    **timeline_entry,
+                    "price": price,
+                    "total_price": total_price + price,
                     **distance_and_duration,
                 }
             )
+            total_price += price
 
         order_id = generate_orderid()
         pickup["latitude"] = pickup_latitude
@@ -512,32 +944,53 @@ class OrderService:
         return data
 
     @classmethod
-    def calculate_distance_price(cls, distance, duration, vehicle_id):
-        vehicle = VehicleService.get_vehicle(vehicle_id=vehicle_id)
-        base_fare = vehicle.base_fare
-        price_per_km_0_5 = vehicle.km_5_below_fare
-        price_per_km_5_above = vehicle.km_5_above_fare
-        price_per_minute = vehicle.price_per_minute
-
-        # Convert distance from meters to kilometers
-        distance_km = distance / 1000
-
-        if distance_km <= 5:
-            price_distance = base_fare + distance_km * price_per_km_0_5
-        else:
-            price_distance = (
-                base_fare
-                + 5 * price_per_km_0_5
-                + (distance_km - 5) * price_per_km_5_above
-            )
-
-        # Calculate the price based on the duration
-        price_duration = duration / 60 * price_per_minute
+    def get_vehicle_quotes(cls, data):
+        """
+        Quote the same route for every available vehicle. The route is
+        resolved once and all vehicles are priced in a single pass.
+        """
+        pickup = data["pickup"]
+        delivery = data["delivery"]
+        stop_overs = data.get("stop_overs", [])
 
-        # Total price is the sum of distance and duration prices
-        total_price = price_distance + price_duration
+        legs = cls.resolve_route(pickup, delivery, stop_overs)
+        distances = [
+            distance_and_duration["distance"] for _, _, distance_and_duration in legs
+        ]
+        durations = [
+            distance_and_duration["duration"] for _, _, distance_and_duration in legs
+        ]
+        vehicles = list(VehicleService.get_available_vehicles())
+        prices = VehicleTariffService.calculate_prices(
+            distances, durations, [vehicle.id for vehicle in vehicles]
+        ).sum(axis=1)
+
+        for location in [pickup, delivery, *stop_overs]:
+            location.pop("save_address", None)
+        return {
+            "pickup": pickup,
+            "delivery": delivery,
+            "stop_overs": stop_overs,
+            "total_distance": sum(distances),
+            "total_duration": sum(durations),
+            "vehicles": [
+                {
+                    "id": vehicle.id,
+                    "name": vehicle.name,
+                    "note": vehicle.note,
+                    "file_url": vehicle.file_url,
+                    "total_price": round(float(price), 2),
+                }
+                for vehicle, price in zip(vehicles, prices)
+            ],
+        }
 
-        return total_price
+    @classmethod
+    def calculate_distance_price(cls, distance, duration, vehicle_id):
+        prices = VehicleTariffService.calculate_prices(
+            [distance], [duration], [vehicle_id]
+        )
+        return float(prices[0, 0])
 
     @classmethod
     def place_order(cls, user, order_id, data, session_id):
@@ -574,8 +1027,7 @@ class OrderService:
             context=dict({"order_id": order_id}),
             category="ORDER",
             action="CUSTOMER_PLACE_ORDER",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -585,16 +1037,49 @@ class OrderService:
     def notify_riders_around_location(cls, order):
         from authentication.service import UserService
 
+        busy_rider_ids = cls.get_busy_rider_ids(rider__vehicle=order.vehicle)
         on_duty_users = UserService.get_user_qs(
             rider__on_duty=True, rider__vehicle=order.vehicle
-        )
+        ).exclude(rider__id__in=busy_rider_ids)
+
+        nearby_rider_ids = cls.get_nearby_free_rider_ids(order, busy_rider_ids)
+        if nearby_rider_ids:
+            on_duty_users = on_duty_users.filter(rider__id__in=nearby_rider_ids)
+        elif not settings.RIDER_DISPATCH_FALLBACK_TO_BROADCAST:
+            return
 
+        user_ids = list(on_duty_users.values_list("id", flat=True).distinct())
         title = f"New order request #{order.order_id}"
         message = f"New customer order. Pick up: {order.pickup_name}."
-        NotificationService.send_collective_push_notification(
-            on_duty_users, title, message
+        # the push fan-out runs in a worker so placing the order doesn't wait on it
+        transaction.on_commit(
+            lambda: send_bulk_push_notification.delay(user_ids, title, message),
+            robust=True,
         )
-        # TODO: check not busy, active riders within 5km and notify
+
+    @classmethod
+    def get_nearby_free_rider_ids(cls, order, busy_rider_ids):
+        """
+        Nearest riders to the pick up that are not on another order, at most
+        RIDER_DISPATCH_MAX_RIDERS within RIDER_DISPATCH_RADIUS_KM.
+        """
+        try:
+            riders = RiderLocationService.get_nearby_rider_ids(
+                latitude=float(order.pickup_location_latitude),
+                longitude=float(order.pickup_location_longitude),
+                vehicle_id=order.vehicle_id,
+                # busy riders are filtered out below, so leave room for them
+                count=settings.RIDER_DISPATCH_MAX_RIDERS + len(busy_rider_ids),
+            )
+        except (TypeError, ValueError):
+            return []
+        except Exception as e:
+            CustomLogging.error(f"Unable to search rider locations: {str(e)}")
+            return []
+        free_rider_ids = [
+            rider_id for rider_id, _ in riders if rider_id not in busy_rider_ids
+        ]
+        return free_rider_ids[: settings.RIDER_DISPATCH_MAX_RIDERS]
 
     @classmethod
     def add_rider_tip(cls, user, order_id, tip_amount, session_id):
@@ -608,8 +1093,7 @@ class OrderService:
             context=dict({"tip_amount": tip_amount, "order_id": order.order_id}),
             category="ORDER",
             action="CUSTOMER_ADDED_TIP",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -617,13 +1101,31 @@ class OrderService:
 
     @classmethod
     def add_order_timeline_entry(cls, order, order_status, **kwargs):
-        return OrderTimeline.objects.create(
+        order_timeline = OrderTimeline.objects.create(
             order=order,
             status=order_status,
             proof_url=kwargs.pop("proof_url", None),
             reason=kwargs.pop("reason", None),
             meta_data=dict(**kwargs),
         )
+        if order_timeline.proof_url:
+            transaction.on_commit(
+                lambda: create_order_proof_renditions.delay(order_timeline.id),
+                robust=True,
+            )
+        return order_timeline
+
+    @classmethod
+    def create_proof_renditions(cls, order_timeline_id):
+        order_timeline = OrderTimeline.objects.filter(id=order_timeline_id).first()
+        if order_timeline is None:
+            return None
+        renditions = ImageRenditionService.create_renditions(order_timeline.proof_url)
+        if renditions:
+            OrderTimeline.objects.filter(id=order_timeline_id).update(
+                proof_renditions=renditions
+            )
+        return renditions
 
     @classmethod
     def assign_rider_to_order(cls, user, order_id, rider_id, session_id):
@@ -646,24 +1148,26 @@ class OrderService:
             raise CustomAPIException(
                 "Rider is not on duty.", status.HTTP_400_BAD_REQUEST
             )
-        cls.add_order_timeline_entry(order, "CUSTOMER_ASSIGN_RIDER")
-        cls.add_order_timeline_entry(order, "PENDING_RIDER_CONFIRMATION")
-
-        order.rider = favourite_rider.rider
-        order.status = "PENDING_RIDER_CONFIRMATION"
-        order.save()
-        title = f"New order request #{order_id}"
-        message = "A customer assigned you to an order. See order to accept or decline."
-        NotificationService.send_push_notification(
-            favourite_rider.rider.user, title, message
-        )
+        with transaction.atomic():
+            cls.add_order_timeline_entry(order, "CUSTOMER_ASSIGN_RIDER")
+            cls.add_order_timeline_entry(order, "PENDING_RIDER_CONFIRMATION")
+
+            order.rider = favourite_rider.rider
+            order.status = "PENDING_RIDER_CONFIRMATION"
+            order.save()
+            title = f"New order request #{order_id}"
+            message = (
+                "A customer assigned you to an order. See order to accept or decline."
+            )
+            OrderOutboxService.add_push_notification(
+                order, favourite_rider.rider.user, title, message
+            )
 
         track_user_activity(
             context=dict({"rider": order.rider.id, "order_id": order.order_id}),
             category="ORDER",
             action="CUSTOMER_ASSIGN_RIDER",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -674,17 +1178,26 @@ class OrderService:
         favorite_rider = kwargs.get("favorite_rider", False)
         rating = kwargs.get("rating")
         remark = kwargs.get("remark", None)
-        rider_rating = RiderRating.objects.filter(
-            rider=order.rider, customer=order.customer
-        ).first()
-        if rider_rating:
-            rider_rating.remark = remark
-            rider_rating.rating = rating
-            rider_rating.save()
-        else:
-            RiderRating.objects.create(
-                rider=order.rider, customer=order.customer, remark=remark, rating=rating
+        with transaction.atomic():
+            rider_rating = (
+                RiderRating.objects.select_for_update()
+                .filter(rider=order.rider, customer=order.customer)
+                .first()
             )
+            previous_rating = None
+            if rider_rating:
+                previous_rating = rider_rating.rating
+                rider_rating.remark = remark
+                rider_rating.rating = rating
+                rider_rating.save()
+            else:
+                RiderRating.objects.create(
+                    rider=order.rider,
+                    customer=order.customer,
+                    remark=remark,
+                    rating=rating,
+                )
+            cls.update_rider_rating_totals(order.rider_id, previous_rating, rating)
         if favorite_rider:
             FavoriteRider.objects.create(rider=order.rider, customer=order.customer)
         track_user_activity(
@@ -693,13 +1206,23 @@ class OrderService:
             ),
             category="ORDER",
             action="CUSTOMER_RATE_RIDER",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
         return True
 
+    @classmethod
+    def update_rider_rating_totals(cls, rider_id, previous_rating, rating):
+        """Move the rider's rating_sum/rating_count from one score to another"""
+        rating_sum = (rating or 0) - (previous_rating or 0)
+        rating_count = (rating is not None) - (previous_rating is not None)
+        if rating_sum or rating_count:
+            Rider.objects.filter(id=rider_id).update(
+                rating_sum=F("rating_sum") + rating_sum,
+                rating_count=F("rating_count") + rating_count,
+            )
+
     @classmethod
     def customer_cancel_order(cls, user, order_id, session_id, reason):
         order = cls.get_order(order_id, customer__user=user)
@@ -717,12 +1240,13 @@ class OrderService:
         )
         order.status = "ORDER_CANCELLED"
         order.save()
+        if order.rider_id:
+            RiderLocationService.end_trail(order.rider_id)
         track_user_activity(
             context=dict({"order_id": order_id, "reason": reason}),
             category="ORDER",
             action="CUSTOMER_CANCELLED_ORDER",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -748,26 +1272,27 @@ class OrderService:
             )
 
         rider = RiderService.get_rider(user=user)
-        cls.add_order_timeline_entry(order, "RIDER_ACCEPTED_ORDER")
-
-        order.rider = rider
-        order.status = "RIDER_ACCEPTED_ORDER"
-        order.save()
-        title = f"Rider accept order #{order_id}"
-        if order.is_customer_order():
-            message = f"You order has been accepted by {rider.display_name}. Vehicle type: {rider.vehicle_type} \n Plate number: {rider.vehicle_plate_number}"
-            NotificationService.send_push_notification(
-                order.customer.user, title, message
-            )
-        else:
-            FeleWebhook.send_order_to_webhook(order)
+        with transaction.atomic():
+            cls.add_order_timeline_entry(order, "RIDER_ACCEPTED_ORDER")
+
+            order.rider = rider
+            order.status = "RIDER_ACCEPTED_ORDER"
+            order.save()
+            RiderLocationService.start_trail(rider.id, order.order_id)
+            title = f"Rider accept order #{order_id}"
+            if order.is_customer_order():
+                message = f"You order has been accepted by {rider.display_name}. Vehicle type: {rider.vehicle_type} \n Plate number: {rider.vehicle_plate_number}"
+                OrderOutboxService.add_push_notification(
+                    order, order.customer.user, title, message
+                )
+            else:
+                OrderOutboxService.add_business_webhook(order)
 
         track_user_activity(
             context=dict({"order_id": order_id}),
             category="ORDER",
             action="RIDER_ACCEPTED_ORDER",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -776,56 +1301,71 @@ class OrderService:
     @classmethod
     def rider_at_pickup(cls, order_id, user, session_id):
         order = cls.get_order(order_id, rider__user=user)
-        cls.add_order_timeline_entry(order, "RIDER_AT_PICK_UP")
-        order.status = "RIDER_AT_PICK_UP"
-        order.save()
-        if order.is_customer_order():
-            title = f"Rider arrived at pickup: #{order_id}"
-            message = f"Your rider {order.rider.display_name}, is at pickup location: {order.pickup_name}"
-            NotificationService.send_push_notification(
-                order.customer.user, title, message
-            )
-        else:
-            FeleWebhook.send_order_to_webhook(order)
+        with transaction.atomic():
+            cls.add_order_timeline_entry(order, "RIDER_AT_PICK_UP")
+            order.status = "RIDER_AT_PICK_UP"
+            order.save()
+            if order.is_customer_order():
+                title = f"Rider arrived at pickup: #{order_id}"
+                message = f"Your rider {order.rider.display_name}, is at pickup location: {order.pickup_name}"
+                OrderOutboxService.add_push_notification(
+                    order, order.customer.user, title, message
+                )
+            else:
+                OrderOutboxService.add_business_webhook(order)
 
         track_user_activity(
             context=dict({"order_id": order_id}),
             category="ORDER",
             action="RIDER_AT_PICK_UP",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
 
     @classmethod
-    def rider_at_order_pickup(cls, order_id, user, file, session_id):
+    def create_proof_upload(cls, order_id, user, file_name, content_type):
+        cls.get_order(order_id, rider__user=user)
+        return S3Uploader(append_folder=f"/order/{order_id}").create_presigned_upload(
+            user.id, file_name, content_type
+        )
+
+    @classmethod
+    def get_proof_url(cls, order_id, user, file=None, upload_key=None):
+        """
+        Proof files are either uploaded straight to S3 through
+        create_proof_upload and confirmed by key, or sent with the request
+        """
+        s3_uploader = S3Uploader(append_folder=f"/order/{order_id}")
+        if upload_key:
+            return s3_uploader.confirm_presigned_upload(user.id, upload_key)
+        return s3_uploader.upload_file_object(file, file.name)
+
+    @classmethod
+    def rider_at_order_pickup(cls, order_id, user, file, session_id, upload_key=None):
         order = cls.get_order(order_id, rider__user=user)
 
-        file_name = file.name
-        file_url = S3Uploader(append_folder=f"/order/{order_id}").upload_file_object(
-            file, file_name
-        )
-        cls.add_order_timeline_entry(
-            order, "RIDER_PICKED_UP_ORDER", **{"proof_url": file_url}
-        )
-        order.status = "RIDER_PICKED_UP_ORDER"
-        order.save()
-        if order.is_customer_order():
-            title = f"Rider on the way to deliver: #{order_id}"
-            message = "Your goods are on the way to drop off"
-            NotificationService.send_push_notification(
-                order.customer.user, title, message
+        file_url = cls.get_proof_url(order_id, user, file, upload_key)
+        with transaction.atomic():
+            cls.add_order_timeline_entry(
+                order, "RIDER_PICKED_UP_ORDER", **{"proof_url": file_url}
             )
-        else:
-            FeleWebhook.send_order_to_webhook(order)
+            order.status = "RIDER_PICKED_UP_ORDER"
+            order.save()
+            if order.is_customer_order():
+                title = f"Rider on the way to deliver: #{order_id}"
+                message = "Your goods are on the way to drop off"
+                OrderOutboxService.add_push_notification(
+                    order, order.customer.user, title, message
+                )
+            else:
+                OrderOutboxService.add_business_webhook(order)
 
         track_user_activity(
             context=dict({"order_id": order_id, "proof_url": file_url}),
             category="ORDER",
             action="RIDER_PICKED_UP_ORDER",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -834,25 +1374,26 @@ class OrderService:
     def rider_failed_pickup(cls, order_id, user, reason, session_id):
         order = cls.get_order(order_id, rider__user=user)
 
-        cls.add_order_timeline_entry(order, "FAILED_PICKUP", **{"reason": reason})
-        cls.add_order_timeline_entry(order, "ORDER_CANCELLED")
-        order.status = "ORDER_CANCELLED"
-        order.save()
-        if order.is_customer_order():
-            title = f"Rider failed to pick order: #{order_id}"
-            message = f"Your rider {order.rider.display_name}, failed to pick up because: {reason}"
-            NotificationService.send_push_notification(
-                order.customer.user, title, message
-            )
-        else:
-            FeleWebhook.send_order_to_webhook(order)
+        with transaction.atomic():
+            cls.add_order_timeline_entry(order, "FAILED_PICKUP", **{"reason": reason})
+            cls.add_order_timeline_entry(order, "ORDER_CANCELLED")
+            order.status = "ORDER_CANCELLED"
+            order.save()
+            RiderLocationService.end_trail(order.rider_id)
+            if order.is_customer_order():
+                title = f"Rider failed to pick order: #{order_id}"
+                message = f"Your rider {order.rider.display_name}, failed to pick up because: {reason}"
+                OrderOutboxService.add_push_notification(
+                    order, order.customer.user, title, message
+                )
+            else:
+                OrderOutboxService.add_business_webhook(order)
 
         track_user_activity(
             context=dict({"order_id": order_id, "reason": reason}),
             category="ORDER",
             action="RIDER_FAILED_PICKUP",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -860,51 +1401,49 @@ class OrderService:
     @classmethod
     def rider_at_destination(cls, order_id, user, session_id):
         order = cls.get_order(order_id, rider__user=user)
-        cls.add_order_timeline_entry(order, "ORDER_ARRIVED")
-        order.status = "ORDER_ARRIVED"
-        order.save()
-        if order.is_customer_order():
-            title = f"Rider at drop off: #{order_id}"
-            message = f"Your rider {order.rider.display_name}, is at drop off point: {order.delivery_name}"
-            NotificationService.send_push_notification(
-                order.customer.user, title, message
-            )
-        else:
-            FeleWebhook.send_order_to_webhook(order)
+        with transaction.atomic():
+            cls.add_order_timeline_entry(order, "ORDER_ARRIVED")
+            order.status = "ORDER_ARRIVED"
+            order.save()
+            if order.is_customer_order():
+                title = f"Rider at drop off: #{order_id}"
+                message = f"Your rider {order.rider.display_name}, is at drop off point: {order.delivery_name}"
+                OrderOutboxService.add_push_notification(
+                    order, order.customer.user, title, message
+                )
+            else:
+                OrderOutboxService.add_business_webhook(order)
 
         track_user_activity(
             context=dict({"order_id": order_id}),
             category="ORDER",
             action="RIDER_AT_DESTINATION",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
 
     @classmethod
-    def rider_made_delivery(cls, order_id, user, file, session_id):
+    def rider_made_delivery(cls, order_id, user, file, session_id, upload_key=None):
         order = cls.get_order(order_id, rider__user=user)
 
-        file_name = file.name
-        file_url = S3Uploader(append_folder=f"/order/{order_id}").upload_file_object(
-            file, file_name
-        )
-        cls.add_order_timeline_entry(
-            order, "ORDER_DELIVERED", **{"proof_url": file_url}
-        )
-        order.delivery_time = timezone.now()
-        order.status = "ORDER_DELIVERED"
-        order.save()
-        if order.is_business_order():
-            FeleWebhook.send_order_to_webhook(order)
+        file_url = cls.get_proof_url(order_id, user, file, upload_key)
+        with transaction.atomic():
+            cls.add_order_timeline_entry(
+                order, "ORDER_DELIVERED", **{"proof_url": file_url}
+            )
+            order.delivery_time = timezone.now()
+            order.status = "ORDER_DELIVERED"
+            order.save()
+            cls.save_order_trail(order)
+            if order.is_business_order():
+                OrderOutboxService.add_business_webhook(order)
 
         track_user_activity(
             context=dict({"order_id": order_id, "proof_url": file_url}),
             category="ORDER",
             action="RIDER_MADE_DELIVERY",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -916,44 +1455,81 @@ class OrderService:
 
         return True
 
+    @classmethod
+    def save_order_trail(cls, order):
+        """Write the rider's recorded trail for the order in compressed segments"""
+        points = RiderLocationService.end_trail(order.rider_id)
+        segment_size = settings.RIDER_TRAIL_SEGMENT_POINTS
+        current_timezone = timezone.get_current_timezone()
+        order_trails = []
+        for sequence, index in enumerate(range(0, len(points), segment_size)):
+            segment = points[index : index + segment_size]
+            timestamps = [recorded_at for recorded_at, _, _ in segment]
+            order_trails.append(
+                OrderTrail(
+                    order=order,
+                    sequence=sequence,
+                    polyline=polyline.encode(
+                        [(latitude, longitude) for _, latitude, longitude in segment]
+                    ),
+                    time_offsets=[
+                        current - previous
+                        for previous, current in zip(timestamps, timestamps[1:])
+                    ],
+                    point_count=len(segment),
+                    started_at=datetime.fromtimestamp(
+                        timestamps[0], tz=current_timezone
+                    ),
+                    ended_at=datetime.fromtimestamp(
+                        timestamps[-1], tz=current_timezone
+                    ),
+                )
+            )
+        return OrderTrail.objects.bulk_create(order_trails)
+
     @classmethod
     def rider_received_payment(cls, order_id, user, session_id):
         order = cls.get_order(order_id, rider__user=user)
-        rider_commission = RiderCommission.objects.filter(rider=order.rider).latest()
-        if rider_commission:
-            charge = 100 - int(rider_commission.commission.commission)
-        else:
-            charge = settings.FELE_CHARGE
+        charge = RiderCommissionService.get_fele_charge(order.rider_id)
 
-        cls.add_order_timeline_entry(order, "ORDER_COMPLETED")
-        order.paid = True
-        order.status = "ORDER_COMPLETED"
-        order.fele_amount = order.total_amount * Decimal(charge / 100)
-        order.paid_fele = True
-        order.save()
-        rider_user = order.rider.user
-        rider_user_wallet = rider_user.get_user_wallet()
-        reference = generate_id()
-        TransactionService.create_transaction(
-            transaction_type="CREDIT",
-            transaction_status="SUCCESS",
-            amount=order.total_amount,
-            user=rider_user,
-            reference=reference,
-            payment_category="CUSTOMER_PAY_RIDER",
-            wallet_id=rider_user_wallet.id,
-        )
-        rider_user_wallet.withdraw(order.fele_amount, deduct_negative=True)
-        title = f"Order Completed: #{order_id}"
-        message = "Order completed, don't forget to rate rider."
-        NotificationService.send_push_notification(order.customer.user, title, message)
+        with transaction.atomic():
+            cls.add_order_timeline_entry(order, "ORDER_COMPLETED")
+            order.paid = True
+            order.status = "ORDER_COMPLETED"
+            order.fele_amount = order.total_amount * Decimal(charge / 100)
+            order.paid_fele = True
+            order.save()
+            rider_user = order.rider.user
+            rider_user_wallet = rider_user.get_user_wallet()
+            reference = generate_id()
+            TransactionService.create_transaction(
+                transaction_type="CREDIT",
+                transaction_status="SUCCESS",
+                amount=order.total_amount,
+                user=rider_user,
+                reference=reference,
+                payment_category="CUSTOMER_PAY_RIDER",
+                wallet_id=rider_user_wallet.id,
+            )
+            WalletService.debit_wallet(
+                rider_user_wallet,
+                order.fele_amount,
+                "FELE_REVENUE",
+                reference,
+                f"Fele charge for order #{order_id}",
+                deduct_negative=True,
+            )
+            title = f"Order Completed: #{order_id}"
+            message = "Order completed, don't forget to rate rider."
+            OrderOutboxService.add_push_notification(
+                order, order.customer.user, title, message
+            )
 
         track_user_activity(
             context=dict({"order_id": order_id}),
             category="ORDER",
             action="RIDER_RECEIVED_PAYMENT",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -967,10 +1543,16 @@ class OrderService:
             customer_user = order.customer.user
             customer_user_wallet = customer_user.get_user_wallet()
             transaction_obj = None
-            if customer_user_wallet.balance > amount:
-                # debit wallet and mark as completed
-                reference = generate_id()
-                customer_user_wallet.withdraw(amount)
+            reference = generate_id()
+            debited_balance = WalletService.debit_wallet(
+                customer_user_wallet,
+                amount,
+                "ORDER_SETTLEMENT",
+                reference,
+                f"Payment for order #{order.order_id}",
+            )
+            if debited_balance is not None:
+                # debited wallet, mark as completed
                 transaction_obj = TransactionService.create_transaction(
                     transaction_type="DEBIT",
                     transaction_status="SUCCESS",
@@ -984,12 +1566,7 @@ class OrderService:
                     context=dict({"order_id": order.order_id, "amount": float(amount)}),
                     category="ORDER",
                     action="CUSTOMER_PAY_RIDER_WITH_WALLET",
-                    email=order.customer.user.email
-                    if order.customer.user.email
-                    else None,
-                    phone_number=order.customer.user.phone_number
-                    if order.customer.user.phone_number
-                    else None,
+                    user=order.customer.user,
                     level="SUCCESS",
                     session_id=session_id,
                 )
@@ -1019,12 +1596,7 @@ class OrderService:
                             ),
                             category="ORDER",
                             action="CUSTOMER_PAY_RIDER_WITH_CARD",
-                            email=order.customer.user.email
-                            if order.customer.user.email
-                            else None,
-                            phone_number=order.customer.user.phone_number
-                            if order.customer.user.phone_number
-                            else None,
+                            user=order.customer.user,
                             level="SUCCESS",
                             session_id=session_id,
                         )
@@ -1043,10 +1615,16 @@ class OrderService:
             business_user = order.business.user
             business_user_wallet = business_user.get_user_wallet()
             transaction_obj = None
-            if business_user_wallet.balance > amount:
-                # debit wallet and mark as completed
-                reference = generate_id()
-                business_user_wallet.withdraw(amount)
+            reference = generate_id()
+            debited_balance = WalletService.debit_wallet(
+                business_user_wallet,
+                amount,
+                "ORDER_SETTLEMENT",
+                reference,
+                f"Payment for order #{order.order_id}",
+            )
+            if debited_balance is not None:
+                # debited wallet, mark as completed
                 transaction_obj = TransactionService.create_transaction(
                     transaction_type="DEBIT",
                     transaction_status="SUCCESS",
@@ -1060,7 +1638,7 @@ class OrderService:
                     context=dict({"order_id": order.order_id, "amount": float(amount)}),
                     category="ORDER",
                     action="BUSINESS_PAY_RIDER_WITH_WALLET",
-                    email=order.business.user.email,
+                    user=order.business.user,
                     level="SUCCESS",
                     session_id=session_id,
                 )
@@ -1090,7 +1668,7 @@ class OrderService:
                             ),
                             category="ORDER",
                             action="BUSINESS_PAY_RIDER_WITH_CARD",
-                            email=order.business.user.email,
+                            user=order.business.user,
                             level="SUCCESS",
                             session_id=session_id,
                         )
@@ -1104,11 +1682,7 @@ class OrderService:
     @classmethod
     def credit_rider(cls, order, transaction_obj, session_id):
         amount = transaction_obj.amount
-        rider_commission = RiderCommission.objects.filter(rider=order.rider).latest()
-        if rider_commission:
-            charge = 100 - int(rider_commission.commission.commission)
-        else:
-            charge = settings.FELE_CHARGE
+        charge = RiderCommissionService.get_fele_charge(order.rider_id)
 
         cls.add_order_timeline_entry(order, "ORDER_COMPLETED")
         order.paid = True
@@ -1129,15 +1703,18 @@ class OrderService:
             payment_category="CUSTOMER_PAY_RIDER",
             wallet_id=rider_user_wallet.id,
         )
-        rider_user_wallet.deposit(order.total_amount - order.fele_amount)
+        WalletService.credit_wallet(
+            rider_user_wallet,
+            order.total_amount - order.fele_amount,
+            "ORDER_SETTLEMENT",
+            transaction_obj.reference,
+            f"Payment for order #{order.order_id}",
+        )
         track_user_activity(
             context=dict({"order_id": order.order_id, "amount": float(amount)}),
             category="ORDER",
             action="RIDER_RECEIVE_PAYMENT",
-            email=order.rider.user.email if order.rider.user.email else None,
-            phone_number=order.rider.user.phone_number
-            if order.rider.user.phone_number
-            else None,
+            user=order.rider.user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -1224,7 +1801,7 @@ class OrderService:
             context=dict({"order_id": order_id}),
             category="ORDER",
             action="BUSINESS_PLACE_ORDER",
-            email=user.email,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -1247,11 +1824,13 @@ class OrderService:
         )
         order.status = "ORDER_CANCELLED"
         order.save()
+        if order.rider_id:
+            RiderLocationService.end_trail(order.rider_id)
         track_user_activity(
             context=dict({"order_id": order_id, "reason": reason}),
             category="ORDER",
             action="BUSINESS_CANCELLED_ORDER",
-            email=user.email,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
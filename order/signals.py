@@ -0,0 +1,23 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from order.models import Order, Vehicle
+
+
+@receiver(post_save, sender=Vehicle)
+@receiver(post_delete, sender=Vehicle)
+def invalidate_vehicle_tariffs(sender, **kwargs):
+    from order.service import VehicleTariffService
+
+    transaction.on_commit(VehicleTariffService.invalidate)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def invalidate_rider_stats(sender, instance, **kwargs):
+    from rider.service import RiderStatsService
+
+    rider_id = instance.rider_id
+    if rider_id is not None:
+        transaction.on_commit(lambda: RiderStatsService.invalidate(rider_id))
@@ -0,0 +1,22 @@
+from celery import shared_task
+
+
+@shared_task(name="task.relay_order_outbox")
+def relay_order_outbox():
+    from order.service import OrderOutboxService
+
+    return OrderOutboxService.relay()
+
+
+@shared_task(name="task.purge_order_outbox")
+def purge_order_outbox():
+    from order.service import OrderOutboxService
+
+    return OrderOutboxService.purge_sent_events()
+
+
+@shared_task(name="task.create_order_proof_renditions")
+def create_order_proof_renditions(order_timeline_id):
+    from order.service import OrderService
+
+    return OrderService.create_proof_renditions(order_timeline_id)
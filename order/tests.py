@@ -0,0 +1,174 @@
+from unittest import skipUnless
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from authentication.models import User
+from business.models import Business
+from business.service import BusinessAuth
+from customer.models import Customer
+from order.models import Order, OrderTimeline, Vehicle
+from order.serializers import (
+    GetCustomerOrderSerializer,
+    GetOrderSerializer,
+    OrderHistorySerializer,
+)
+from order.service import OrderService
+from rider.models import Rider, RiderDocument
+from wallet.models import Wallet
+
+
+class OrderListQueryCountTest(TestCase):
+    """
+    Serializing a page of orders from OrderService.get_order_list_qs must
+    take the same number of queries whatever the page size.
+    """
+
+    ORDER_COUNT = 12
+
+    @classmethod
+    def setUpTestData(cls):
+        customer_user = User.objects.create_user(
+            email="customer@fele.test", password="password"
+        )
+        cls.customer = Customer.objects.create(user=customer_user)
+        business_user = User.objects.create_user(
+            email="business@fele.test", password="password"
+        )
+        cls.business = Business.objects.create(user=business_user)
+        vehicle = Vehicle.objects.create(
+            name="Bike", base_fare=500, km_5_below_fare=100, km_5_above_fare=80
+        )
+
+        riders = []
+        for index in range(3):
+            rider_user = User.objects.create_user(
+                email=f"rider{index}@fele.test", password="password"
+            )
+            rider = Rider.objects.create(
+                user=rider_user, vehicle=vehicle, status="APPROVED"
+            )
+            RiderDocument.objects.create(
+                rider=rider,
+                type="passport_photo",
+                file_url=f"https://fele.test/rider{index}.jpg",
+            )
+            riders.append(rider)
+        cls.rider = riders[0]
+
+        for index in range(cls.ORDER_COUNT):
+            order = Order.objects.create(
+                order_id=f"ORD{index}",
+                customer=cls.customer,
+                business=cls.business,
+                rider=riders[0] if index % 2 else riders[index % len(riders)],
+                vehicle=vehicle,
+                status="ORDER_COMPLETED",
+                distance="1000",
+                duration="600",
+            )
+            OrderTimeline.objects.create(order=order, status="RIDER_PICKED_UP_ORDER")
+            OrderTimeline.objects.create(order=order, status="ORDER_DELIVERED")
+
+    def count_queries(self, serializer_class, page_size, **kwargs):
+        orders = OrderService.get_order_list_qs(**kwargs).order_by("-created_at")
+        with CaptureQueriesContext(connection) as queries:
+            data = serializer_class(orders[:page_size], many=True).data
+        self.assertEqual(len(data), page_size)
+        return len(queries)
+
+    def assertConstantQueries(self, serializer_class, **kwargs):
+        small_page = self.count_queries(serializer_class, 2, **kwargs)
+        large_page = self.count_queries(serializer_class, self.ORDER_COUNT, **kwargs)
+        self.assertEqual(small_page, large_page)
+
+    def test_customer_order_list(self):
+        self.assertConstantQueries(GetCustomerOrderSerializer, customer=self.customer)
+
+    def test_customer_order_history(self):
+        self.assertConstantQueries(OrderHistorySerializer, customer=self.customer)
+
+    def test_business_order_list(self):
+        self.assertConstantQueries(GetCustomerOrderSerializer, business=self.business)
+
+    def test_rider_order_list(self):
+        # every other order belongs to self.rider
+        small_page = self.count_queries(GetOrderSerializer, 2, rider=self.rider)
+        large_page = self.count_queries(GetOrderSerializer, 6, rider=self.rider)
+        self.assertEqual(small_page, large_page)
+
+
+@skipUnless(connection.vendor == "postgresql", "the indexes are planned for postgres")
+class OrderIndexTest(TestCase):
+    """
+    The hot order querysets are planned on the indexes added for them. Enough
+    finished orders are seeded and analyzed for the planner to prefer the
+    indexes over sequential scans, as it does on the real table.
+    """
+
+    ORDER_COUNT = 5000
+
+    @classmethod
+    def setUpTestData(cls):
+        vehicles = [
+            Vehicle.objects.create(
+                name=name, base_fare=500, km_5_below_fare=100, km_5_above_fare=80
+            )
+            for name in ("Bike", "Car", "Van", "Truck")
+        ]
+        users = User.objects.bulk_create(
+            User(email=f"user{index}@fele.test", password=make_password(None))
+            for index in range(550)
+        )
+        businesses = Business.objects.bulk_create(
+            Business(user=user) for user in users[:500]
+        )
+        riders = Rider.objects.bulk_create(
+            Rider(user=user, vehicle=vehicles[index % len(vehicles)], status="APPROVED")
+            for index, user in enumerate(users[500:])
+        )
+        cls.business_user, cls.rider_user = businesses[0].user, riders[0].user
+        Wallet.objects.create(user=cls.business_user)
+
+        orders = []
+        for index in range(cls.ORDER_COUNT):
+            status, rider = "ORDER_COMPLETED", riders[index % len(riders)]
+            if index % 100 == 0:
+                status, rider = "PENDING", None
+            elif index % 100 == 1:
+                status = "RIDER_PICKED_UP_ORDER"
+            orders.append(
+                Order(
+                    order_id=f"ORD{index}",
+                    business=businesses[index % len(businesses)],
+                    rider=rider,
+                    vehicle=vehicles[index % len(vehicles)],
+                    status=status,
+                    distance="1000",
+                    duration="600",
+                )
+            )
+        Order.objects.bulk_create(orders)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertUsesIndex(self, queryset, index_name):
+        self.assertIn(index_name, queryset.explain())
+
+    def test_get_order(self):
+        orders = OrderService.get_order_qs(order_id="ORD3")
+        self.assertUsesIndex(orders, "order_order_id_key")
+
+    def test_new_order_broadcast(self):
+        orders = OrderService.get_new_order(self.rider_user).order_by("-created_at")
+        self.assertUsesIndex(orders, "order_unassigned_pending_idx")
+
+    def test_current_order(self):
+        orders = OrderService.get_current_order_qs(self.rider_user)
+        self.assertUsesIndex(orders, "order_rider_active_idx")
+
+    def test_business_dashboard(self):
+        dashboard = BusinessAuth.get_business_dashboard_view(self.business_user)
+        self.assertUsesIndex(dashboard["orders"], "order_business_created_idx")
@@ -29,11 +29,13 @@ from order.serializers import (
     OrderHistorySerializer,
     PlaceBusinessOrderSerializer,
     PlaceOrderSerializer,
+    ProofUploadSerializer,
     RateRiderSerializer,
     RetrieveVehicleSerializer,
     RiderFailedPickupSerializer,
     RiderOrderSerializer,
     RiderPickUpOrderSerializer,
+    VehicleQuoteSerializer,
 )
 from order.service import MapService, OrderService, VehicleService
 
@@ -120,7 +122,7 @@ class CustomerOrderViewset(viewsets.ViewSet):
     @action(detail=False, methods=["get"], url_path="history")
     def get_history_order(self, request):
         orders = (
-            OrderService.get_order_qs(customer__user=request.user)
+            OrderService.get_order_list_qs(customer__user=request.user)
             .order_by("-created_at")
             .exclude(status="PROCESSING_ORDER")
         )
@@ -136,7 +138,7 @@ class CustomerOrderViewset(viewsets.ViewSet):
     )
     @action(detail=False, methods=["get"], url_path="ongoing")
     def get_ongoing_orders(self, request):
-        orders = OrderService.get_order_qs(customer__user=request.user).exclude(
+        orders = OrderService.get_order_list_qs(customer__user=request.user).exclude(
             status__in=["ORDER_COMPLETED", "ORDER_CANCELLED", "PROCESSING_ORDER"]
         )
         return paginate_response(
@@ -159,6 +161,26 @@ class CustomerOrderViewset(viewsets.ViewSet):
             message="Available vehicles",
         )
 
+    @swagger_auto_schema(
+        methods=["post"],
+        request_body=VehicleQuoteSerializer,
+        operation_description="Get the price of a route for every available vehicle",
+        operation_summary="Get vehicle quotes",
+        tags=["Customer-Order"],
+        responses=schema_doc.VEHICLE_QUOTES_RESPONSE,
+    )
+    @action(detail=False, methods=["post"], url_path="vehicle-quotes")
+    def get_vehicle_quotes(self, request):
+        serialized_data = VehicleQuoteSerializer(data=request.data)
+        if not serialized_data.is_valid():
+            return ResponseManager.handle_response(
+                errors=serialized_data.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        response = OrderService.get_vehicle_quotes(serialized_data.validated_data)
+        return ResponseManager.handle_response(
+            data=response, status=status.HTTP_200_OK, message="Vehicle quotes"
+        )
+
     @swagger_auto_schema(
         operation_description="Get all user orders",
         operation_summary="Get all user orders",
@@ -167,7 +189,7 @@ class CustomerOrderViewset(viewsets.ViewSet):
     )
     def list(self, request):
         orders = (
-            OrderService.get_order_qs(customer__user=request.user)
+            OrderService.get_order_list_qs(customer__user=request.user)
             .order_by("-created_at")
             .exclude(status="PROCESSING_ORDER")
         )
@@ -363,7 +385,7 @@ class RiderOrderViewset(viewsets.ViewSet):
         responses=schema_doc.GET_ALL_ORDER_RESPONSE,
     )
     def list(self, request):
-        orders = OrderService.get_order_qs(rider__user=request.user).order_by(
+        orders = OrderService.get_order_list_qs(rider__user=request.user).order_by(
             "-created_at"
         )
         return ResponseManager.handle_response(
@@ -494,6 +516,32 @@ class RiderOrderViewset(viewsets.ViewSet):
             data={}, status=status.HTTP_200_OK, message="Order Updated"
         )
 
+    @swagger_auto_schema(
+        methods=["post"],
+        request_body=ProofUploadSerializer,
+        operation_description="Get a presigned url to upload pickup or delivery proof to S3, then send the key as upload_key",
+        operation_summary="Get proof upload url",
+        tags=["Rider-Order"],
+        responses=schema_doc.PROOF_UPLOAD_RESPONSE,
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="(?P<order_id>[a-z,A-Z,0-9]+)/proof-upload",
+    )
+    def create_proof_upload(self, request, order_id):
+        serialized_data = ProofUploadSerializer(data=request.data)
+        if not serialized_data.is_valid():
+            return ResponseManager.handle_response(
+                errors=serialized_data.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        response = OrderService.create_proof_upload(
+            order_id, request.user, **serialized_data.validated_data
+        )
+        return ResponseManager.handle_response(
+            data=response, status=status.HTTP_200_OK, message="Upload url created"
+        )
+
     @swagger_auto_schema(
         methods=["post"],
         request_body=RiderPickUpOrderSerializer,
@@ -518,6 +566,7 @@ class RiderOrderViewset(viewsets.ViewSet):
             request.user,
             serialized_data.validated_data.get("proof"),
             generate_session_id(),
+            upload_key=serialized_data.validated_data.get("upload_key"),
         )
         return ResponseManager.handle_response(
             data={}, status=status.HTTP_200_OK, message="Order Updated"
@@ -595,6 +644,7 @@ class RiderOrderViewset(viewsets.ViewSet):
             request.user,
             serialized_data.validated_data.get("proof"),
             generate_session_id(),
+            upload_key=serialized_data.validated_data.get("upload_key"),
         )
         return ResponseManager.handle_response(
             data={}, status=status.HTTP_200_OK, message="Order Updated"
@@ -635,8 +685,20 @@ class BusinessOrderViewset(viewsets.ViewSet):
             message="Available vehicles",
         )
 
+    @action(detail=False, methods=["post"], url_path="vehicle-quotes")
+    def get_vehicle_quotes(self, request):
+        serialized_data = VehicleQuoteSerializer(data=request.data)
+        if not serialized_data.is_valid():
+            return ResponseManager.handle_response(
+                errors=serialized_data.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        response = OrderService.get_vehicle_quotes(serialized_data.validated_data)
+        return ResponseManager.handle_response(
+            data=response, status=status.HTTP_200_OK, message="Vehicle quotes"
+        )
+
     def list(self, request):
-        orders = OrderService.get_order_qs(business__user=request.user).order_by(
+        orders = OrderService.get_order_list_qs(business__user=request.user).order_by(
             "-created_at"
         )
         return paginate_response(
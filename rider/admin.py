@@ -220,6 +220,12 @@ class RiderDocumentInline(TabularInline):
     extra = 0
 
     def file_url_link(self, instance):
+        if instance.renditions.get("thumbnail"):
+            return format_html(
+                '<a href="{}" target="_blank"><img src="{}" width="50" height="50" /></a>',
+                instance.file_url,
+                instance.get_file_url("thumbnail"),
+            )
         if instance.file_url:
             return format_html(
                 '<a href="{}" target="_blank" download="">{}</a>',
@@ -359,7 +365,7 @@ class RiderAdmin(ModelAdmin):  # Use UnfoldAdmin instead of ModelAdmin
         return False
 
     def get_queryset(self, request):
-        return self.model.objects.exclude(user__state="DELETED")
+        return self.model.objects.exclude_deleted_users("user")
 
 
 class RiderCommissionInline(TabularInline):
@@ -369,11 +375,11 @@ class RiderCommissionInline(TabularInline):
 
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
         if db_field.name == "rider":  # Assuming 'rider' is the ForeignKey field
-            kwargs["queryset"] = Rider.objects.exclude(user__state="DELETED")
+            kwargs["queryset"] = Rider.objects.exclude_deleted_users("user")
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
     def get_queryset(self, request):
-        return self.model.objects.exclude(rider__user__state="DELETED").order_by(
+        return self.model.objects.exclude_deleted_users("rider__user").order_by(
             "-created_at"
         )
 
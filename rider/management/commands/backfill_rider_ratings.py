@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from rider.models import Rider, RiderRating
+
+
+class Command(BaseCommand):
+    """
+    Recomputes every rider's rating_sum and rating_count from rider_rating,
+    a batch of riders per UPDATE. Run it once after adding the columns, or
+    whenever ratings were changed outside OrderService.rate_rider.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **kwargs):
+        batch_size = kwargs["batch_size"]
+        ratings = (
+            RiderRating.objects.filter(rider_id=OuterRef("id"), rating__isnull=False)
+            .order_by()
+            .values("rider_id")
+        )
+        rating_sum = ratings.annotate(total=Sum("rating")).values("total")
+        rating_count = ratings.annotate(total=Count("id")).values("total")
+
+        rider_ids = list(Rider.objects.order_by("id").values_list("id", flat=True))
+        updated = 0
+        for index in range(0, len(rider_ids), batch_size):
+            updated += Rider.objects.filter(
+                id__in=rider_ids[index : index + batch_size]
+            ).update(
+                rating_sum=Coalesce(Subquery(rating_sum), 0),
+                rating_count=Coalesce(Subquery(rating_count), 0),
+            )
+        self.stdout.write(self.style.SUCCESS(f"Backfilled ratings of {updated} riders"))
@@ -0,0 +1,71 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django_redis import get_redis_connection
+
+from rider.service import RiderLocationService
+
+
+class Command(BaseCommand):
+    """
+    Measures how many location pings per second RiderLocationService can
+    ingest against the configured redis, using synthetic riders that are all
+    on an active order so every ping also goes through the trail path.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--riders", type=int, default=200)
+        parser.add_argument("--batches", type=int, default=20)
+        parser.add_argument("--batch-size", type=int, default=10)
+
+    def handle(self, *args, **kwargs):
+        riders = kwargs["riders"]
+        batches = kwargs["batches"]
+        batch_size = kwargs["batch_size"]
+        vehicle_id = "benchmark"
+        rider_ids = [f"benchmark-{index}" for index in range(riders)]
+        latitude, longitude = map(float, settings.GOOGLE_SEARCH_LOCATION.split(","))
+
+        self.stdout.write(
+            self.style.WARNING(
+                f"Ingesting {batches} batches of {batch_size} pings for {riders} riders..."
+            )
+        )
+        for rider_id in rider_ids:
+            RiderLocationService.start_trail(rider_id, rider_id)
+
+        now = time.time()
+        trail_points = 0
+        start = time.monotonic()
+        for batch in range(batches):
+            for rider_id in rider_ids:
+                points = [
+                    (
+                        now + (batch * batch_size + index) * 5,
+                        latitude + random.uniform(-0.05, 0.05),
+                        longitude + random.uniform(-0.05, 0.05),
+                    )
+                    for index in range(batch_size)
+                ]
+                trail_points += RiderLocationService.add_rider_locations(
+                    rider_id, vehicle_id, points
+                )
+        elapsed = time.monotonic() - start
+
+        pings = riders * batches * batch_size
+        requests = riders * batches
+        for rider_id in rider_ids:
+            RiderLocationService.end_trail(rider_id)
+        get_redis_connection("default").delete(
+            RiderLocationService.get_locations_key(vehicle_id),
+            RiderLocationService.get_seen_key(vehicle_id),
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{pings} pings in {elapsed:.2f}s: {pings / elapsed:.0f} pings/s, "
+                f"{requests / elapsed:.0f} batches/s, {trail_points} trail points kept."
+            )
+        )
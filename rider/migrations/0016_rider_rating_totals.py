@@ -0,0 +1,22 @@
+# Generated by Django 4.2.5 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rider", "0015_alter_ridercommission_options"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="rider",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="rider",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
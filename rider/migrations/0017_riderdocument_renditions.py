@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 19:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rider", "0016_rider_rating_totals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="riderdocument",
+            name="renditions",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -57,6 +57,9 @@ class Rider(BaseAbstractModel):
         verbose_name="Locations where rider operate in Nigeria",
     )
     on_duty = models.BooleanField(default=False)
+    # running totals of rider_rating scores, kept by OrderService.rate_rider
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         db_table = "rider"
@@ -72,26 +75,35 @@ class Rider(BaseAbstractModel):
 
     def photo_url(self):
         if self.status == "APPROVED" and self.avatar_url is None:
-            return (
-                self.rider_document.filter(type="passport_photo")
-                .values_list("file_url", flat=True)
-                .first()
-            )
+            if hasattr(self, "passport_photos"):
+                # prefetched by OrderService.get_order_list_qs
+                passport_photo = (
+                    self.passport_photos[0] if self.passport_photos else None
+                )
+            else:
+                passport_photo = (
+                    self.rider_document.filter(type="passport_photo")
+                    .only("file_url", "renditions")
+                    .first()
+                )
+            if passport_photo is None:
+                return None
+            return passport_photo.get_file_url("thumbnail")
         return self.avatar_url
 
     @property
     def rating(self):
-        from django.db.models import Avg
-
-        rider_ratings = self.rider_rating.all()
-        avg_rating = rider_ratings.aggregate(avg_rating=Avg("rating"))["avg_rating"]
-        # Check if avg_rating is not None before returning
-        return avg_rating if avg_rating is not None else 0.0
+        if not self.rating_count:
+            return 0.0
+        return self.rating_sum / self.rating_count
 
     def vehicle_photos(self):
-        return self.rider_document.filter(type="vehicle_photo").values_list(
-            "file_url", flat=True
-        )
+        return [
+            document.get_file_url()
+            for document in self.rider_document.filter(type="vehicle_photo").only(
+                "file_url", "renditions"
+            )
+        ]
 
     def kyc_verified(self):
         # The document types you want to check
@@ -127,13 +139,8 @@ class Rider(BaseAbstractModel):
 
         return OrderService.get_current_order_qs(rider=self)
 
-    def delete(self, using=None, keep_parents=False, image_url=None, commit=True):
-        """Hard deleting"""
-        if self.avatar_url:
-            return super(Rider, self).delete(
-                using=using, keep_parents=keep_parents, image_url=self.avatar_url
-            )
-        return super(Rider, self).delete(using=using, keep_parents=keep_parents)
+    def get_file_urls(self):
+        return [self.avatar_url] if self.avatar_url else []
 
 
 class ApprovedRider(Rider):
@@ -202,6 +209,8 @@ class RiderDocument(BaseAbstractModel):
     file_url = models.CharField(
         max_length=550, verbose_name="document file url", null=True, blank=True
     )
+    # {rendition name: url} of photo documents, see ImageRenditionService
+    renditions = models.JSONField(default=dict, blank=True)
     rider = models.ForeignKey(
         Rider,
         on_delete=models.CASCADE,
@@ -213,13 +222,11 @@ class RiderDocument(BaseAbstractModel):
     def __str__(self):
         return f"{self.rider.display_name} - {self.type}"
 
-    def delete(self, using=None, keep_parents=False, image_url=None, commit=True):
-        """Hard deleting"""
-        if self.file_url:
-            return super(RiderDocument, self).delete(
-                using=using, keep_parents=keep_parents, image_url=self.file_url
-            )
-        return super(RiderDocument, self).delete(using=using, keep_parents=keep_parents)
+    def get_file_url(self, rendition="medium"):
+        return self.renditions.get(rendition) or self.file_url
+
+    def get_file_urls(self):
+        return [self.file_url] if self.file_url else []
 
     class Meta:
         db_table = "rider_document"
@@ -256,7 +263,6 @@ class RiderRating(BaseAbstractModel):
 
 
 class FavoriteRider(BaseAbstractModel):
-
     rider = models.ForeignKey(
         "rider.Rider",
         on_delete=models.CASCADE,
@@ -299,7 +305,6 @@ class Commission(BaseAbstractModel):
 
 
 class RiderCommission(BaseAbstractModel):
-
     rider = models.ForeignKey(
         "rider.Rider",
         on_delete=models.CASCADE,
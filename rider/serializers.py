@@ -1,12 +1,10 @@
-from datetime import timedelta
-
-from django.db.models import Sum
-from django.utils import timezone
+from django.conf import settings
 from rest_framework import serializers
 
 from authentication.serializers import UserProfileSerializer
+from helpers.s3_uploader import S3Uploader
 from helpers.validators import FieldValidators
-from rider.models import FavoriteRider, Rider, RiderRating
+from rider.models import FavoriteRider, Rider
 
 
 class RiderSignupSerializer(serializers.Serializer):
@@ -51,6 +49,18 @@ class SetRiderDutySerializer(serializers.Serializer):
     on_duty = serializers.BooleanField()
 
 
+class RiderLocationSerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-85.05112878, max_value=85.05112878)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    recorded_at = serializers.DateTimeField(required=False)
+
+
+class RiderLocationBatchSerializer(serializers.Serializer):
+    locations = RiderLocationSerializer(
+        many=True, allow_empty=False, max_length=settings.RIDER_LOCATION_MAX_BATCH_SIZE
+    )
+
+
 class ResendVerificationSerializer(serializers.Serializer):
     email = serializers.EmailField(
         validators=[FieldValidators.validate_existing_user_email], required=False
@@ -131,7 +141,21 @@ class RiderLoginSerializer(serializers.Serializer):
         return data
 
 
-class RiderHomepageSerializerSerializer(serializers.ModelSerializer):
+class RiderStatsMixin:
+    """For serializers with several fields read from RiderStatsService"""
+
+    def get_rider_stats(self, obj):
+        from rider.service import RiderStatsService
+
+        # every stats field reads the same cached aggregate, fetch it once
+        if not hasattr(self, "_rider_stats"):
+            self._rider_stats = {}
+        if obj.id not in self._rider_stats:
+            self._rider_stats[obj.id] = RiderStatsService.get_rider_stats(obj.id)
+        return self._rider_stats[obj.id]
+
+
+class RiderHomepageSerializerSerializer(RiderStatsMixin, serializers.ModelSerializer):
     total_deliveries = serializers.SerializerMethodField()
     ongoing_deliveries = serializers.SerializerMethodField()
     delivery_request = serializers.SerializerMethodField()
@@ -153,50 +177,19 @@ class RiderHomepageSerializerSerializer(serializers.ModelSerializer):
         )
 
     def get_total_deliveries(self, obj):
-        from order.service import OrderService
-
-        return OrderService.get_order_qs(
-            rider=obj, status__in=["ORDER_DELIVERED", "ORDER_COMPLETED"]
-        ).count()
+        return self.get_rider_stats(obj)["total_deliveries"]
 
     def get_delivery_request(self, obj):
-        from order.service import OrderService
-
-        return OrderService.get_order_qs(
-            rider=obj, status="PENDING_RIDER_CONFIRMATION"
-        ).count()
+        return self.get_rider_stats(obj)["delivery_request"]
 
     def get_ongoing_deliveries(self, obj):
-        from order.service import OrderService
-
-        return OrderService.get_order_qs(
-            rider=obj,
-            status__in=[
-                "RIDER_ACCEPTED_ORDER",
-                "RIDER_AT_PICK_UP",
-                "RIDER_PICKED_UP_ORDER",
-                "ORDER_ARRIVED",
-            ],
-        ).count()
+        return self.get_rider_stats(obj)["ongoing_deliveries"]
 
     def get_today_earns(self, obj):
-        from order.service import OrderService
-
-        today = timezone.now().date()
-        today_earnings = OrderService.get_order_qs(
-            rider=obj, created_at__date=today
-        ).aggregate(Sum("total_amount"))["total_amount__sum"]
-        return today_earnings or 0.0
+        return self.get_rider_stats(obj)["today_earns"]
 
     def get_this_week_earns(self, obj):
-        from order.service import OrderService
-
-        today = timezone.now().date()
-        start_of_week = today - timedelta(days=today.weekday())
-        this_week_earnings = OrderService.get_order_qs(
-            rider=obj, created_at__date__range=[start_of_week, today]
-        ).aggregate(Sum("total_amount"))["total_amount__sum"]
-        return this_week_earnings or 0.0
+        return self.get_rider_stats(obj)["this_week_earns"]
 
     def get_rider_activity(self, obj):
         from wallet.serializers import GetTransactionsSerializer
@@ -209,7 +202,7 @@ class RiderHomepageSerializerSerializer(serializers.ModelSerializer):
         return serializer.data
 
 
-class RetrieveRiderSerializer(serializers.ModelSerializer):
+class RetrieveRiderSerializer(RiderStatsMixin, serializers.ModelSerializer):
     user = UserProfileSerializer()
     status = serializers.SerializerMethodField()
     vehicle_photos = serializers.SerializerMethodField()
@@ -249,29 +242,13 @@ class RetrieveRiderSerializer(serializers.ModelSerializer):
         return obj.get_rider_status()
 
     def get_total_orders(self, obj):
-        from order.service import OrderService
-
-        return (
-            OrderService.get_order_qs(rider=obj)
-            .exclude(status__in=["PROCESSING_ORDER", "PENDING", "ORDER_CANCELLED"])
-            .count()
-        )
+        return self.get_rider_stats(obj)["total_orders"]
 
     def get_total_earns(self, obj):
-        from order.service import OrderService
-
-        orders = OrderService.get_order_qs(rider=obj, status__in=["ORDER_COMPLETED"])
-        total_amount_sum = (
-            orders.aggregate(Sum("total_amount"))["total_amount__sum"] or 0.0
-        )
-        fele_amount_sum = (
-            orders.aggregate(Sum("fele_amount"))["fele_amount__sum"] or 0.0
-        )
-        total_earns = float(total_amount_sum) - float(fele_amount_sum)
-        return total_earns
+        return self.get_rider_stats(obj)["total_earns"]
 
     def get_review_count(self, obj):
-        return RiderRating.objects.filter(rider=obj).count()
+        return obj.rating_count
 
 
 class DocumentUploadSerializer(serializers.Serializer):
@@ -287,7 +264,29 @@ class DocumentUploadSerializer(serializers.Serializer):
         ("authorization_letter", "authorization_letter"),
     ]
     document_type = serializers.ChoiceField(choices=DOCUMENT_TYPE_CHOICES)
-    documents = serializers.ListField(child=serializers.FileField(), write_only=True)
+    documents = serializers.ListField(
+        child=serializers.FileField(), write_only=True, required=False
+    )
+    upload_keys = serializers.ListField(
+        child=serializers.CharField(max_length=255), required=False
+    )
+
+    def validate(self, data):
+        if not data.get("documents") and not data.get("upload_keys"):
+            raise serializers.ValidationError(
+                "Provide either documents or upload_keys."
+            )
+        return data
+
+
+class DocumentUploadUrlSerializer(serializers.Serializer):
+    document_type = serializers.ChoiceField(
+        choices=DocumentUploadSerializer.DOCUMENT_TYPE_CHOICES
+    )
+    file_name = serializers.CharField(max_length=255)
+    content_type = serializers.ChoiceField(
+        choices=S3Uploader.PRESIGNED_UPLOAD_CONTENT_TYPES
+    )
 
 
 class KycSerializer(serializers.Serializer):
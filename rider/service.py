@@ -1,21 +1,40 @@
+import math
+import time
+
 from django.conf import settings
 from django.db import transaction
-from django.db.models import ExpressionWrapper, F, Func, IntegerField, Sum
+from django.db.models import (
+    Count,
+    ExpressionWrapper,
+    F,
+    Func,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+)
 from django.utils import timezone
+from django_redis import get_redis_connection
 from rest_framework import status
 
 from authentication.service import AuthService, UserService
 from authentication.tasks import track_user_activity
+from helpers.cache_manager import CacheManager, KeyBuilder, LocalCache
 from helpers.db_helpers import select_for_update
 from helpers.exceptions import CustomAPIException
+from helpers.image_renditions import ImageRenditionService
+from helpers.logger import CustomLogging
 from helpers.s3_uploader import S3Uploader
 from notification.service import EmailManager
-from rider.models import Rider, RiderDocument
+from order.models import Order
+from rider.models import Rider, RiderCommission, RiderDocument
 from rider.serializers import (
     RetrieveKycSerializer,
     RetrieveRiderSerializer,
     VehicleInformationSerializer,
 )
+from rider.tasks import create_rider_document_renditions
 
 
 class RiderService:
@@ -89,8 +108,7 @@ class RiderService:
                 context={"full_name": fullname},
                 category="RIDER_AUTH",
                 action="RIDER_SIGNUP",
-                email=email if email else None,
-                phone_number=phone_number if phone_number else None,
+                user=instance_user,
                 level="SUCCESS",
                 session_id=session_id,
             )
@@ -131,8 +149,7 @@ class RiderService:
             context={"user": email or phone_number},
             category="RIDER_AUTH",
             action="RIDER_RESEND_OTP",
-            email=email if email else None,
-            phone_number=phone_number if phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -173,8 +190,7 @@ class RiderService:
                 context=kwargs,
                 category="RIDER_KYC",
                 action="RIDER_UPDATE_VEHICLE",
-                email=user.email if user.email else None,
-                phone_number=user.phone_number if user.phone_number else None,
+                user=user,
                 level="SUCCESS",
                 session_id=session_id,
             )
@@ -256,18 +272,295 @@ class RiderService:
         rider = cls.get_rider(user=user)
         rider.on_duty = on_duty
         rider.save()
+        RiderLocationService.set_duty_status(rider.id, on_duty)
+        if not on_duty and rider.vehicle_id:
+            RiderLocationService.remove_rider_location(rider.id, rider.vehicle_id)
         track_user_activity(
             context={"on_duty": on_duty},
             category="RIDER",
             action="RIDER_SET_ACTIVITY_STATUS",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
 
 
+class RiderLocationService:
+    """
+    Redis GEO index of on-duty rider positions.
+
+    Riders are indexed in one sorted set per vehicle so a dispatch query only
+    scans riders who can take the order. A companion sorted set records when
+    each rider last reported, positions older than RIDER_LOCATION_STALE_SECONDS
+    are dropped from the index the next time it is searched.
+
+    While a rider has an active order, reported positions are also appended
+    to a down-sampled trail that is written to the database on delivery, so
+    the database never sees individual pings.
+    """
+
+    EARTH_RADIUS_METERS = 6371000
+    # rider id and vehicle per user; saves a query on every ping. Duty status
+    # is kept in redis instead so going off duty applies on every worker at once
+    rider_context_cache = LocalCache(max_size=4096)
+    DUTY_STATUS_TTL_SECONDS = 60 * 60
+
+    @classmethod
+    def get_locations_key(cls, vehicle_id):
+        return f"{settings.ENVIRONMENT}:{KeyBuilder.rider_locations(vehicle_id)}"
+
+    @classmethod
+    def get_seen_key(cls, vehicle_id):
+        return f"{settings.ENVIRONMENT}:{KeyBuilder.rider_location_seen(vehicle_id)}"
+
+    @classmethod
+    def get_active_order_key(cls, rider_id):
+        return f"{settings.ENVIRONMENT}:{KeyBuilder.rider_active_order(rider_id)}"
+
+    @classmethod
+    def get_trail_key(cls, rider_id):
+        return f"{settings.ENVIRONMENT}:{KeyBuilder.rider_trail(rider_id)}"
+
+    @classmethod
+    def get_duty_key(cls, rider_id):
+        return f"{settings.ENVIRONMENT}:{KeyBuilder.rider_on_duty(rider_id)}"
+
+    @classmethod
+    def get_rider_context(cls, user):
+        context = cls.rider_context_cache.get(user.id)
+        if context is None:
+            rider = RiderService.get_rider(user=user)
+            context = {"rider_id": rider.id, "vehicle_id": rider.vehicle_id}
+            cls.rider_context_cache.set(
+                user.id, context, minutes=settings.RIDER_LOCATION_CONTEXT_SECONDS / 60
+            )
+        return {**context, "on_duty": cls.get_duty_status(context["rider_id"])}
+
+    @classmethod
+    def get_duty_status(cls, rider_id):
+        """Stored duty status, read from the database when redis has none"""
+        try:
+            on_duty = get_redis_connection("default").get(cls.get_duty_key(rider_id))
+        except Exception as e:
+            CustomLogging.error(f"Unable to read rider duty status: {str(e)}")
+            return cls.get_stored_duty_status(rider_id)
+        if on_duty is None:
+            on_duty = cls.get_stored_duty_status(rider_id)
+            # nx: a duty change stored since the read above wins
+            cls.set_duty_status(rider_id, on_duty, nx=True)
+            return on_duty
+        return on_duty == b"1"
+
+    @classmethod
+    def get_stored_duty_status(cls, rider_id):
+        return bool(
+            Rider.objects.filter(id=rider_id).values_list("on_duty", flat=True).first()
+        )
+
+    @classmethod
+    def set_duty_status(cls, rider_id, on_duty, nx=False):
+        try:
+            get_redis_connection("default").set(
+                cls.get_duty_key(rider_id),
+                "1" if on_duty else "0",
+                ex=cls.DUTY_STATUS_TTL_SECONDS,
+                nx=nx,
+            )
+        except Exception as e:
+            CustomLogging.error(f"Unable to store rider duty status: {str(e)}")
+
+    @classmethod
+    def invalidate_duty_status(cls, rider_id):
+        try:
+            get_redis_connection("default").delete(cls.get_duty_key(rider_id))
+        except Exception as e:
+            CustomLogging.error(f"Unable to invalidate rider duty status: {str(e)}")
+
+    @classmethod
+    def update_rider_location(cls, user, **location):
+        return cls.ingest_rider_locations(user, [location])
+
+    @classmethod
+    def ingest_rider_locations(cls, user, locations):
+        """
+        :params locations: [{"latitude", "longitude", "recorded_at"}] in any order
+        :returns: number of points added to the active order trail
+        """
+        context = cls.get_rider_context(user)
+        if not context["on_duty"]:
+            raise CustomAPIException(
+                "Rider is not on duty", status.HTTP_400_BAD_REQUEST
+            )
+        if context["vehicle_id"] is None:
+            raise CustomAPIException(
+                "Rider has no vehicle assigned", status.HTTP_400_BAD_REQUEST
+            )
+
+        now = time.time()
+        points = sorted(
+            (
+                min(location["recorded_at"].timestamp(), now)
+                if location.get("recorded_at")
+                else now,
+                location["latitude"],
+                location["longitude"],
+            )
+            for location in locations
+        )
+        return cls.add_rider_locations(
+            context["rider_id"], context["vehicle_id"], points
+        )
+
+    @classmethod
+    def add_rider_locations(cls, rider_id, vehicle_id, points):
+        """
+        :params points: [(timestamp, latitude, longitude)] oldest first
+        """
+        recorded_at, latitude, longitude = points[-1]
+        trail_key = cls.get_trail_key(rider_id)
+        connection = get_redis_connection("default")
+
+        pipeline = connection.pipeline(transaction=False)
+        pipeline.geoadd(
+            cls.get_locations_key(vehicle_id), (longitude, latitude, rider_id)
+        )
+        pipeline.zadd(cls.get_seen_key(vehicle_id), {rider_id: recorded_at})
+        pipeline.exists(cls.get_active_order_key(rider_id))
+        pipeline.lindex(trail_key, -1)
+        _, _, has_active_order, last_point = pipeline.execute()
+        if not has_active_order:
+            return 0
+
+        last_point = cls.decode_trail_point(last_point) if last_point else None
+        trail = cls.downsample(points, last_point)
+        if trail:
+            pipeline = connection.pipeline(transaction=False)
+            pipeline.rpush(trail_key, *[cls.encode_trail_point(p) for p in trail])
+            pipeline.ltrim(trail_key, -settings.RIDER_TRAIL_MAX_POINTS, -1)
+            pipeline.expire(trail_key, settings.RIDER_TRAIL_TTL_SECONDS)
+            pipeline.execute()
+        return len(trail)
+
+    @classmethod
+    def remove_rider_location(cls, rider_id, vehicle_id):
+        try:
+            pipeline = get_redis_connection("default").pipeline(transaction=False)
+            pipeline.zrem(cls.get_locations_key(vehicle_id), rider_id)
+            pipeline.zrem(cls.get_seen_key(vehicle_id), rider_id)
+            pipeline.execute()
+        except Exception as e:
+            # a stale entry expires after RIDER_LOCATION_STALE_SECONDS anyway
+            CustomLogging.error(f"Unable to remove rider location: {str(e)}")
+
+    @classmethod
+    def get_nearby_rider_ids(
+        cls, latitude, longitude, vehicle_id, radius_km=None, count=None
+    ):
+        """
+        :returns: [(rider_id, distance_km)] for riders who reported a position
+            within radius_km, nearest first
+        """
+        radius_km = radius_km or settings.RIDER_DISPATCH_RADIUS_KM
+        locations_key = cls.get_locations_key(vehicle_id)
+        seen_key = cls.get_seen_key(vehicle_id)
+        stale_before = time.time() - settings.RIDER_LOCATION_STALE_SECONDS
+
+        connection = get_redis_connection("default")
+        stale_rider_ids = connection.zrangebyscore(seen_key, "-inf", stale_before)
+        if stale_rider_ids:
+            pipeline = connection.pipeline(transaction=False)
+            pipeline.zrem(locations_key, *stale_rider_ids)
+            pipeline.zrem(seen_key, *stale_rider_ids)
+            pipeline.execute()
+
+        riders = connection.geosearch(
+            locations_key,
+            longitude=longitude,
+            latitude=latitude,
+            radius=radius_km,
+            unit="km",
+            sort="ASC",
+            count=count,
+            withdist=True,
+        )
+        return [(rider_id.decode(), distance) for rider_id, distance in riders]
+
+    @classmethod
+    def start_trail(cls, rider_id, order_id):
+        try:
+            pipeline = get_redis_connection("default").pipeline(transaction=False)
+            pipeline.delete(cls.get_trail_key(rider_id))
+            pipeline.set(
+                cls.get_active_order_key(rider_id),
+                order_id,
+                ex=settings.RIDER_TRAIL_TTL_SECONDS,
+            )
+            pipeline.execute()
+        except Exception as e:
+            CustomLogging.error(f"Unable to start rider trail: {str(e)}")
+
+    @classmethod
+    def end_trail(cls, rider_id):
+        """
+        Stop recording the rider's trail.
+        :returns: [(timestamp, latitude, longitude)] recorded since start_trail
+        """
+        try:
+            pipeline = get_redis_connection("default").pipeline(transaction=True)
+            pipeline.lrange(cls.get_trail_key(rider_id), 0, -1)
+            pipeline.delete(cls.get_trail_key(rider_id))
+            pipeline.delete(cls.get_active_order_key(rider_id))
+            trail, _, _ = pipeline.execute()
+        except Exception as e:
+            CustomLogging.error(f"Unable to end rider trail: {str(e)}")
+            return []
+        return [cls.decode_trail_point(point) for point in trail]
+
+    @classmethod
+    def downsample(cls, points, last_point=None):
+        """
+        Keep a point once the rider has moved RIDER_TRAIL_MIN_DISTANCE_METERS
+        or RIDER_TRAIL_MIN_INTERVAL_SECONDS have passed since the last kept one.
+        """
+        trail = []
+        for point in points:
+            if (
+                last_point is None
+                or point[0] - last_point[0] >= settings.RIDER_TRAIL_MIN_INTERVAL_SECONDS
+                or cls.get_distance_in_meters(last_point, point)
+                >= settings.RIDER_TRAIL_MIN_DISTANCE_METERS
+            ):
+                trail.append(point)
+                last_point = point
+        return trail
+
+    @classmethod
+    def get_distance_in_meters(cls, start, end):
+        # equirectangular approximation, well within a metre over trail distances
+        _, start_latitude, start_longitude = start
+        _, end_latitude, end_longitude = end
+        x = math.radians(end_longitude - start_longitude) * math.cos(
+            math.radians((start_latitude + end_latitude) / 2)
+        )
+        y = math.radians(end_latitude - start_latitude)
+        return cls.EARTH_RADIUS_METERS * math.hypot(x, y)
+
+    @staticmethod
+    def encode_trail_point(point):
+        return "{:.0f},{:.6f},{:.6f}".format(*point)
+
+    @staticmethod
+    def decode_trail_point(point):
+        if isinstance(point, bytes):
+            point = point.decode()
+        recorded_at, latitude, longitude = point.split(",")
+        return int(recorded_at), float(latitude), float(longitude)
+
+
 class RiderKYCService:
+    # documents that get compressed renditions, see ImageRenditionService
+    PHOTO_DOCUMENT_TYPES = ["vehicle_photo", "passport_photo"]
+
     @classmethod
     def get_rider_document(cls, rider, **kwargs):
         return RiderDocument.objects.filter(rider=rider, **kwargs)
@@ -279,7 +572,7 @@ class RiderKYCService:
             return {"status": "unverified", "files": []}
 
         all_verified = all(photo.verified for photo in documents)
-        file_urls = [photo.file_url for photo in documents]
+        file_urls = [photo.get_file_url() for photo in documents]
         return {
             "status": "verified" if all_verified else "unverified",
             "files": file_urls,
@@ -320,8 +613,7 @@ class RiderKYCService:
             context={},
             category="RIDER_KYC",
             action="RIDER_SUBMIT_KYC",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -329,22 +621,173 @@ class RiderKYCService:
         return RetrieveKycSerializer(rider).data
 
     @classmethod
-    def add_rider_document(cls, rider, document_type, file, session_id=None, **kwargs):
-        file_name = file.name
-        file_url = S3Uploader(
+    def create_document_upload(cls, user, document_type, file_name, content_type):
+        return S3Uploader(
             append_folder=f"/rider_document/{document_type}"
-        ).upload_file_object(file, file_name)
+        ).create_presigned_upload(user.id, file_name, content_type)
+
+    @classmethod
+    def add_rider_document(
+        cls, rider, document_type, file=None, session_id=None, upload_key=None, **kwargs
+    ):
+        """
+        The document is either uploaded straight to S3 through
+        create_document_upload and confirmed by `upload_key`, or sent as `file`
+        """
+        s3_uploader = S3Uploader(append_folder=f"/rider_document/{document_type}")
+        if upload_key:
+            file_name = upload_key
+            file_url = s3_uploader.confirm_presigned_upload(rider.user_id, upload_key)
+        else:
+            file_name = file.name
+            file_url = s3_uploader.upload_file_object(file, file_name)
 
         rider_document = RiderDocument.objects.create(
             rider=rider, type=document_type, file_url=file_url, **kwargs
         )
+        if document_type in cls.PHOTO_DOCUMENT_TYPES:
+            transaction.on_commit(
+                lambda: create_rider_document_renditions.delay(rider_document.id),
+                robust=True,
+            )
         track_user_activity(
             context={"file_name": file_name, "rider_document": rider_document.id},
             category="RIDER_KYC",
             action="RIDER_ADD_DOCUMENT",
-            email=rider.user.email if rider.user.email else None,
-            phone_number=rider.user.phone_number if rider.user.phone_number else None,
+            user=rider.user,
             level="SUCCESS",
             session_id=session_id,
         )
         return rider_document
+
+    @classmethod
+    def create_document_renditions(cls, rider_document_id):
+        rider_document = RiderDocument.objects.filter(id=rider_document_id).first()
+        if rider_document is None:
+            return None
+        renditions = ImageRenditionService.create_renditions(rider_document.file_url)
+        if renditions:
+            RiderDocument.objects.filter(id=rider_document_id).update(
+                renditions=renditions
+            )
+        return renditions
+
+
+class RiderCommissionService:
+    """
+    Fele's charge, in percent, on a rider's orders: 100 minus the commission
+    of the rider's latest RiderCommission, or FELE_CHARGE when the rider has
+    none. Charges are cached per rider and dropped whenever a RiderCommission
+    or Commission is saved or deleted (see rider/signals.py).
+    """
+
+    @classmethod
+    def get_fele_charge(cls, rider_id):
+        return cls.get_fele_charges([rider_id]).get(rider_id, settings.FELE_CHARGE)
+
+    @classmethod
+    def get_fele_charges(cls, rider_ids):
+        """Returns {rider_id: charge}, resolving every uncached rider in one query"""
+        keys = {
+            KeyBuilder.rider_fele_charge(rider_id): rider_id for rider_id in rider_ids
+        }
+        charges = {
+            keys[key]: charge
+            for key, charge in CacheManager.retrieve_keys(list(keys)).items()
+        }
+        uncached_rider_ids = set(keys.values()) - charges.keys()
+        if not uncached_rider_ids:
+            return charges
+
+        latest_commission = (
+            RiderCommission.objects.filter(
+                rider_id=OuterRef("id"), commission__deleted_at=None
+            )
+            .order_by("-created_at")
+            .values("commission__commission")[:1]
+        )
+        riders = (
+            Rider.objects.filter(id__in=uncached_rider_ids)
+            .annotate(commission=Subquery(latest_commission))
+            .values_list("id", "commission")
+        )
+        resolved_charges = {
+            rider_id: settings.FELE_CHARGE if commission is None else 100 - commission
+            for rider_id, commission in riders
+        }
+        CacheManager.set_keys(
+            {
+                KeyBuilder.rider_fele_charge(rider_id): charge
+                for rider_id, charge in resolved_charges.items()
+            },
+            settings.RIDER_COMMISSION_CACHE_MINUTES,
+        )
+        charges.update(resolved_charges)
+        return charges
+
+    @classmethod
+    def invalidate(cls, rider_ids):
+        CacheManager.delete_keys(
+            [KeyBuilder.rider_fele_charge(rider_id) for rider_id in rider_ids]
+        )
+
+
+class RiderStatsService:
+    """
+    Order counters and earnings shown on the rider app, computed in a single
+    conditional aggregate over the rider's orders. Stats are cached per rider
+    and day and dropped whenever one of the rider's orders is saved (see
+    order/signals.py).
+    """
+
+    ONGOING_STATUSES = [
+        "RIDER_ACCEPTED_ORDER",
+        "RIDER_AT_PICK_UP",
+        "RIDER_PICKED_UP_ORDER",
+        "ORDER_ARRIVED",
+    ]
+
+    @classmethod
+    def get_rider_stats(cls, rider_id):
+        today = timezone.localdate()
+        key = KeyBuilder.rider_stats(rider_id, today)
+        stats = CacheManager.retrieve_key(key)
+        if stats is None:
+            stats = cls.compute_rider_stats(rider_id, today)
+            CacheManager.set_key(key, stats, settings.RIDER_STATS_CACHE_MINUTES)
+        return stats
+
+    @classmethod
+    def compute_rider_stats(cls, rider_id, today):
+        start_of_week = today - timezone.timedelta(days=today.weekday())
+        completed = Q(status="ORDER_COMPLETED")
+        stats = Order.objects.filter(rider_id=rider_id).aggregate(
+            total_deliveries=Count(
+                "id", filter=Q(status__in=["ORDER_DELIVERED", "ORDER_COMPLETED"])
+            ),
+            delivery_request=Count("id", filter=Q(status="PENDING_RIDER_CONFIRMATION")),
+            ongoing_deliveries=Count("id", filter=Q(status__in=cls.ONGOING_STATUSES)),
+            total_orders=Count(
+                "id",
+                filter=~Q(
+                    status__in=["PROCESSING_ORDER", "PENDING", "ORDER_CANCELLED"]
+                ),
+            ),
+            today_earns=Sum("total_amount", filter=Q(created_at__date=today)),
+            this_week_earns=Sum(
+                "total_amount",
+                filter=Q(created_at__date__range=[start_of_week, today]),
+            ),
+            completed_amount=Sum("total_amount", filter=completed),
+            completed_fele_amount=Sum("fele_amount", filter=completed),
+        )
+        completed_amount = stats.pop("completed_amount") or 0.0
+        completed_fele_amount = stats.pop("completed_fele_amount") or 0.0
+        stats["total_earns"] = float(completed_amount) - float(completed_fele_amount)
+        stats["today_earns"] = float(stats["today_earns"] or 0.0)
+        stats["this_week_earns"] = float(stats["this_week_earns"] or 0.0)
+        return stats
+
+    @classmethod
+    def invalidate(cls, rider_id):
+        CacheManager.delete_key(KeyBuilder.rider_stats(rider_id, timezone.localdate()))
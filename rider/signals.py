@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rider.models import Commission, Rider, RiderCommission
+
+
+@receiver(post_save, sender=RiderCommission)
+@receiver(post_delete, sender=RiderCommission)
+def invalidate_rider_commission(sender, instance, **kwargs):
+    from rider.service import RiderCommissionService
+
+    rider_ids = [instance.rider_id]
+    transaction.on_commit(lambda: RiderCommissionService.invalidate(rider_ids))
+
+
+@receiver(post_save, sender=Commission)
+@receiver(post_delete, sender=Commission)
+def invalidate_commission(sender, instance, **kwargs):
+    from rider.service import RiderCommissionService
+
+    rider_ids = list(
+        RiderCommission.all_objects.filter(commission_id=instance.id).values_list(
+            "rider_id", flat=True
+        )
+    )
+    transaction.on_commit(lambda: RiderCommissionService.invalidate(rider_ids))
+
+
+@receiver(post_save, sender=Rider)
+def invalidate_rider_duty_status(sender, instance, update_fields=None, **kwargs):
+    from rider.service import RiderLocationService
+
+    # saves from the admin or elsewhere than set_rider_duty_status
+    if update_fields is None or "on_duty" in update_fields:
+        rider_id = instance.id
+        transaction.on_commit(
+            lambda: RiderLocationService.invalidate_duty_status(rider_id)
+        )
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+
+@shared_task(name="task.create_rider_document_renditions")
+def create_rider_document_renditions(rider_document_id):
+    from rider.service import RiderKYCService
+
+    return RiderKYCService.create_document_renditions(rider_document_id)
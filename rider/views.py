@@ -15,11 +15,14 @@ from rider.serializers import (
     ChangeEmailSerializer,
     ChangePhoneNumberSerializer,
     DocumentUploadSerializer,
+    DocumentUploadUrlSerializer,
     KycSerializer,
     ResendVerificationSerializer,
     RetrieveKycSerializer,
     RetrieveRiderSerializer,
     RiderHomepageSerializerSerializer,
+    RiderLocationBatchSerializer,
+    RiderLocationSerializer,
     RiderLoginSerializer,
     RiderSignupSerializer,
     SetRiderDutySerializer,
@@ -27,7 +30,7 @@ from rider.serializers import (
     VehicleInformationSerializer,
     VerifyOtpSerializer,
 )
-from rider.service import RiderKYCService, RiderService
+from rider.service import RiderKYCService, RiderLocationService, RiderService
 
 
 class RiderAuthViewset(viewsets.ViewSet):
@@ -303,6 +306,53 @@ class RiderViewset(viewsets.ViewSet):
             data={}, status=status.HTTP_200_OK, message="rider duty status set"
         )
 
+    @swagger_auto_schema(
+        methods=["post"],
+        request_body=RiderLocationSerializer,
+        operation_description="Report the rider's current location for dispatch",
+        operation_summary="Update rider location",
+        tags=["Rider"],
+        responses=schema_doc.UPDATE_RIDER_LOCATION_RESPONSE,
+    )
+    @action(detail=False, methods=["post"], url_path="location")
+    def update_rider_location(self, request):
+        serialized_data = RiderLocationSerializer(data=request.data)
+        if not serialized_data.is_valid():
+            return ResponseManager.handle_response(
+                errors=serialized_data.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        RiderLocationService.update_rider_location(
+            request.user, **serialized_data.validated_data
+        )
+        return ResponseManager.handle_response(
+            data={}, status=status.HTTP_200_OK, message="rider location updated"
+        )
+
+    @swagger_auto_schema(
+        methods=["post"],
+        request_body=RiderLocationBatchSerializer,
+        operation_description="Report a batch of buffered rider locations, "
+        "oldest to newest, in one request",
+        operation_summary="Update rider location in batch",
+        tags=["Rider"],
+        responses=schema_doc.UPDATE_RIDER_LOCATION_BATCH_RESPONSE,
+    )
+    @action(detail=False, methods=["post"], url_path="location/batch")
+    def update_rider_location_batch(self, request):
+        serialized_data = RiderLocationBatchSerializer(data=request.data)
+        if not serialized_data.is_valid():
+            return ResponseManager.handle_response(
+                errors=serialized_data.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        trail_points = RiderLocationService.ingest_rider_locations(
+            request.user, serialized_data.validated_data["locations"]
+        )
+        return ResponseManager.handle_response(
+            data={"trail_points": trail_points},
+            status=status.HTTP_200_OK,
+            message="rider location updated",
+        )
+
 
 class RiderKycViewset(viewsets.ViewSet):
     permission_classes = (IsAuthenticated, IsRider)
@@ -330,6 +380,28 @@ class RiderKycViewset(viewsets.ViewSet):
             data=response, status=status.HTTP_200_OK, message="Kyc submitted"
         )
 
+    @swagger_auto_schema(
+        methods=["post"],
+        request_body=DocumentUploadUrlSerializer,
+        operation_description="Get a presigned url to upload a kyc document to S3, then send the key in upload_keys",
+        operation_summary="Get kyc document upload url",
+        tags=["Rider-KYC"],
+        responses=schema_doc.DOCUMENT_UPLOAD_URL_RESPONSE,
+    )
+    @action(detail=False, methods=["post"], url_path="upload-url")
+    def create_document_upload(self, request):
+        serialized_data = DocumentUploadUrlSerializer(data=request.data)
+        if not serialized_data.is_valid():
+            return ResponseManager.handle_response(
+                errors=serialized_data.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        response = RiderKYCService.create_document_upload(
+            request.user, **serialized_data.validated_data
+        )
+        return ResponseManager.handle_response(
+            data=response, status=status.HTTP_200_OK, message="Upload url created"
+        )
+
     @swagger_auto_schema(
         methods=["post"],
         request_body=DocumentUploadSerializer,
@@ -348,14 +420,20 @@ class RiderKycViewset(viewsets.ViewSet):
         session_id = generate_session_id()
         rider = RiderService.get_rider(user=request.user)
         document_type = serialized_data.validated_data.get("document_type")
-        documents = serialized_data.validated_data.get("documents")
-        for document in documents:
+        for document in serialized_data.validated_data.get("documents", []):
             RiderKYCService.add_rider_document(
                 rider=rider,
                 document_type=document_type,
                 file=document,
                 session_id=session_id,
             )
+        for upload_key in serialized_data.validated_data.get("upload_keys", []):
+            RiderKYCService.add_rider_document(
+                rider=rider,
+                document_type=document_type,
+                upload_key=upload_key,
+                session_id=session_id,
+            )
 
         return ResponseManager.handle_response(
             data={}, status=status.HTTP_200_OK, message="Document(s) uploaded"
@@ -87,7 +87,7 @@ class WalletAdmin(ModelAdmin):  # Use UnfoldAdmin instead of ModelAdmin
     exclude = ("state", "created_by", "deleted_by", "updated_by", "deleted_at")
 
     def get_queryset(self, request):
-        return self.model.objects.exclude(user__state="DELETED")
+        return self.model.objects.exclude_deleted_users("user")
 
     def has_add_permission(self, request):
         return False
@@ -140,4 +140,4 @@ class TransactionAdmin(ModelAdmin):
         return False
 
     def get_queryset(self, request):
-        return self.model.objects.exclude(user__state="DELETED")
+        return self.model.objects.exclude_deleted_users("user")
@@ -0,0 +1,283 @@
+# Generated by Django 4.2.5 on 2026-10-18 19:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+import helpers.db_helpers
+
+
+def post_opening_balances(apps, schema_editor):
+    """Start the ledger of every funded wallet with its current balance"""
+    Wallet = apps.get_model("wallet", "Wallet")
+    LedgerEntry = apps.get_model("wallet", "LedgerEntry")
+    entries = []
+    for wallet in Wallet.objects.exclude(balance=0).iterator():
+        journal_id = helpers.db_helpers.generate_id()
+        credit = wallet.balance > 0
+        entries += [
+            LedgerEntry(
+                journal_id=journal_id,
+                account="WALLET",
+                wallet=wallet,
+                entry_type="CREDIT" if credit else "DEBIT",
+                amount=abs(wallet.balance),
+                sequence=1,
+                balance_after=wallet.balance,
+                description="Opening balance",
+            ),
+            LedgerEntry(
+                journal_id=journal_id,
+                account="OPENING_BALANCE",
+                entry_type="DEBIT" if credit else "CREDIT",
+                amount=abs(wallet.balance),
+                description="Opening balance",
+            ),
+        ]
+    LedgerEntry.objects.bulk_create(entries, batch_size=1000)
+    Wallet.objects.exclude(balance=0).update(ledger_sequence=1)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("wallet", "0010_alter_bankaccount_bank_code_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LedgerEntry",
+            fields=[
+                (
+                    "id",
+                    models.CharField(
+                        default=helpers.db_helpers.generate_id,
+                        editable=False,
+                        max_length=60,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "deleted_at",
+                    models.DateTimeField(blank=True, default=None, null=True),
+                ),
+                (
+                    "state",
+                    models.CharField(
+                        choices=[("ACTIVE", "ACTIVE"), ("DELETED", "DELETED")],
+                        default="ACTIVE",
+                        max_length=20,
+                    ),
+                ),
+                ("journal_id", models.CharField(db_index=True, max_length=60)),
+                (
+                    "account",
+                    models.CharField(
+                        choices=[
+                            ("WALLET", "WALLET"),
+                            ("PAYMENT_PROVIDER", "PAYMENT PROVIDER"),
+                            ("ORDER_SETTLEMENT", "ORDER SETTLEMENT"),
+                            ("FELE_REVENUE", "FELE REVENUE"),
+                            ("OPENING_BALANCE", "OPENING BALANCE"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                (
+                    "entry_type",
+                    models.CharField(
+                        choices=[("CREDIT", "CREDIT"), ("DEBIT", "DEBIT")],
+                        max_length=10,
+                    ),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=30)),
+                ("sequence", models.PositiveBigIntegerField(blank=True, null=True)),
+                (
+                    "balance_after",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=30, null=True
+                    ),
+                ),
+                ("reference", models.CharField(blank=True, max_length=255, null=True)),
+                ("description", models.TextField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "ledger entry",
+                "verbose_name_plural": "ledger entries",
+                "db_table": "ledger_entry",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="LedgerSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.CharField(
+                        default=helpers.db_helpers.generate_id,
+                        editable=False,
+                        max_length=60,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "deleted_at",
+                    models.DateTimeField(blank=True, default=None, null=True),
+                ),
+                (
+                    "state",
+                    models.CharField(
+                        choices=[("ACTIVE", "ACTIVE"), ("DELETED", "DELETED")],
+                        default="ACTIVE",
+                        max_length=20,
+                    ),
+                ),
+                ("sequence", models.PositiveBigIntegerField()),
+                ("balance", models.DecimalField(decimal_places=2, max_digits=30)),
+                ("verified_at", models.DateTimeField(blank=True, null=True)),
+                ("is_valid", models.BooleanField(blank=True, null=True)),
+            ],
+            options={
+                "db_table": "ledger_snapshot",
+                "ordering": ["-sequence"],
+            },
+        ),
+        migrations.AddField(
+            model_name="wallet",
+            name="ledger_sequence",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "-created_at"], name="transaction_user_created_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="ledgersnapshot",
+            name="created_by",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="created by",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ledgersnapshot",
+            name="deleted_by",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="deleted by",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ledgersnapshot",
+            name="updated_by",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="updated by",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ledgersnapshot",
+            name="wallet",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="ledger_snapshots",
+                to="wallet.wallet",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ledgerentry",
+            name="created_by",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="created by",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ledgerentry",
+            name="deleted_by",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="deleted by",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ledgerentry",
+            name="updated_by",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="updated by",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ledgerentry",
+            name="wallet",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="ledger_entries",
+                to="wallet.wallet",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ledgersnapshot",
+            index=models.Index(
+                condition=models.Q(("verified_at__isnull", True)),
+                fields=["created_at"],
+                name="ledger_snapshot_unverified_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="ledgersnapshot",
+            constraint=models.UniqueConstraint(
+                fields=("wallet", "sequence"), name="ledger_snapshot_wallet_unique"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ledgerentry",
+            index=models.Index(
+                fields=["account", "created_at"], name="ledger_entry_account_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="ledgerentry",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("wallet__isnull", False)),
+                fields=("wallet", "sequence"),
+                name="ledger_entry_wallet_sequence_unique",
+            ),
+        ),
+        migrations.RunPython(post_opening_balances, migrations.RunPython.noop),
+    ]
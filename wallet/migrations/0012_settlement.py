@@ -0,0 +1,248 @@
+# Generated by Django 4.2.5 on 2026-10-18 19:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+import helpers.db_helpers
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("wallet", "0011_ledger"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Settlement",
+            fields=[
+                (
+                    "id",
+                    models.CharField(
+                        default=helpers.db_helpers.generate_id,
+                        editable=False,
+                        max_length=60,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "deleted_at",
+                    models.DateTimeField(blank=True, default=None, null=True),
+                ),
+                (
+                    "state",
+                    models.CharField(
+                        choices=[("ACTIVE", "ACTIVE"), ("DELETED", "DELETED")],
+                        default="ACTIVE",
+                        max_length=20,
+                    ),
+                ),
+                ("period_start", models.DateTimeField(blank=True, null=True)),
+                ("period_end", models.DateTimeField(unique=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("PENDING", "PENDING"), ("COMPLETED", "COMPLETED")],
+                        default="PENDING",
+                        max_length=20,
+                    ),
+                ),
+                ("rider_count", models.PositiveIntegerField(default=0)),
+                ("order_count", models.PositiveIntegerField(default=0)),
+                (
+                    "gross_amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=30),
+                ),
+                (
+                    "commission_amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=30),
+                ),
+                (
+                    "payout_amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=30),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="created by",
+                    ),
+                ),
+                (
+                    "deleted_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="deleted by",
+                    ),
+                ),
+                (
+                    "updated_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="updated by",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "settlement",
+                "verbose_name_plural": "settlements",
+                "db_table": "settlement",
+                "ordering": ["-period_end"],
+            },
+        ),
+        migrations.CreateModel(
+            name="SettlementPayout",
+            fields=[
+                (
+                    "id",
+                    models.CharField(
+                        default=helpers.db_helpers.generate_id,
+                        editable=False,
+                        max_length=60,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "deleted_at",
+                    models.DateTimeField(blank=True, default=None, null=True),
+                ),
+                (
+                    "state",
+                    models.CharField(
+                        choices=[("ACTIVE", "ACTIVE"), ("DELETED", "DELETED")],
+                        default="ACTIVE",
+                        max_length=20,
+                    ),
+                ),
+                ("recipient_code", models.CharField(max_length=50)),
+                ("order_count", models.PositiveIntegerField(default=0)),
+                (
+                    "gross_amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=30),
+                ),
+                (
+                    "commission_amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=30),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=30)),
+                ("reference", models.CharField(max_length=60, unique=True)),
+                (
+                    "transfer_code",
+                    models.CharField(blank=True, max_length=60, null=True),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "PENDING"),
+                            ("SUCCESS", "SUCCESS"),
+                            ("FAILED", "FAILED"),
+                        ],
+                        default="PENDING",
+                        max_length=20,
+                    ),
+                ),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                ("failure_reason", models.TextField(blank=True, null=True)),
+                (
+                    "bank_account",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="settlement_payouts",
+                        to="wallet.bankaccount",
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="created by",
+                    ),
+                ),
+                (
+                    "deleted_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="deleted by",
+                    ),
+                ),
+                (
+                    "settlement",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="payouts",
+                        to="wallet.settlement",
+                    ),
+                ),
+                (
+                    "updated_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="updated by",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="settlement_payouts",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "wallet",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="settlement_payouts",
+                        to="wallet.wallet",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "settlement payout",
+                "verbose_name_plural": "settlement payouts",
+                "db_table": "settlement_payout",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("status", "PENDING")),
+                        fields=["created_at"],
+                        name="settlement_payout_pending_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.5 on 2026-10-18 19:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("wallet", "0012_settlement"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="transaction",
+            name="transaction_user_created_idx",
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("deleted_at", None)),
+                fields=["user", "-created_at"],
+                name="transaction_user_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("deleted_at", None)),
+                fields=["created_at"],
+                name="transaction_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("wallet", "0013_soft_delete_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["reference"], name="transaction_reference_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(
+                    ("payment_category", "WITHDRAW"), ("transaction_status", "PENDING")
+                ),
+                fields=["created_at"],
+                name="transaction_transfer_idx",
+            ),
+        ),
+    ]
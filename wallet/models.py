@@ -1,48 +1,63 @@
 from decimal import Decimal
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 
 from feleexpress import settings
 from helpers.db_helpers import BaseAbstractModel
 
 
+def to_amount(value):
+    return Decimal(str(value)).quantize(Decimal("0.01"))
+
+
 class Wallet(BaseAbstractModel):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, related_name="user_wallet", on_delete=models.CASCADE
     )
     balance = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    # sequence of the last ledger entry posted against this wallet
+    ledger_sequence = models.PositiveBigIntegerField(default=0)
 
     def deposit(self, amount):
         """
-        Deposit money into the wallet.
+        Deposit money into the wallet and return the new balance.
         """
-        from notification.service import NotificationService
-
-        self.balance += Decimal(amount)
-        self.save()
-        title = "Wallet credited"
-        message = f"N {round(float(amount), 2)} has been credited into your wallet."
-        NotificationService.send_push_notification(self.user, title, message)
+        self._update_balance(to_amount(amount))
+        return self.balance
 
     def withdraw(self, amount, deduct_negative=False):
         """
-        Withdraw money from the wallet.
+        Withdraw money from the wallet and return the new balance.
+        The balance is only checked and debited inside the UPDATE, so
+        concurrent withdrawals can't spend the same money twice.
         """
-        from notification.service import NotificationService
-
-        if deduct_negative or self.balance >= amount:
-            self.balance -= Decimal(amount)
-            self.save()
-            title = "Wallet withdrawal"
-            message = f"N {round(float(amount), 2)} has been debited from your wallet."
-            NotificationService.send_push_notification(self.user, title, message)
-            if self.balance < 0:
-                title = "Low balance"
-                message = f"Your wallet has hit rock bottom with N -{round(float(self.balance), 2)}. Kindly fund wallet."
-                NotificationService.send_push_notification(self.user, title, message)
-
-        else:
+        amount = to_amount(amount)
+        if not self._update_balance(
+            -amount, minimum_balance=None if deduct_negative else amount
+        ):
             raise ValueError("Insufficient balance for withdrawal.")
+        return self.balance
+
+    def _update_balance(self, amount, minimum_balance=None):
+        wallets = Wallet.objects.filter(id=self.id)
+        if minimum_balance is not None:
+            wallets = wallets.filter(balance__gte=minimum_balance)
+        with transaction.atomic():
+            updated = wallets.update(
+                balance=F("balance") + amount,
+                ledger_sequence=F("ledger_sequence") + 1,
+                updated_at=timezone.now(),
+            )
+            if updated:
+                # the updated row stays locked until commit, so this is our result
+                self.balance, self.ledger_sequence = (
+                    Wallet.objects.filter(id=self.id)
+                    .values_list("balance", "ledger_sequence")
+                    .get()
+                )
+        return bool(updated)
 
     def __str__(self):
         return f"{self.user}'s Wallet"
@@ -115,6 +130,27 @@ class Transaction(BaseAbstractModel):
         db_table = "transactions"
         verbose_name = "transaction"
         verbose_name_plural = "transaction"
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at"],
+                name="transaction_user_created_idx",
+                condition=models.Q(deleted_at=None),
+            ),
+            models.Index(
+                fields=["created_at"],
+                name="transaction_created_idx",
+                condition=models.Q(deleted_at=None),
+            ),
+            # paystack webhooks and transfer verification look up by reference
+            models.Index(fields=["reference"], name="transaction_reference_idx"),
+            models.Index(
+                fields=["created_at"],
+                name="transaction_transfer_idx",
+                condition=models.Q(
+                    transaction_status="PENDING", payment_category="WITHDRAW"
+                ),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.currency} {self.amount}"
@@ -171,3 +207,178 @@ class BankAccount(BaseAbstractModel):
         db_table = "bank_account"
         verbose_name = "bank_account"
         verbose_name_plural = "bank accounts"
+
+
+class LedgerEntry(BaseAbstractModel):
+    """
+    One side of a double-entry journal. Every balance change posts a WALLET
+    entry and an opposite entry on the account the money came from or went
+    to, so the entries of a journal always net to zero. Entries are never
+    updated or deleted; a mistake is corrected with a new journal.
+    """
+
+    ENTRY_TYPES = (("CREDIT", "CREDIT"), ("DEBIT", "DEBIT"))
+    ACCOUNTS = (
+        ("WALLET", "WALLET"),
+        ("PAYMENT_PROVIDER", "PAYMENT PROVIDER"),
+        ("ORDER_SETTLEMENT", "ORDER SETTLEMENT"),
+        ("FELE_REVENUE", "FELE REVENUE"),
+        ("OPENING_BALANCE", "OPENING BALANCE"),
+    )
+
+    journal_id = models.CharField(max_length=60, db_index=True)
+    account = models.CharField(max_length=30, choices=ACCOUNTS)
+    wallet = models.ForeignKey(
+        Wallet,
+        related_name="ledger_entries",
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+    )
+    entry_type = models.CharField(max_length=10, choices=ENTRY_TYPES)
+    amount = models.DecimalField(max_digits=30, decimal_places=2)
+    # WALLET entries only: position in the wallet's ledger and its balance after
+    sequence = models.PositiveBigIntegerField(null=True, blank=True)
+    balance_after = models.DecimalField(
+        max_digits=30, decimal_places=2, null=True, blank=True
+    )
+    reference = models.CharField(max_length=255, null=True, blank=True)
+    description = models.TextField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        db_table = "ledger_entry"
+        verbose_name = "ledger entry"
+        verbose_name_plural = "ledger entries"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["wallet", "sequence"],
+                condition=models.Q(wallet__isnull=False),
+                name="ledger_entry_wallet_sequence_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["account", "created_at"], name="ledger_entry_account_idx"
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Ledger entries can't be changed.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Ledger entries can't be deleted.")
+
+    def hard_delete(self, *args, **kwargs):
+        raise ValueError("Ledger entries can't be deleted.")
+
+    def __str__(self):
+        return f"{self.journal_id} {self.account} {self.entry_type} {self.amount}"
+
+
+class LedgerSnapshot(BaseAbstractModel):
+    """Wallet balance as of a ledger sequence, taken every N entries"""
+
+    wallet = models.ForeignKey(
+        Wallet, related_name="ledger_snapshots", on_delete=models.PROTECT
+    )
+    sequence = models.PositiveBigIntegerField()
+    balance = models.DecimalField(max_digits=30, decimal_places=2)
+    verified_at = models.DateTimeField(null=True, blank=True)
+    is_valid = models.BooleanField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-sequence"]
+        db_table = "ledger_snapshot"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["wallet", "sequence"], name="ledger_snapshot_wallet_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(verified_at__isnull=True),
+                name="ledger_snapshot_unverified_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet} @ {self.sequence}: {self.balance}"
+
+
+class Settlement(BaseAbstractModel):
+    """One end of period payout run of rider earnings"""
+
+    STATUS = (("PENDING", "PENDING"), ("COMPLETED", "COMPLETED"))
+
+    period_start = models.DateTimeField(null=True, blank=True)
+    period_end = models.DateTimeField(unique=True)
+    status = models.CharField(max_length=20, choices=STATUS, default="PENDING")
+    rider_count = models.PositiveIntegerField(default=0)
+    order_count = models.PositiveIntegerField(default=0)
+    gross_amount = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    commission_amount = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    payout_amount = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ["-period_end"]
+        db_table = "settlement"
+        verbose_name = "settlement"
+        verbose_name_plural = "settlements"
+
+    def __str__(self):
+        return f"Settlement {self.period_start} - {self.period_end}"
+
+
+class SettlementPayout(BaseAbstractModel):
+    STATUS = (("PENDING", "PENDING"), ("SUCCESS", "SUCCESS"), ("FAILED", "FAILED"))
+
+    settlement = models.ForeignKey(
+        Settlement, related_name="payouts", on_delete=models.CASCADE
+    )
+    user = models.ForeignKey(
+        "authentication.User",
+        related_name="settlement_payouts",
+        on_delete=models.CASCADE,
+    )
+    wallet = models.ForeignKey(
+        Wallet, related_name="settlement_payouts", on_delete=models.CASCADE
+    )
+    bank_account = models.ForeignKey(
+        "wallet.BankAccount",
+        related_name="settlement_payouts",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    recipient_code = models.CharField(max_length=50)
+    # earnings of the settlement period, the payout is the whole wallet balance
+    order_count = models.PositiveIntegerField(default=0)
+    gross_amount = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    commission_amount = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    amount = models.DecimalField(max_digits=30, decimal_places=2)
+    reference = models.CharField(max_length=60, unique=True)
+    transfer_code = models.CharField(max_length=60, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS, default="PENDING")
+    # when the payout was sent to paystack, it is never sent twice
+    sent_at = models.DateTimeField(null=True, blank=True)
+    failure_reason = models.TextField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        db_table = "settlement_payout"
+        verbose_name = "settlement payout"
+        verbose_name_plural = "settlement payouts"
+        indexes = [
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(status="PENDING"),
+                name="settlement_payout_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.amount} ({self.status})"
@@ -1,18 +1,139 @@
+from datetime import timedelta
 from decimal import Decimal
 
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Subquery, Sum, When
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import LockError
 from rest_framework import status
 
 from authentication.tasks import track_user_activity
+from helpers.cache_manager import KeyBuilder
+from helpers.db_helpers import generate_id
+from helpers.logger import CustomLogging
 from helpers.paystack_service import PaystackService
 from helpers.validators import CustomAPIException, Validators
-from wallet.models import BankAccount, Card, Transaction, Wallet
+from notification.service import NotificationService
+from notification.tasks import send_bulk_push_notification
+from order.models import Order, OrderTimeline
+from rider.models import Rider
+from wallet.models import (
+    BankAccount,
+    Card,
+    LedgerEntry,
+    LedgerSnapshot,
+    Settlement,
+    SettlementPayout,
+    Transaction,
+    Wallet,
+    to_amount,
+)
 
 
 class WalletService:
+    # paystack transfer status: withdrawal transaction status
+    TRANSFER_STATUSES = {
+        "success": "SUCCESS",
+        "failed": "FAILED",
+        "reversed": "REVERSED",
+    }
+    # paystack webhook event: transfer status
+    TRANSFER_EVENTS = {
+        "transfer.success": "success",
+        "transfer.failed": "failed",
+        "transfer.reversed": "reversed",
+    }
+
     @classmethod
     def create_user_wallet(cls, user):
         return Wallet.objects.create(user=user)
 
+    # sent in bulk for the wallets refunded together
+    REFUND_NOTIFICATION = (
+        "Wallet credited",
+        "A transfer from your wallet failed and the amount has been refunded "
+        "into your wallet.",
+    )
+
+    @classmethod
+    def credit_wallet(
+        cls, wallet, amount, account, reference=None, description=None, notify=True
+    ):
+        """
+        Credit the wallet from `account` (see LedgerEntry.ACCOUNTS) and notify
+        the owner once the transaction commits.
+        :params notify: False when the caller notifies the owners in bulk
+        """
+        with transaction.atomic():
+            balance = wallet.deposit(amount)
+            LedgerService.post_wallet_entry(
+                wallet, "CREDIT", amount, account, reference, description
+            )
+        if not notify:
+            return balance
+        title = "Wallet credited"
+        message = f"N {round(float(amount), 2)} has been credited into your wallet."
+        transaction.on_commit(
+            lambda: NotificationService.send_push_notification(
+                wallet.user, title, message
+            )
+        )
+        return balance
+
+    @classmethod
+    def debit_wallet(
+        cls,
+        wallet,
+        amount,
+        account,
+        reference=None,
+        description=None,
+        deduct_negative=False,
+        notify=True,
+    ):
+        """
+        Debit the wallet to `account` (see LedgerEntry.ACCOUNTS) and notify the
+        owner once the transaction commits.
+        :params notify: False when the caller notifies the owners in bulk
+        :returns: the new balance, or None if the balance was insufficient
+        """
+        with transaction.atomic():
+            try:
+                balance = wallet.withdraw(amount, deduct_negative=deduct_negative)
+            except ValueError:
+                return None
+            LedgerService.post_wallet_entry(
+                wallet, "DEBIT", amount, account, reference, description
+            )
+        if notify:
+            transaction.on_commit(
+                lambda: cls.send_debit_notification(wallet.user, amount, balance)
+            )
+        return balance
+
+    @classmethod
+    def send_debit_notification(cls, user, amount, balance):
+        title = "Wallet withdrawal"
+        message = f"N {round(float(amount), 2)} has been debited from your wallet."
+        NotificationService.send_push_notification(user, title, message)
+        if balance < 0:
+            title = "Low balance"
+            message = f"Your wallet has hit rock bottom with N {round(float(balance), 2)}. Kindly fund wallet."
+            NotificationService.send_push_notification(user, title, message)
+
+    @classmethod
+    def send_bulk_notification(cls, user_ids, title, message):
+        """One push for all the users, sent by a worker once the transaction commits"""
+        if not user_ids:
+            return
+        user_ids = list(user_ids)
+        transaction.on_commit(
+            lambda: send_bulk_push_notification.delay(user_ids, title, message),
+            robust=True,
+        )
+
     @classmethod
     def get_user_banks(cls, user):
         return BankAccount.objects.filter(user=user, save_account=True)
@@ -67,20 +188,56 @@ class WalletService:
 
     @classmethod
     def withdraw_from_wallet(cls, user, amount, recipient_code, session_id):
-        paystack_response = PaystackService.initiate_transfer(amount, recipient_code)
+        """
+        The wallet is debited and the withdrawal recorded as PENDING before
+        paystack is called, outside the transaction so the wallet isn't locked
+        for the request. The withdrawal is only refunded when paystack rejects
+        it; a transfer paystack may have accepted is settled by the transfer
+        webhook or verify_pending_transfers.
+        """
         user_wallet = user.get_user_wallet()
-        user_wallet.withdraw(amount)
-        reference = paystack_response["data"]["reference"]
-        transaction_obj = TransactionService.create_transaction(
-            transaction_type="DEBIT",
-            transaction_status="SUCCESS",
-            amount=Decimal(amount),
-            user=user,
-            reference=reference,
-            pssp="PAYSTACK",
-            payment_category="WITHDRAW",
-            pssp_meta_data=paystack_response["data"],
-        )
+        reference = generate_id()
+        with transaction.atomic():
+            balance = cls.debit_wallet(
+                user_wallet, amount, "PAYMENT_PROVIDER", reference, "Withdrawal"
+            )
+            if balance is None:
+                raise CustomAPIException(
+                    "Insufficient balance", status.HTTP_400_BAD_REQUEST
+                )
+            transaction_obj = TransactionService.create_transaction(
+                transaction_type="DEBIT",
+                transaction_status="PENDING",
+                amount=Decimal(amount),
+                user=user,
+                reference=reference,
+                pssp="PAYSTACK",
+                payment_category="WITHDRAW",
+                wallet_id=user_wallet.id,
+                description="Withdrawal",
+            )
+
+        try:
+            paystack_response = PaystackService.initiate_transfer(
+                amount, recipient_code, reference
+            )
+        except Exception as e:
+            CustomLogging.error(f"Unable to confirm withdrawal {reference}: {str(e)}")
+            paystack_response = None
+
+        if paystack_response is not None and not paystack_response.get("status"):
+            cls.settle_transfer(reference, "failed", paystack_response.get("message"))
+            raise CustomAPIException(
+                "Error occurred, unable to transfer",
+                status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if paystack_response is not None:
+            transfer = paystack_response["data"]
+            Transaction.objects.filter(id=transaction_obj.id).update(
+                pssp_meta_data=transfer
+            )
+            cls.settle_transfer(reference, transfer.get("status"))
+
         activity_data = {
             "user": user.display_name,
             "transaction_id": transaction_obj.id,
@@ -89,8 +246,7 @@ class WalletService:
             context=activity_data,
             category="USER_WALLET",
             action="USER_WITHDRAW",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -100,6 +256,108 @@ class WalletService:
             "reference": transaction_obj.reference,
         }
 
+    @classmethod
+    def settle_transfer(cls, reference, transfer_status, reason=None, notify=True):
+        """
+        Apply a paystack transfer outcome to its withdrawal or rider payout:
+        "success" completes it, "failed" and "reversed" refund the wallet.
+        Other statuses (pending, otp...) leave it PENDING.
+        :params notify: False when the caller notifies refunded owners in bulk
+        :returns: the settled Transaction, None if there was nothing to settle
+        """
+        transaction_status = cls.TRANSFER_STATUSES.get(transfer_status)
+        if transaction_status is None:
+            return None
+        # a transfer can still be reversed after it succeeded
+        settleable_statuses = (
+            ["PENDING", "SUCCESS"] if transaction_status == "REVERSED" else ["PENDING"]
+        )
+        with transaction.atomic():
+            transaction_obj = (
+                Transaction.objects.select_for_update()
+                .filter(
+                    reference=reference,
+                    payment_category="WITHDRAW",
+                    transaction_status__in=settleable_statuses,
+                )
+                .first()
+            )
+            if transaction_obj is None:
+                return None
+            transaction_obj.transaction_status = transaction_status
+            transaction_obj.save(update_fields=["transaction_status", "updated_at"])
+            SettlementPayout.objects.filter(reference=reference).update(
+                status="SUCCESS" if transaction_status == "SUCCESS" else "FAILED",
+                failure_reason=reason,
+                updated_at=timezone.now(),
+            )
+            if transaction_status != "SUCCESS":
+                wallet = Wallet.objects.get(id=transaction_obj.wallet_id)
+                cls.credit_wallet(
+                    wallet,
+                    transaction_obj.amount,
+                    "PAYMENT_PROVIDER",
+                    reference,
+                    f"{transaction_obj.description or 'Withdrawal'} reversed",
+                    notify=notify,
+                )
+                CustomLogging.error(
+                    f"Transfer {reference} {transfer_status}, wallet refunded: {reason}"
+                )
+        return transaction_obj
+
+    @classmethod
+    def verify_pending_transfers(cls):
+        """
+        Settle withdrawals and rider payouts paystack sent no transfer webhook
+        for. A transfer paystack has no record of was never queued, so it is
+        refunded.
+        """
+        references = (
+            Transaction.objects.filter(
+                transaction_status="PENDING",
+                payment_category="WITHDRAW",
+                pssp="PAYSTACK",
+                created_at__lte=timezone.now()
+                - timedelta(seconds=settings.TRANSFER_VERIFY_AFTER_SECONDS),
+            )
+            # payouts that were never sent are sent by the next settlement
+            .exclude(
+                Exists(
+                    SettlementPayout.objects.filter(
+                        reference=OuterRef("reference"), sent_at__isnull=True
+                    )
+                )
+            )
+            .order_by("created_at")
+            .values_list("reference", flat=True)
+        )
+        settled = 0
+        refunded_user_ids = set()
+        for reference in references[: settings.TRANSFER_VERIFY_BATCH_SIZE]:
+            try:
+                response = PaystackService.verify_transfer(reference)
+            except Exception as e:
+                CustomLogging.error(f"Unable to verify transfer {reference}: {str(e)}")
+                continue
+            if response.get("status"):
+                transfer_status = response["data"].get("status")
+                reason = response["data"].get("reason")
+            elif "not found" in str(response.get("message", "")).lower():
+                transfer_status, reason = "failed", response.get("message")
+            else:
+                continue
+            transaction_obj = cls.settle_transfer(
+                reference, transfer_status, reason, notify=False
+            )
+            if transaction_obj is None:
+                continue
+            settled += 1
+            if transaction_obj.transaction_status != "SUCCESS":
+                refunded_user_ids.add(transaction_obj.user_id)
+        cls.send_bulk_notification(refunded_user_ids, *cls.REFUND_NOTIFICATION)
+        return settled
+
     @classmethod
     def transfer_from_wallet_bank_account(cls, user, data, session_id):
         amount = float(data.get("amount"))
@@ -245,8 +503,7 @@ class CardService:
             context=activity_data,
             category="USER_CARD",
             action="INITIATE_CARD_TRANSACTION",
-            email=user.email if user.email else None,
-            phone_number=user.phone_number if user.phone_number else None,
+            user=user,
             level="SUCCESS",
             session_id=session_id,
         )
@@ -277,7 +534,9 @@ class CardService:
             transaction.wallet_id = wallet.id
             transaction.save()
 
-            wallet.deposit(amount)
+            WalletService.credit_wallet(
+                wallet, amount, "PAYMENT_PROVIDER", reference, "Fund wallet"
+            )
 
             if data["channel"] == "card":
                 card = Card.objects.filter(
@@ -328,7 +587,9 @@ class CardService:
                 payment_category="FUND_WALLET",
                 wallet_id=wallet.id,
             )
-            wallet.deposit(amount)
+            WalletService.credit_wallet(
+                wallet, amount, "PAYMENT_PROVIDER", reference, "Fund wallet"
+            )
 
             activity_data = {
                 "user": user.display_name,
@@ -339,10 +600,414 @@ class CardService:
                 context=activity_data,
                 category="USER_CARD",
                 action="DEBIT_CARD_TRANSACTION",
-                email=user.email if user.email else None,
-                phone_number=user.phone_number if user.phone_number else None,
+                user=user,
                 level="SUCCESS",
                 session_id=session_id,
             )
             return True
         raise CustomAPIException("Unable to debit card", status.HTTP_400_BAD_REQUEST)
+
+
+class LedgerService:
+    """
+    Double-entry ledger behind wallet balances.
+
+    Wallet.balance stays the materialized balance; every change to it also
+    posts a journal whose entries net to zero, each WALLET entry carrying the
+    wallet's ledger sequence and balance after the change. Every
+    LEDGER_SNAPSHOT_INTERVAL entries the balance is snapshotted, and the
+    reconciler checks each new snapshot against the entries since the one
+    before it, so verification never rereads a wallet's whole history.
+    """
+
+    @classmethod
+    def post_wallet_entry(
+        cls, wallet, entry_type, amount, account, reference=None, description=None
+    ):
+        """
+        Record a change already applied to the wallet, i.e. wallet.balance and
+        wallet.ledger_sequence hold the values after it.
+        """
+        amount = to_amount(amount)
+        journal_id = generate_id()
+        counter_entry_type = "DEBIT" if entry_type == "CREDIT" else "CREDIT"
+        LedgerEntry.objects.bulk_create(
+            [
+                LedgerEntry(
+                    journal_id=journal_id,
+                    account="WALLET",
+                    wallet=wallet,
+                    entry_type=entry_type,
+                    amount=amount,
+                    sequence=wallet.ledger_sequence,
+                    balance_after=wallet.balance,
+                    reference=reference,
+                    description=description,
+                ),
+                LedgerEntry(
+                    journal_id=journal_id,
+                    account=account,
+                    entry_type=counter_entry_type,
+                    amount=amount,
+                    reference=reference,
+                    description=description,
+                ),
+            ]
+        )
+        if wallet.ledger_sequence % settings.LEDGER_SNAPSHOT_INTERVAL == 0:
+            LedgerSnapshot.objects.create(
+                wallet=wallet, sequence=wallet.ledger_sequence, balance=wallet.balance
+            )
+
+    @classmethod
+    def get_wallet_entries(cls, wallet, **kwargs):
+        return LedgerEntry.objects.filter(wallet=wallet, **kwargs).order_by("-sequence")
+
+    @classmethod
+    def get_wallet_balance(cls, wallet):
+        entry = cls.get_wallet_entries(wallet).values("balance_after").first()
+        return entry["balance_after"] if entry else to_amount(0)
+
+    @classmethod
+    def reconcile(cls):
+        """
+        Verify snapshots taken since the last run.
+        :returns: number of invalid snapshots
+        """
+        snapshots = list(
+            LedgerSnapshot.objects.filter(verified_at__isnull=True).order_by(
+                "created_at"
+            )[: settings.LEDGER_RECONCILE_BATCH_SIZE]
+        )
+        invalid = 0
+        for snapshot in snapshots:
+            snapshot.is_valid = cls.verify_snapshot(snapshot)
+            snapshot.verified_at = timezone.now()
+            snapshot.save(update_fields=["is_valid", "verified_at", "updated_at"])
+            invalid += not snapshot.is_valid
+
+        wallet_ids = {snapshot.wallet_id for snapshot in snapshots}
+        for wallet in cls.get_drifted_wallets(id__in=wallet_ids):
+            CustomLogging.error(
+                f"Wallet {wallet.id} balance {wallet.balance} doesn't match its ledger balance {wallet.ledger_balance}"
+            )
+        return invalid
+
+    @classmethod
+    def verify_snapshot(cls, snapshot):
+        previous_snapshot = (
+            LedgerSnapshot.objects.filter(
+                wallet_id=snapshot.wallet_id, sequence__lt=snapshot.sequence
+            )
+            .order_by("-sequence")
+            .first()
+        )
+        sequence, balance = (
+            (previous_snapshot.sequence, previous_snapshot.balance)
+            if previous_snapshot
+            else (0, to_amount(0))
+        )
+        entries = list(
+            LedgerEntry.objects.filter(
+                wallet_id=snapshot.wallet_id,
+                sequence__gt=sequence,
+                sequence__lte=snapshot.sequence,
+            )
+            .order_by("sequence")
+            .values("journal_id", "entry_type", "amount", "sequence", "balance_after")
+        )
+        for entry in entries:
+            sequence += 1
+            if entry["entry_type"] == "CREDIT":
+                balance += entry["amount"]
+            else:
+                balance -= entry["amount"]
+            if entry["sequence"] != sequence or entry["balance_after"] != balance:
+                CustomLogging.error(
+                    f"Ledger of wallet {snapshot.wallet_id} breaks at sequence {sequence}"
+                )
+                return False
+        if sequence != snapshot.sequence or balance != snapshot.balance:
+            CustomLogging.error(
+                f"Ledger snapshot {snapshot.id} doesn't match the entries before it"
+            )
+            return False
+
+        unbalanced_journals = (
+            LedgerEntry.objects.filter(
+                journal_id__in=[entry["journal_id"] for entry in entries]
+            )
+            .values("journal_id")
+            .annotate(
+                net=Sum(
+                    Case(
+                        When(entry_type="CREDIT", then=F("amount")),
+                        default=-F("amount"),
+                    )
+                )
+            )
+            .exclude(net=0)
+        )
+        if unbalanced_journals.exists():
+            CustomLogging.error(
+                f"Ledger of wallet {snapshot.wallet_id} has unbalanced journals before snapshot {snapshot.id}"
+            )
+            return False
+        return True
+
+    @classmethod
+    def get_drifted_wallets(cls, **kwargs):
+        """Wallets whose balance isn't the balance after their last ledger entry"""
+        ledger_balance = (
+            LedgerEntry.objects.filter(wallet_id=OuterRef("id"))
+            .order_by("-sequence")
+            .values("balance_after")[:1]
+        )
+        return (
+            Wallet.objects.filter(ledger_sequence__gt=0, **kwargs)
+            .annotate(ledger_balance=Subquery(ledger_balance))
+            .exclude(balance=F("ledger_balance"))
+        )
+
+
+class SettlementService:
+    """
+    End of period payout of rider wallet balances.
+
+    Riders with at least RIDER_SETTLEMENT_MIN_PAYOUT in their wallet and a
+    saved bank account are debited and paid through Paystack bulk transfers
+    of up to PaystackService.BULK_TRANSFER_SIZE riders each, instead of one
+    transfer request per rider. A payout is only sent once: it stays PENDING
+    until the transfer webhook or WalletService.verify_pending_transfers
+    settles it, and the wallet is refunded if the transfer fails. Riders are
+    notified with one bulk push per batch.
+    """
+
+    LOCK_KEY = f"{settings.ENVIRONMENT}:{KeyBuilder.rider_settlement_lock()}"
+    PAYOUT_NOTIFICATION = (
+        "Wallet withdrawal",
+        "Your wallet balance has been paid out to your bank account.",
+    )
+
+    @classmethod
+    def run_settlement(cls, period_end=None):
+        connection = get_redis_connection("default")
+        lock = connection.lock(
+            cls.LOCK_KEY, timeout=settings.RIDER_SETTLEMENT_LOCK_SECONDS
+        )
+        if not lock.acquire(blocking=False):
+            return None
+
+        try:
+            settlement = cls.create_settlement(period_end or timezone.now())
+            cls.send_pending_payouts()
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                pass
+        return settlement
+
+    @classmethod
+    def create_settlement(cls, period_end):
+        previous_settlement = Settlement.objects.order_by("-period_end").first()
+        period_start = previous_settlement.period_end if previous_settlement else None
+        settlement = Settlement.objects.create(
+            period_start=period_start, period_end=period_end
+        )
+        earnings = cls.get_rider_earnings(period_start, period_end)
+        wallets = list(cls.get_payable_wallets())
+        batch_size = PaystackService.BULK_TRANSFER_SIZE
+        for index in range(0, len(wallets), batch_size):
+            cls.create_payouts(
+                settlement, wallets[index : index + batch_size], earnings
+            )
+
+        totals = settlement.payouts.aggregate(
+            rider_count=Count("id"),
+            order_count=Sum("order_count"),
+            gross_amount=Sum("gross_amount"),
+            commission_amount=Sum("commission_amount"),
+            payout_amount=Sum("amount"),
+        )
+        for field, value in totals.items():
+            setattr(settlement, field, value or 0)
+        settlement.status = "COMPLETED"
+        settlement.save()
+        return settlement
+
+    @classmethod
+    def get_rider_earnings(cls, period_start, period_end):
+        """:returns: {user id: {order_count, gross_amount, commission_amount}}"""
+        completed_in_period = OrderTimeline.objects.filter(
+            order_id=OuterRef("id"),
+            status="ORDER_COMPLETED",
+            created_at__lte=period_end,
+        )
+        if period_start is not None:
+            completed_in_period = completed_in_period.filter(
+                created_at__gt=period_start
+            )
+        earnings = (
+            Order.objects.filter(status="ORDER_COMPLETED", rider__isnull=False)
+            .filter(Exists(completed_in_period))
+            .values("rider__user_id")
+            .annotate(
+                order_count=Count("id"),
+                gross_amount=Sum("total_amount"),
+                commission_amount=Sum("fele_amount"),
+            )
+        )
+        return {earning.pop("rider__user_id"): earning for earning in earnings}
+
+    @classmethod
+    def get_payable_wallets(cls):
+        bank_accounts = BankAccount.objects.filter(
+            user_id=OuterRef("user_id"), save_account=True, recipient_code__isnull=False
+        ).order_by("-created_at")
+        return (
+            Wallet.objects.filter(balance__gte=settings.RIDER_SETTLEMENT_MIN_PAYOUT)
+            .filter(Exists(Rider.objects.filter(user_id=OuterRef("user_id"))))
+            .annotate(
+                payout_bank_account_id=Subquery(bank_accounts.values("id")[:1]),
+                payout_recipient_code=Subquery(
+                    bank_accounts.values("recipient_code")[:1]
+                ),
+            )
+            .filter(payout_recipient_code__isnull=False)
+            .select_related("user")
+        )
+
+    @classmethod
+    def create_payouts(cls, settlement, wallets, earnings):
+        payouts = []
+        with transaction.atomic():
+            for wallet in wallets:
+                amount = wallet.balance
+                reference = generate_id()
+                balance = WalletService.debit_wallet(
+                    wallet,
+                    amount,
+                    "PAYMENT_PROVIDER",
+                    reference,
+                    "Rider payout",
+                    notify=False,
+                )
+                if balance is None:
+                    # spent since it was read, it'll be paid in the next settlement
+                    continue
+                rider_earnings = earnings.get(wallet.user_id, {})
+                payouts.append(
+                    SettlementPayout(
+                        settlement=settlement,
+                        user_id=wallet.user_id,
+                        wallet=wallet,
+                        bank_account_id=wallet.payout_bank_account_id,
+                        recipient_code=wallet.payout_recipient_code,
+                        order_count=rider_earnings.get("order_count", 0),
+                        gross_amount=rider_earnings.get("gross_amount") or 0,
+                        commission_amount=rider_earnings.get("commission_amount") or 0,
+                        amount=amount,
+                        reference=reference,
+                    )
+                )
+            SettlementPayout.objects.bulk_create(payouts)
+            Transaction.objects.bulk_create(
+                [
+                    Transaction(
+                        user_id=payout.user_id,
+                        transaction_type="DEBIT",
+                        transaction_status="PENDING",
+                        amount=payout.amount,
+                        reference=payout.reference,
+                        pssp="PAYSTACK",
+                        payment_category="WITHDRAW",
+                        wallet_id=payout.wallet_id,
+                        description="Rider payout",
+                    )
+                    for payout in payouts
+                ]
+            )
+            WalletService.send_bulk_notification(
+                [payout.user_id for payout in payouts], *cls.PAYOUT_NOTIFICATION
+            )
+        return payouts
+
+    @classmethod
+    def send_pending_payouts(cls):
+        payouts = list(
+            SettlementPayout.objects.filter(status="PENDING", sent_at__isnull=True)
+            .select_related("wallet__user")
+            .order_by("created_at")
+        )
+        batch_size = PaystackService.BULK_TRANSFER_SIZE
+        sent = 0
+        for index in range(0, len(payouts), batch_size):
+            sent += cls.send_payouts(payouts[index : index + batch_size])
+        return sent
+
+    @classmethod
+    def send_payouts(cls, payouts):
+        """
+        Send one paystack bulk transfer. The payouts are marked sent first,
+        so one paystack may have queued is never sent again; payouts paystack
+        rejects are refunded, the rest are settled by the transfer webhook.
+        :returns: number of payouts paystack queued
+        """
+        SettlementPayout.objects.filter(
+            id__in=[payout.id for payout in payouts]
+        ).update(sent_at=timezone.now())
+        transfers = [
+            {
+                "amount": payout.amount,
+                "recipient": payout.recipient_code,
+                "reference": payout.reference,
+            }
+            for payout in payouts
+        ]
+        try:
+            response = PaystackService.initiate_bulk_transfer(transfers)
+        except Exception as e:
+            CustomLogging.error(f"Unable to confirm rider payouts: {str(e)}")
+            return 0
+
+        if not response.get("status"):
+            results = {
+                payout.reference: {
+                    "status": "failed",
+                    "message": response.get("message"),
+                }
+                for payout in payouts
+            }
+        else:
+            results = {result["reference"]: result for result in response["data"]}
+
+        queued_payouts = []
+        refunded_user_ids = set()
+        for payout in payouts:
+            result = results.get(payout.reference)
+            if result is None:
+                continue
+            if result.get("status") == "failed":
+                if WalletService.settle_transfer(
+                    payout.reference, "failed", result.get("message"), notify=False
+                ):
+                    refunded_user_ids.add(payout.user_id)
+                continue
+            payout.transfer_code = result.get("transfer_code")
+            payout.updated_at = timezone.now()
+            queued_payouts.append(payout)
+
+        SettlementPayout.objects.bulk_update(
+            queued_payouts, ["transfer_code", "updated_at"]
+        )
+        for payout in queued_payouts:
+            transaction_obj = WalletService.settle_transfer(
+                payout.reference, results[payout.reference].get("status"), notify=False
+            )
+            if transaction_obj and transaction_obj.transaction_status != "SUCCESS":
+                refunded_user_ids.add(payout.user_id)
+        WalletService.send_bulk_notification(
+            refunded_user_ids, *WalletService.REFUND_NOTIFICATION
+        )
+        return len(queued_payouts)
@@ -0,0 +1,23 @@
+from celery import shared_task
+
+
+@shared_task(name="task.reconcile_wallet_ledger")
+def reconcile_wallet_ledger():
+    from wallet.service import LedgerService
+
+    return LedgerService.reconcile()
+
+
+@shared_task(name="task.verify_pending_transfers")
+def verify_pending_transfers():
+    from wallet.service import WalletService
+
+    return WalletService.verify_pending_transfers()
+
+
+@shared_task(name="task.run_rider_settlement")
+def run_rider_settlement():
+    from wallet.service import SettlementService
+
+    settlement = SettlementService.run_settlement()
+    return settlement and settlement.id
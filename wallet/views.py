@@ -266,6 +266,13 @@ class PaystackViewset(viewsets.ViewSet):
                 return ResponseManager.handle_response(
                     data={}, status=status.HTTP_200_OK, message=str(e)
                 )
+        elif event in WalletService.TRANSFER_EVENTS:
+            data = request_data.get("data", {})
+            WalletService.settle_transfer(
+                data.get("reference"),
+                WalletService.TRANSFER_EVENTS[event],
+                data.get("reason"),
+            )
         return ResponseManager.handle_response(
             data={}, status=status.HTTP_200_OK, message="Webhook successful"
         )